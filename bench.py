@@ -0,0 +1,561 @@
+# bench.py
+"""
+Локальные бенчмарки (без Google и Telegram).
+
+    python bench.py callbacks
+    python bench.py memory
+    python bench.py dates
+    python bench.py bulk
+    python bench.py search
+    python bench.py flow --concurrency 1 50 500 --latency 0.05 --errors 0.02
+    python bench.py workers --workers 1 2 4
+    python bench.py startup --runs 5
+"""
+from __future__ import annotations
+
+import os
+import argparse
+import asyncio
+import time
+import logging
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+import callbacks
+import dates
+from catalog import intern_catalog
+
+
+def _report(name: str, n: int, seconds: float) -> None:
+    print(f"{name:<28} {n:>9} ops  {seconds * 1e9 / n:>9.0f} ns/op")
+
+
+def bench_callbacks(n: int) -> None:
+    """encode / decode / dispatch одного callback_data (как на каждом нажатии кнопки)."""
+    dispatch = callbacks.Dispatcher()
+
+    @dispatch.on("qty")
+    async def on_qty(q, context, version, index, qty):
+        return None
+
+    long_name = "Соус соевый классический 30 мл (коробка 200 шт)"
+
+    t = time.perf_counter()
+    for i in range(n):
+        callbacks.encode("qty", 3, i % 200, 12)
+    _report("encode qty(ver, idx, n)", n, time.perf_counter() - t)
+
+    t = time.perf_counter()
+    for _ in range(n):
+        callbacks.encode("item", long_name)
+    _report("encode via token table", n, time.perf_counter() - t)
+
+    data = callbacks.encode("qty", 3, 117, 12)
+    t = time.perf_counter()
+    for _ in range(n):
+        callbacks.decode(data)
+    _report("decode", n, time.perf_counter() - t)
+
+    async def run_dispatch() -> float:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            _, handler, args = dispatch.resolve(data)
+            await handler(None, None, *args)
+        return time.perf_counter() - t0
+
+    _report("decode + dispatch", n, asyncio.run(run_dispatch()))
+    print(f"callback_data example: {data!r} ({len(data.encode())} bytes)")
+
+
+def bench_memory(sessions: int, items: int) -> None:
+    """Память на сессию: копия списка товаров/адреса в user_data против ссылки на общий каталог."""
+    names = [f"Товар №{i} — соус соевый классический 30 мл" for i in range(items)]
+
+    def measure(make_session) -> int:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        data = {uid: make_session(uid) for uid in range(sessions)}
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(st.size_diff for st in after.compare_to(before, "filename"))
+        del data
+        return size
+
+    def legacy_session(uid: int) -> dict:
+        # как было: каждый read_items парсил ответ Sheets заново -> свои строки и свой список у каждого
+        return {
+            "order_type": "RC",
+            "subtype": "RC_1",
+            "delivery_date": "2026-01-16",
+            "daily_sheet": "RC_2026-01-16",
+            "address": f"г. Москва, ул. Примерная, д. {uid % 300}",
+            "address_col": "AB",
+            "items_cache": ["".join(n) for n in names],
+        }
+
+    catalog = intern_catalog("items", ("bench",), tuple(names), tuple(names))
+
+    def shared_session(uid: int) -> dict:
+        return {
+            "order_type": "RC",
+            "subtype": "RC_1",
+            "delivery_date": "2026-01-16",
+            "store_catalog": catalog.id,
+            "store_index": uid % 300,
+        }
+
+    legacy = measure(legacy_session)
+    shared = measure(shared_session)
+    print(f"sessions={sessions} items={items}")
+    print(f"legacy user_data   {legacy / sessions:>10.0f} B/session  {legacy / 2**20:8.2f} MiB total")
+    print(f"shared catalog     {shared / sessions:>10.0f} B/session  {shared / 2**20:8.2f} MiB total")
+
+
+def bench_dates(n: int) -> None:
+    """available_delivery_dates: bisect по скомпилированному календарю против эталонного расчёта."""
+    start = datetime(2026, 1, 5, 9, 0, tzinfo=dates.TZ)
+    moments = [start + timedelta(minutes=37 * i) for i in range(n)]  # ~несколько недель
+    dates.compile_calendars(start)
+
+    for order_type, subtype in (("RC", "RC_1"), ("RC", "RC_2"), ("FREEZE", None)):
+        rule = dates._rule_for(order_type, subtype)
+
+        t = time.perf_counter()
+        for now in moments:
+            dates._evaluate(rule, now)
+        _report(f"reference {order_type}/{subtype}", n, time.perf_counter() - t)
+
+        t = time.perf_counter()
+        for now in moments:
+            dates.available_delivery_dates(order_type, subtype, now)
+        _report(f"calendar  {order_type}/{subtype}", n, time.perf_counter() - t)
+
+
+def bench_bulk(n: int, items: int) -> None:
+    """Разбор заказа списком (9 строк) по каталогу из `items` товаров."""
+    import bulk
+    from sheets import ItemRow
+
+    names = [f"Товар №{i} — соус соевый классический {i % 7 + 1}0 мл" for i in range(items)]
+    names[items // 2] = "Соевый соус 30 мл"
+    catalog = intern_catalog("items", ("bench-bulk", items), tuple(ItemRow(nm, i) for i, nm in enumerate(names)), tuple(names))
+    text = "\n".join([
+        "Соевый соус 30 мл 20",
+        "соев соус 30мл - 10",
+        f"товар {items - 1} соус соевый 6",
+        "Товар №7 — соус соевый классический 10 мл x 12 шт",
+        "что-то непонятное 5",
+        "наклейки 100",
+        f"товар {items // 3} 4",
+        "без количества",
+        "Соевый соус 30 мл 2",
+    ])
+
+    t = time.perf_counter()
+    bulk.matcher_for(catalog)
+    print(f"matcher build ({items} items)     {(time.perf_counter() - t) * 1000:.2f} ms")
+
+    t = time.perf_counter()
+    for _ in range(n):
+        bulk.parse_order(text, catalog, {})
+    _report("parse_order (9 lines)", n, time.perf_counter() - t)
+
+
+def bench_search(n: int, stores: int) -> None:
+    """Поиск магазина по части адреса в каталоге из `stores` адресов."""
+    import search
+    from sheets import AddressCol
+
+    streets = ["Ленина", "Тверская", "Профсоюзная", "Мира", "Садовая", "Лесная", "Гагарина", "Советская"]
+    names = [f"г. Москва, ул. {streets[i % len(streets)]}, д. {i // len(streets) + 1}, ТЦ «Точка-{i}»"
+             for i in range(stores)]
+    catalog = intern_catalog("addresses", ("bench-search", stores),
+                             tuple(AddressCol(nm, f"C{i}", i) for i, nm in enumerate(names)), tuple(names))
+
+    t = time.perf_counter()
+    index = search.index_for(catalog)
+    print(f"index build ({stores} stores)       {(time.perf_counter() - t) * 1000:.2f} ms")
+
+    for query in ("лен", "тверская 12", "профсоюзная 1", "точка-4321", "москва", "нет такого"):
+        t = time.perf_counter()
+        for _ in range(n):
+            found, total = index.search(query)
+        _report(f"search {query!r} ({total})", n, time.perf_counter() - t)
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def bench_flow(levels: list[int], orders: int, items: int, latency: float, errors: float, stores: int) -> None:
+    """
+    Полный сценарий заказа через вебхук main.app на fake Sheets и fake Telegram (fakes.py):
+    /start -> create_order -> otype -> [subtype] -> storecol -> ddate -> (item -> qty) x items -> finish.
+    Задержка шага — от POST вебхука до ответа бота (sendMessage / editMessageText) в этот чат.
+    """
+    os.environ.update(FAKE_BACKENDS="1", FAKE_STORES=str(stores),
+                      FAKE_SHEETS_LATENCY=str(latency), FAKE_SHEETS_ERROR_RATE=str(errors))
+    os.environ.setdefault("BOT_TOKEN", "123456:FAKE")
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ.setdefault("SESSION_DB_PATH", os.path.join(tmp, "sessions.sqlite3"))
+    os.environ.setdefault("ORDER_JOURNAL_PATH", os.path.join(tmp, "orders-journal.sqlite3"))
+    os.environ.setdefault("SHEETS_SNAPSHOT_PATH", os.path.join(tmp, "sheets-snapshot.json"))
+    # квоты меряем отдельно; здесь интересна сама обработка
+    os.environ.setdefault("SHEETS_READS_PER_MINUTE", "1000000")
+    os.environ.setdefault("SHEETS_WRITES_PER_MINUTE", "1000000")
+    # магазины раз за разом заказывают те же количества с разницей в секунды (в жизни — в дни):
+    # с дедупликацией записей почти все batchUpdate пропускались бы, и "Sheets calls/order" врал бы
+    os.environ.setdefault("ORDER_DEDUP_SECONDS", "0")
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(_run_flow(levels, orders, items))
+
+
+class _OrderDriver:
+    """
+    Проводит заказы через вебхук. post(update) — отправка апдейта (код ответа HTTP),
+    ответы бота приходят в deliver() от fake Telegram.
+    """
+
+    def __init__(self, post: Callable[[dict], Awaitable[int]], items: int):
+        from fakes import UpdateFactory
+        self.post = post
+        self.items = items
+        self.factory = UpdateFactory()
+        self.replies: dict[int, asyncio.Future] = {}
+
+    def deliver(self, method: str, params: dict) -> None:
+        if method in ("sendMessage", "editMessageText"):
+            fut = self.replies.pop(int(params["chat_id"]), None)
+            if fut is not None and not fut.done():
+                fut.set_result(params)
+
+    async def send(self, step: str, user_id: int, update: dict, latencies: dict[str, list[float]]) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        self.replies[user_id] = fut
+        t = time.perf_counter()
+        while (status := await self.post(update)) == 503:   # очередь полна / процесс ещё стартует
+            await asyncio.sleep(0.05)
+        if status != 200:
+            raise RuntimeError(f"webhook answered {status}")
+        reply = await asyncio.wait_for(fut, 120)
+        latencies.setdefault(step, []).append(time.perf_counter() - t)
+        return reply
+
+    @staticmethod
+    def button(reply: dict, action: str, nth: int) -> str:
+        found = [b["callback_data"] for row in reply.get("reply_markup", {}).get("inline_keyboard", [])
+                 for b in row if callbacks.decode(b["callback_data"])[0] == action]
+        if not found:
+            raise RuntimeError(f"no {action!r} button in reply: {reply.get('text')!r}")
+        return found[nth % len(found)]
+
+    async def place_order(self, user_id: int, n: int, latencies: dict[str, list[float]]) -> None:
+        async def click(reply: dict, action: str, nth: int = 0) -> dict:
+            data = self.button(reply, action, nth)
+            update = self.factory.callback(user_id, data, message_id=menu_id, text=reply["text"])
+            return await self.send(action, user_id, update, latencies)
+
+        start = self.factory.message(user_id, "/start")
+        menu_id = start["update_id"]    # меню каждого заказа — новое сообщение
+        reply = await self.send("start", user_id, start, latencies)
+        reply = await click(reply, "create_order")
+        reply = await click(reply, "otype", n)
+        if "subtype" in {callbacks.decode(b["callback_data"])[0]
+                         for row in reply["reply_markup"]["inline_keyboard"] for b in row}:
+            reply = await click(reply, "subtype", n // 2)
+        reply = await click(reply, "storecol", user_id)
+        reply = await click(reply, "ddate")
+        for k in range(self.items):
+            if k:
+                reply = await click(reply, "show_items")
+            reply = await click(reply, "item", user_id + k)
+            reply = await click(reply, "qty", k)
+        reply = await click(reply, "finish")
+        if "Заказ завершён" not in reply["text"]:
+            raise RuntimeError(f"order not finished: {reply['text']!r}")
+
+    async def run(self, first_user: int, concurrency: int, total: int) -> tuple[dict[str, list[float]], float]:
+        """total заказов силами concurrency магазинов (у каждого свой чат). -> (задержки по шагам, секунды)."""
+        latencies: dict[str, list[float]] = {}
+        queue = iter(range(total))
+
+        async def store(worker: int) -> None:
+            for n in queue:
+                await self.place_order(first_user + worker, n, latencies)
+
+        t = time.perf_counter()
+        await asyncio.gather(*(store(w) for w in range(concurrency)))
+        return latencies, time.perf_counter() - t
+
+
+def _print_steps(latencies: dict[str, list[float]]) -> None:
+    print(f"{'step':<14} {'n':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for step, values in latencies.items():
+        print(f"{step:<14} {len(values):>7} {_percentile(values, 0.5) * 1000:>9.1f} "
+              f"{_percentile(values, 0.99) * 1000:>9.1f}")
+
+
+async def _run_flow(levels: list[int], orders: int, items: int) -> None:
+    import httpx
+    import fakes
+    import jobs
+    import main as bot
+
+    await bot.on_startup()
+    logging.getLogger().setLevel(logging.WARNING)
+    await jobs.precreate_daily_sheets()
+
+    svc = fakes.sheets_service
+    url = f"/telegram/{bot.WEBHOOK_SECRET}"
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=bot.app), base_url="http://bench")
+
+    async def post(update: dict) -> int:
+        return (await client.post(url, json=update)).status_code
+
+    driver = _OrderDriver(post, items)
+    fakes.bot_request.on_call = driver.deliver
+    try:
+        for level, concurrency in enumerate(levels):
+            total = max(orders, concurrency)
+            calls_before = svc.calls.copy()
+            errors_before = sum(svc.errors.values())
+            latencies, wall = await driver.run(1_000_000 * (level + 1), concurrency, total)
+
+            calls = svc.calls - calls_before
+            print(f"\n== {concurrency} concurrent stores: {total} orders in {wall:.2f}s "
+                  f"({total / wall:.1f} orders/s, {sum(map(len, latencies.values())) / wall:.0f} updates/s)")
+            print(f"Sheets calls/order: {sum(calls.values()) / total:.2f}  "
+                  + "  ".join(f"{m}={c / total:.2f}" for m, c in sorted(calls.items()))
+                  + f"  (injected 429: {sum(svc.errors.values()) - errors_before})")
+            _print_steps(latencies)
+    finally:
+        await client.aclose()
+        await bot.on_shutdown()
+
+
+def bench_workers(worker_counts: list[int], concurrency: int, orders: int, items: int, latency: float) -> None:
+    """
+    Масштабирование по процессам: для каждого N запускает `uvicorn main:app --workers N`
+    (BOT_WORKERS=N, FAKE_BACKENDS=1) и гоняет заказы по HTTP. Ответы fake Telegram
+    из процессов приходят в бенчмарк UDP-датаграммами (FAKE_TELEGRAM_SINK).
+    """
+    asyncio.run(_run_workers(worker_counts, concurrency, orders, items, latency))
+
+
+async def _run_workers(worker_counts: list[int], concurrency: int, orders: int, items: int, latency: float) -> None:
+    import json
+    import socket
+    import subprocess
+    import sys
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    driver: _OrderDriver | None = None
+
+    class Sink(asyncio.DatagramProtocol):
+        def datagram_received(self, data: bytes, addr) -> None:
+            if driver is not None:
+                msg = json.loads(data)
+                driver.deliver(msg["method"], msg["params"])
+
+    transport, _ = await loop.create_datagram_endpoint(Sink, local_addr=("127.0.0.1", 0))
+    transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+    sink_port = transport.get_extra_info("sockname")[1]
+    print(f"cpu cores: {os.cpu_count()}")
+
+    for n in worker_counts:
+        tmp = tempfile.mkdtemp(prefix=f"bench-w{n}-")
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        env = dict(os.environ, FAKE_BACKENDS="1", BOT_WORKERS=str(n), BOT_TOKEN="123456:FAKE", WEBHOOK_URL="",
+                   FAKE_TELEGRAM_SINK=f"127.0.0.1:{sink_port}", FAKE_SHEETS_LATENCY=str(latency),
+                   SESSION_DB_PATH=os.path.join(tmp, "sessions.sqlite3"), BOT_RUN_DIR=tmp,
+                   ORDER_JOURNAL_PATH=os.path.join(tmp, "orders-journal.sqlite3"),
+                   SHEETS_SNAPSHOT_PATH=os.path.join(tmp, "sheets-snapshot.json"),
+                   SHEETS_READS_PER_MINUTE="1000000", SHEETS_WRITES_PER_MINUTE="1000000", ORDER_DEDUP_SECONDS="0")
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(n),
+             "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60,
+                                   limits=httpx.Limits(max_connections=concurrency))
+        try:
+            for _ in range(600):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError(f"{n} workers did not become healthy")
+
+            async def post(update: dict) -> int:
+                return (await client.post("/telegram/secret", json=update)).status_code
+
+            driver = _OrderDriver(post, items)
+            await driver.run(10_000_000 * n, concurrency, concurrency)        # прогрев всех процессов
+            latencies, wall = await driver.run(20_000_000 * n, concurrency, max(orders, concurrency))
+            updates = sum(map(len, latencies.values()))
+            every = [v for values in latencies.values() for v in values]
+            print(f"\n== {n} worker(s): {max(orders, concurrency)} orders in {wall:.2f}s "
+                  f"({max(orders, concurrency) / wall:.1f} orders/s, {updates / wall:.0f} updates/s, "
+                  f"p50 {_percentile(every, 0.5) * 1000:.1f} ms, p99 {_percentile(every, 0.99) * 1000:.1f} ms)")
+        finally:
+            driver = None
+            await client.aclose()
+            proc.terminate()
+            proc.wait(30)
+    transport.close()
+
+
+# Что смотреть в -X importtime: тяжёлые пакеты и стек Sheets (он должен грузиться уже после старта, см. sheets.preload)
+_STARTUP_MODULES = ("fastapi", "telegram", "telegram.ext", "uvicorn", "sheets",
+                    "googleapiclient.discovery", "google.oauth2.service_account", "google_auth_httplib2", "httplib2")
+_SHEETS_STACK = "import googleapiclient.discovery, google.oauth2.service_account, google_auth_httplib2"
+
+
+def _import_times(code: str) -> dict[str, float]:
+    """Модуль -> накопленное время импорта, мс (python -X importtime, чистый процесс)."""
+    import subprocess
+    import sys
+
+    env = dict(os.environ, BOT_TOKEN="123456:FAKE")
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                         capture_output=True, text=True, check=True).stderr
+    times: dict[str, float] = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def bench_startup(runs: int) -> None:
+    """
+    Холодный старт: время импорта main (python -X importtime) и время от запуска uvicorn
+    до первого 200 на /health (FAKE_BACKENDS=1: без сети, меряется только наш путь старта).
+    """
+    import statistics
+
+    _import_times("import main")   # первый прогон — компиляция .pyc, не считаем
+    samples = [_import_times("import main") for _ in range(runs)]
+    print(f"import main (median of {runs}, ms):")
+    for name in ("main", *_STARTUP_MODULES):
+        values = [s[name] for s in samples if name in s]
+        print(f"  {name:<32} " + (f"{statistics.median(values):8.1f}" if values else "       — (not imported)"))
+    deferred = [_import_times(_SHEETS_STACK) for _ in range(runs)]
+    total = statistics.median(sum(d[m] for m in d if m in _SHEETS_STACK.split(" ", 1)[1].split(", ")) for d in deferred)
+    print(f"  Sheets stack, loaded in background   {total:8.1f}")
+
+    ready = asyncio.run(_time_to_first_200(runs))
+    print(f"\nuvicorn start -> first 200 on /health: median {statistics.median(ready) * 1000:.0f} ms, "
+          f"min {min(ready) * 1000:.0f} ms, max {max(ready) * 1000:.0f} ms")
+
+
+async def _time_to_first_200(runs: int) -> list[float]:
+    import socket
+    import subprocess
+    import sys
+    import httpx
+
+    out = []
+    async with httpx.AsyncClient(timeout=5) as client:
+        for _ in range(runs):
+            tmp = tempfile.mkdtemp(prefix="bench-startup-")
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+            env = dict(os.environ, FAKE_BACKENDS="1", BOT_TOKEN="123456:FAKE", WEBHOOK_URL="", BOT_RUN_DIR=tmp,
+                       SESSION_DB_PATH=os.path.join(tmp, "sessions.sqlite3"),
+                       ORDER_JOURNAL_PATH=os.path.join(tmp, "orders-journal.sqlite3"),
+                       SHEETS_SNAPSHOT_PATH=os.path.join(tmp, "sheets-snapshot.json"))
+            t = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                                     "--log-level", "warning"],
+                                    env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                while True:
+                    try:
+                        if (await client.get(f"http://127.0.0.1:{port}/health")).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if proc.poll() is not None:
+                        raise RuntimeError("uvicorn exited before /health answered 200")
+                    await asyncio.sleep(0.005)
+                out.append(time.perf_counter() - t)
+            finally:
+                proc.terminate()
+                proc.wait(30)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("callbacks", help="codec + dispatch table")
+    p.add_argument("-n", type=int, default=200_000)
+
+    p = sub.add_parser("memory", help="user_data footprint per session")
+    p.add_argument("--sessions", type=int, default=500)
+    p.add_argument("--items", type=int, default=200)
+
+    p = sub.add_parser("dates", help="delivery calendar lookup")
+    p.add_argument("-n", type=int, default=1_000)
+
+    p = sub.add_parser("bulk", help="bulk text order parsing and fuzzy matching")
+    p.add_argument("-n", type=int, default=2_000)
+    p.add_argument("--items", type=int, default=500)
+
+    p = sub.add_parser("search", help="store address search index")
+    p.add_argument("-n", type=int, default=10_000)
+    p.add_argument("--stores", type=int, default=5_000)
+
+    p = sub.add_parser("flow", help="full order flow via webhook on fake Sheets/Telegram")
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 50, 500])
+    p.add_argument("--orders", type=int, default=50, help="orders per level (at least one per store)")
+    p.add_argument("--items", type=int, default=3, help="items per order")
+    p.add_argument("--latency", type=float, default=0.05, help="fake Sheets latency, seconds")
+    p.add_argument("--errors", type=float, default=0.0, help="share of Sheets calls answered with 429")
+    p.add_argument("--stores", type=int, default=30, help="store addresses in the fake templates")
+
+    p = sub.add_parser("workers", help="throughput vs number of uvicorn worker processes (BOT_WORKERS)")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--concurrency", type=int, default=100)
+    p.add_argument("--orders", type=int, default=200)
+    p.add_argument("--items", type=int, default=3)
+    p.add_argument("--latency", type=float, default=0.05, help="fake Sheets latency, seconds")
+
+    p = sub.add_parser("startup", help="cold start: import time of main and time to the first 200 on /health")
+    p.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.cmd == "callbacks":
+        bench_callbacks(args.n)
+    elif args.cmd == "memory":
+        bench_memory(args.sessions, args.items)
+    elif args.cmd == "dates":
+        bench_dates(args.n)
+    elif args.cmd == "bulk":
+        bench_bulk(args.n, args.items)
+    elif args.cmd == "search":
+        bench_search(args.n, args.stores)
+    elif args.cmd == "flow":
+        bench_flow(args.concurrency, args.orders, args.items, args.latency, args.errors, args.stores)
+    elif args.cmd == "workers":
+        bench_workers(args.workers, args.concurrency, args.orders, args.items, args.latency)
+    elif args.cmd == "startup":
+        bench_startup(args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# breaker.py
+from __future__ import annotations
+
+import os
+import sys
+import time
+import logging
+from dataclasses import dataclass
+
+from googleapiclient.errors import HttpError
+
+log = logging.getLogger("breaker")
+
+# Предохранитель на Sheets: после SHEETS_BREAKER_FAILURES неудач подряд запросы на
+# SHEETS_BREAKER_COOLDOWN_SECONDS не отправляются вовсе (сразу SheetsUnavailable), потом
+# пропускается один пробный запрос: удался — работаем дальше, нет — ещё одна пауза.
+SHEETS_BREAKER_FAILURES = int(os.getenv("SHEETS_BREAKER_FAILURES", "5"))
+SHEETS_BREAKER_COOLDOWN_SECONDS = float(os.getenv("SHEETS_BREAKER_COOLDOWN_SECONDS", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class SheetsUnavailable(RuntimeError):
+    """Google Sheets недоступен: предохранитель разомкнут, запрос не отправлялся."""
+
+
+@dataclass
+class BreakerStats:
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened: int = 0              # сколько раз размыкался
+    rejected: int = 0            # запросов отклонено без обращения к Google
+    degraded_reads: int = 0      # адреса/товары отданы из снимка на диске
+    last_error: str | None = None
+    open_until: float | None = None    # time.time(), до которого не обращаемся
+
+
+def counts_as_outage(e: BaseException) -> bool:
+    """
+    Google недоступен: 429/5xx, таймаут, обрыв соединения, DNS, разомкнутый предохранитель.
+    Наши ошибки (400/403/404 — неверный диапазон, нет доступа) и ошибки в коде сюда не относятся.
+    """
+    if isinstance(e, HttpError):
+        return e.resp.status == 429 or e.resp.status >= 500
+    # TimeoutError и ConnectionError — подклассы OSError
+    if isinstance(e, (SheetsUnavailable, OSError)):
+        return True
+    # DNS: httplib2 грузится лениво вместе с клиентом Sheets — не загружен, значит и его ошибок быть не может
+    httplib2 = sys.modules.get("httplib2")
+    return httplib2 is not None and isinstance(e, httplib2.ServerNotFoundError)
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = SHEETS_BREAKER_FAILURES, cooldown: float = SHEETS_BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.stats = BreakerStats()
+        self._open_until = 0.0        # time.monotonic()
+        self._probing = False
+
+    @property
+    def open(self) -> bool:
+        """Разомкнут (включая ожидание пробного запроса) — пользователю показываем деградированный режим."""
+        return self.stats.state != CLOSED
+
+    def before(self) -> None:
+        """Перед запросом: SheetsUnavailable, если сейчас обращаться к Google не нужно."""
+        if self.stats.state == CLOSED:
+            return
+        if self._probing or time.monotonic() < self._open_until:
+            self.stats.rejected += 1
+            raise SheetsUnavailable(f"Google Sheets unavailable: {self.stats.last_error}")
+        # пауза прошла — пропускаем один пробный запрос
+        self.stats.state = HALF_OPEN
+        self._probing = True
+
+    def success(self) -> None:
+        if self.stats.state != CLOSED:
+            log.info("Sheets circuit closed: Google Sheets is reachable again")
+        self.stats.state = CLOSED
+        self.stats.consecutive_failures = 0
+        self.stats.open_until = None
+        self._probing = False
+
+    def failure(self, e: Exception) -> None:
+        if not counts_as_outage(e) or isinstance(e, SheetsUnavailable):
+            # Google ответил — значит доступен; пробный запрос тоже засчитываем как успешный
+            self.success()
+            return
+        self.stats.consecutive_failures += 1
+        self.stats.last_error = f"{type(e).__name__}: {e}"[:200]
+        if self.stats.state == HALF_OPEN or self.stats.consecutive_failures >= self.failures:
+            self._trip()
+
+    def abandoned(self) -> None:
+        """
+        Запрос отменён, не дождавшись ответа (wait_for в /health, прогрев, остановка).
+        Отменённый пробный запрос считается неудачным — иначе предохранитель навсегда остался бы
+        в half_open с занятым пробным местом и отклонял бы всё.
+        """
+        if not self._probing:
+            return
+        self.stats.consecutive_failures += 1
+        self.stats.last_error = "probe request cancelled"
+        self._trip()
+
+    def _trip(self) -> None:
+        if self.stats.state == CLOSED:
+            self.stats.opened += 1
+            log.error("Sheets circuit opened after %d failures, pausing for %.0fs: %s",
+                      self.stats.consecutive_failures, self.cooldown, self.stats.last_error)
+        self.stats.state = OPEN
+        self._probing = False
+        self._open_until = time.monotonic() + self.cooldown
+        self.stats.open_until = time.time() + self.cooldown
@@ -0,0 +1,152 @@
+# bulk.py
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from catalog import Catalog, normalize
+from sheets import ItemRow
+
+# Заказ списком: магазин вставляет сообщение вида
+#   Соевый соус 30 мл 20
+#   Наклейки — 100
+#   Майонез 3 кг x 6 шт
+# Последнее число в строке — количество, всё до него — название товара (нечёткое совпадение).
+
+MAX_LINES = 100
+MIN_SCORE = 0.5           # ниже — считаем, что товар не найден
+PREFIX_LEN = 3            # токены короче — только точное совпадение
+PREFIX_WEIGHT = 0.8       # вклад совпадения по префиксу против точного совпадения токена
+MAX_TIED = 16             # сколько равных по токенам кандидатов сравнивать посимвольно
+
+_LINE = re.compile(r"^(?P<name>.*?)\s*(?:[:=*×—–\-]|\s[xх])?\s*(?P<qty>\d+)\s*(?:шт|уп|кор|pcs)?\.?\s*$", re.IGNORECASE)
+
+
+@dataclass
+class BulkLine:
+    raw: str
+    qty: int | None = None
+    index: int | None = None          # индекс товара в каталоге
+    name: str | None = None
+    score: float = 0.0
+    problem: str | None = None
+
+
+@dataclass
+class BulkOrder:
+    catalog_id: int
+    lines: list[BulkLine] = field(default_factory=list)
+
+    @property
+    def valid(self) -> list[BulkLine]:
+        return [ln for ln in self.lines if ln.problem is None]
+
+    def totals(self) -> dict[int, int]:
+        """Индекс товара -> количество (повторы одного товара складываются)."""
+        out: dict[int, int] = {}
+        for ln in self.valid:
+            out[ln.index] = out.get(ln.index, 0) + ln.qty
+        return out
+
+
+class ItemMatcher:
+    """
+    Индекс названий одного каталога товаров: точное совпадение нормализованной строки,
+    иначе оценка Dice по токенам, посчитанная по инвертированному индексу "токен -> товары"
+    (перебираются только товары с общими токенами/префиксами). Строится один раз на версию каталога.
+    """
+
+    def __init__(self, catalog: Catalog[ItemRow]):
+        self.catalog = catalog
+        self.normalized = [normalize(n) for n in catalog.names]
+        self.tokens = [tuple(n.split()) for n in self.normalized]
+        self.exact: dict[str, int] = {}
+        self.by_token: dict[str, set[int]] = {}
+        self.by_prefix: dict[str, set[str]] = {}     # первые PREFIX_LEN символов -> токены словаря
+        for i, (norm, toks) in enumerate(zip(self.normalized, self.tokens)):
+            self.exact.setdefault(norm, i)
+            for t in toks:
+                self.by_token.setdefault(t, set()).add(i)
+                if len(t) >= PREFIX_LEN:
+                    self.by_prefix.setdefault(t[:PREFIX_LEN], set()).add(t)
+
+    def match(self, text: str) -> tuple[int | None, float]:
+        norm = normalize(text)
+        if not norm:
+            return None, 0.0
+        index = self.exact.get(norm)
+        if index is not None:
+            return index, 1.0
+
+        query = norm.split()
+        hits: dict[int, float] = {}
+        for q in query:
+            weights = dict.fromkeys(self.by_token.get(q, ()), 1.0)
+            if len(q) >= PREFIX_LEN:
+                # "соев" ~ "соевый", "майонез" ~ "майонезный"
+                for t in self.by_prefix.get(q[:PREFIX_LEN], ()):
+                    if t != q and (t.startswith(q) or q.startswith(t)):
+                        for i in self.by_token[t]:
+                            weights.setdefault(i, PREFIX_WEIGHT)
+            for i, w in weights.items():
+                hits[i] = hits.get(i, 0.0) + w
+
+        n = len(query)
+        scores = {i: 2 * h / (n + len(self.tokens[i])) for i, h in hits.items()}
+        best_score = max(scores.values(), default=0.0)
+        if best_score < MIN_SCORE:
+            return None, best_score
+        tied = [i for i, s in scores.items() if s == best_score]
+        if len(tied) == 1:
+            return tied[0], best_score
+        # равные по токенам — по похожести строк целиком (посимвольно только среди них)
+        return max(sorted(tied)[:MAX_TIED], key=lambda i: self._ratio(norm, i)), best_score
+
+    def _ratio(self, norm: str, index: int) -> float:
+        return SequenceMatcher(None, norm, self.normalized[index]).ratio()
+
+
+_matchers: OrderedDict[int, ItemMatcher] = OrderedDict()
+
+
+def matcher_for(catalog: Catalog[ItemRow]) -> ItemMatcher:
+    m = _matchers.get(catalog.id)
+    if m is None or m.catalog is not catalog:
+        m = _matchers[catalog.id] = ItemMatcher(catalog)
+        while len(_matchers) > 8:
+            _matchers.popitem(last=False)
+    return m
+
+
+def parse_order(text: str, catalog: Catalog[ItemRow], multiples: dict[str, int]) -> BulkOrder:
+    """Разбирает вставленный список: товар + количество в каждой строке, с проверкой кратности."""
+    matcher = matcher_for(catalog)
+    order = BulkOrder(catalog_id=catalog.id)
+    for raw in text.splitlines():
+        raw = raw.strip().lstrip("•-*·").strip()
+        if not raw:
+            continue
+        if len(order.lines) >= MAX_LINES:
+            order.lines.append(BulkLine(raw="…", problem=f"не больше {MAX_LINES} строк за раз"))
+            break
+
+        line = BulkLine(raw=raw)
+        order.lines.append(line)
+        m = _LINE.match(raw)
+        if m is None or not m["name"].strip():
+            line.problem = "нет количества в конце строки"
+            continue
+        line.qty = int(m["qty"])
+        line.index, line.score = matcher.match(m["name"])
+        if line.index is None:
+            line.problem = "товар не найден"
+            continue
+        line.name = catalog.names[line.index]
+        multiple = multiples.get(line.name, 1)
+        if line.qty <= 0:
+            line.problem = "количество должно быть больше 0"
+        elif line.qty % multiple:
+            line.problem = f"не кратно {multiple}"
+    return order
@@ -0,0 +1,101 @@
+# cache.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+log = logging.getLogger("cache")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0      # отдали свежее значение
+    misses: int = 0    # значения не было — ждали загрузку
+    stale: int = 0     # отдали просроченное значение, обновляем в фоне
+    loads: int = 0     # реальные обращения к источнику
+    errors: int = 0    # неудачные загрузки
+
+
+@dataclass
+class _Entry:
+    value: Any
+    loaded_at: float
+    invalidated: bool = False
+
+
+class AsyncTTLCache:
+    """
+    Кэш с TTL и объединением одновременных загрузок (single-flight):
+    - свежее значение отдаётся сразу;
+    - просроченное отдаётся как есть, а обновление идёт в фоне (одно на ключ);
+    - если значения нет, все одновременные запросы ждут одну и ту же загрузку.
+    maxsize — не больше стольких ключей, давно не запрошенные вытесняются.
+    """
+
+    def __init__(self, ttl: float, maxsize: int | None = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and not entry.invalidated:
+            self._entries.move_to_end(key)
+            if time.monotonic() - entry.loaded_at < self.ttl:
+                self.stats.hits += 1
+                return entry.value
+            self.stats.stale += 1
+            if key not in self._inflight:
+                fut = self._start_load(key, loader)
+                fut.add_done_callback(_log_background_error)
+            return entry.value
+
+        self.stats.misses += 1
+        fut = self._inflight.get(key) or self._start_load(key, loader)
+        return await asyncio.shield(fut)
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Закэшированное значение (в том числе просроченное) без загрузки; None, если нет или сброшено."""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None and not entry.invalidated else None
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Сбрасывает один ключ или весь кэш: следующий запрос дождётся свежей загрузки."""
+        if key is None:
+            for entry in self._entries.values():
+                entry.invalidated = True
+        elif key in self._entries:
+            self._entries[key].invalidated = True
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        fut = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = fut
+        return fut
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            self.stats.loads += 1
+            value = await loader()
+        except Exception:
+            self.stats.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self._entries[key] = _Entry(value=value, loaded_at=time.monotonic())
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+
+def _log_background_error(fut: asyncio.Future) -> None:
+    if not fut.cancelled() and fut.exception() is not None:
+        log.warning("Background cache refresh failed: %s", fut.exception())
@@ -0,0 +1,148 @@
+# callbacks.py
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+# Telegram ограничивает callback_data 64 байтами (UTF-8), поэтому в кнопки
+# кладём не названия товаров/адресов, а короткий код действия и аргументы:
+#   <код действия><арг>.<арг>...
+# Аргументы:
+#   - int           -> base36 ("12" -> "c")
+#   - короткий ASCII -> "'" + строка  ("RC" -> "'RC")
+#   - прочие строки  -> "~" + токен из серверной таблицы токенов
+# Магазины и товары передаются индексом в закэшированном каталоге + версией каталога.
+
+MAX_CALLBACK_BYTES = 64
+
+ACTIONS: dict[str, str] = {
+    "create_order": "c",
+    "otype": "o",
+    "subtype": "t",
+    "storecol": "s",
+    "store_page": "g",
+    "ddate": "d",
+    "item": "i",
+    "qty": "q",
+    "show_items": "l",
+    "finish": "f",
+    "back": "b",
+    "bulk": "p",
+    "bulk_apply": "a",
+    "my_order": "m",
+}
+_CODE_TO_ACTION = {code: action for action, code in ACTIONS.items()}
+
+_SAFE_STR = re.compile(r"[A-Za-z0-9_\-]{1,24}")
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+Arg = int | str
+
+
+def _b36(n: int) -> str:
+    if n < 0:
+        return "-" + _b36(-n)
+    if n < 36:
+        return _DIGITS[n]
+    out = []
+    while n:
+        n, r = divmod(n, 36)
+        out.append(_DIGITS[r])
+    return "".join(reversed(out))
+
+
+class TokenTable:
+    """Серверная таблица "токен -> строка" для аргументов, которые нельзя передать в кнопке как есть."""
+
+    def __init__(self, maxsize: int = 50_000):
+        self.maxsize = maxsize
+        self._by_token: OrderedDict[str, str] = OrderedDict()
+        self._by_value: dict[str, str] = {}
+        self._seq = 0
+
+    def token(self, value: str) -> str:
+        tok = self._by_value.get(value)
+        if tok is not None:
+            self._by_token.move_to_end(tok)
+            return tok
+        self._seq += 1
+        tok = _b36(self._seq)
+        self._by_token[tok] = value
+        self._by_value[value] = tok
+        if len(self._by_token) > self.maxsize:
+            old_tok, old_value = self._by_token.popitem(last=False)
+            del self._by_value[old_value]
+        return tok
+
+    def resolve(self, tok: str) -> str | None:
+        return self._by_token.get(tok)
+
+
+tokens = TokenTable()
+
+
+class StaleCallback(Exception):
+    """Кнопка ссылается на то, чего уже нет (устаревший токен / неизвестный код)."""
+
+
+def encode(action: str, *args: Arg) -> str:
+    parts = []
+    for a in args:
+        if isinstance(a, int):
+            parts.append(_b36(a))
+        elif _SAFE_STR.fullmatch(a):
+            parts.append("'" + a)
+        else:
+            parts.append("~" + tokens.token(a))
+    data = ACTIONS[action] + ".".join(parts)
+    if len(data.encode("utf-8")) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data too long: {data!r}")
+    return data
+
+
+def decode(data: str) -> tuple[str, list[Arg]]:
+    if not data:
+        raise StaleCallback("empty callback_data")
+    action = _CODE_TO_ACTION.get(data[0])
+    if action is None:
+        raise StaleCallback(f"unknown action code {data[0]!r}")
+    args: list[Arg] = []
+    if len(data) > 1:
+        for part in data[1:].split("."):
+            if part[:1] == "'":
+                args.append(part[1:])
+            elif part[:1] == "~":
+                value = tokens.resolve(part[1:])
+                if value is None:
+                    raise StaleCallback(f"unknown token {part!r}")
+                args.append(value)
+            else:
+                args.append(int(part, 36))
+    return action, args
+
+
+Handler = Callable[..., Awaitable[None]]
+
+
+class Dispatcher:
+    """Таблица "действие -> обработчик" вместо цепочки if/elif."""
+
+    def __init__(self):
+        self.handlers: dict[str, Handler] = {}
+
+    def on(self, action: str) -> Callable[[Handler], Handler]:
+        if action not in ACTIONS:
+            raise KeyError(action)
+
+        def register(fn: Handler) -> Handler:
+            self.handlers[action] = fn
+            return fn
+        return register
+
+    def resolve(self, data: str) -> tuple[str, Handler, list[Arg]]:
+        action, args = decode(data)
+        handler = self.handlers.get(action)
+        if handler is None:
+            raise StaleCallback(f"no handler for {action!r}")
+        return action, handler, args
@@ -0,0 +1,82 @@
+# catalog.py
+from __future__ import annotations
+
+import re
+import sys
+import zlib
+from collections import OrderedDict
+from typing import Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Сколько последних версий каталога одного шаблона держать, чтобы сессии и кнопки,
+# открытые до обновления шаблона, ещё могли разрешить свои индексы
+KEEP_VERSIONS = 4
+
+
+class Catalog(Generic[T]):
+    """
+    Неизменяемый список адресов или товаров одного шаблона.
+    Один объект на версию на весь процесс; в user_data и кнопках хранится только его id.
+    id — crc32 от содержимого, поэтому после рестарта тот же каталог получает тот же id.
+    """
+
+    __slots__ = ("id", "kind", "entries", "names")
+
+    def __init__(self, id: int, kind: str, entries: tuple[T, ...], names: tuple[str, ...]):
+        self.id = id
+        self.kind = kind
+        self.entries = entries
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index: int) -> T:
+        return self.entries[index]
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.entries)
+
+    def __repr__(self) -> str:
+        return f"Catalog(id={self.id}, kind={self.kind!r}, size={len(self.entries)})"
+
+
+_by_id: dict[int, Catalog] = {}
+_versions: dict[tuple, OrderedDict[int, Catalog]] = {}
+
+
+def intern_catalog(kind: str, key: tuple, entries: tuple[T, ...], names: tuple[str, ...]) -> Catalog[T]:
+    """
+    Возвращает общий объект каталога для этого содержимого: если такой уже есть —
+    тот же самый, иначе регистрирует новую версию.
+    """
+    names = tuple(sys.intern(n) for n in names)
+    cid = zlib.crc32(repr((kind, key, entries)).encode("utf-8"))
+
+    existing = _by_id.get(cid)
+    if existing is not None and existing.names == names and existing.entries == entries:
+        return existing
+
+    catalog = Catalog(cid, kind, entries, names)
+    _by_id[cid] = catalog
+    versions = _versions.setdefault(key, OrderedDict())
+    versions[cid] = catalog
+    while len(versions) > KEEP_VERSIONS:
+        old_id, _ = versions.popitem(last=False)
+        _by_id.pop(old_id, None)
+    return catalog
+
+
+_TOKEN = re.compile(r"\d+|[a-zа-я]+")   # "1л" -> "1 л"
+
+
+def normalize(text: str) -> str:
+    """Строка для поиска: нижний регистр, ё -> е, только буквы и числа через пробел."""
+    return " ".join(_TOKEN.findall(text.lower().replace("ё", "е")))
+
+
+def get_catalog(catalog_id: int | None) -> Catalog | None:
+    if catalog_id is None:
+        return None
+    return _by_id.get(catalog_id)
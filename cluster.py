@@ -0,0 +1,194 @@
+# cluster.py
+from __future__ import annotations
+
+import os
+import zlib
+import fcntl
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+log = logging.getLogger("cluster")
+
+# Несколько процессов uvicorn (BOT_WORKERS > 1, см. main.py).
+# - каждый процесс при старте занимает свободный слот 0..N-1 (flock на файл слота);
+#   слот 0 — ведущий: ставит вебхук и гоняет фоновые задачи;
+# - апдейт обрабатывает процесс-владелец чата (chat_id % N): кто принял вебхук от Telegram,
+#   тот пересылает тело апдейта владельцу через unix-сокет. Так порядок внутри чата
+#   и сессия пользователя остаются в одном процессе;
+# - межпроцессные блокировки (создание листа на дату) — flock на файлы в BOT_RUN_DIR.
+BOT_WORKERS = max(1, int(os.getenv("BOT_WORKERS", "1")))
+BOT_RUN_DIR = os.getenv("BOT_RUN_DIR", os.path.join(tempfile.gettempdir(), "uppetit-bot"))
+FORWARD_TIMEOUT_SECONDS = float(os.getenv("FORWARD_TIMEOUT_SECONDS", "5"))
+
+# Типы сообщений между процессами
+MSG_UPDATE = b"U"       # тело апдейта Telegram (JSON)
+MSG_RELOAD = b"R"       # сбросить кэш каталогов (/reload на другом процессе)
+
+_OK, _REJECTED = b"\x01", b"\x00"
+
+Handler = Callable[[bytes, bytes], Awaitable[bool]]
+
+
+@dataclass
+class ClusterStats:
+    slot: int | None = None
+    workers: int = 1
+    leader: bool = False
+    forwarded: int = 0          # отправлено владельцам
+    forward_failed: int = 0     # владелец недоступен / отказал (вебхук ответит 503, Telegram повторит)
+    received: int = 0           # принято от других процессов
+
+
+def _path(name: str) -> str:
+    os.makedirs(BOT_RUN_DIR, exist_ok=True)
+    return os.path.join(BOT_RUN_DIR, name)
+
+
+def chat_id_of(data: dict) -> int:
+    """Чат апдейта по сырому JSON (без Update.de_json) — для выбора процесса-владельца."""
+    for field, obj in data.items():
+        if not isinstance(obj, dict):
+            continue
+        chat = (obj.get("message") or {}).get("chat") if field == "callback_query" else obj.get("chat")
+        if chat:
+            return chat["id"]
+        if obj.get("from"):
+            return obj["from"]["id"]
+    return data.get("update_id", 0)
+
+
+class Cluster:
+    def __init__(self, workers: int = BOT_WORKERS):
+        self.workers = workers
+        self.stats = ClusterStats(workers=workers)
+        self._slot_fd: int | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._handler: Handler | None = None
+        self._conns: dict[int, tuple[asyncio.StreamReader, asyncio.StreamWriter]] = {}
+        self._conn_locks: dict[int, asyncio.Lock] = {}
+
+    @property
+    def slot(self) -> int | None:
+        return self.stats.slot
+
+    @property
+    def leader(self) -> bool:
+        return self.stats.leader
+
+    def claim_slot(self) -> int:
+        """Занимает первый свободный слот. Слот освобождается сам, когда процесс умирает."""
+        if self.workers == 1:
+            self.stats.slot, self.stats.leader = 0, True
+            return 0
+        for slot in range(self.workers):
+            fd = os.open(_path(f"worker-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            self._slot_fd = fd
+            self.stats.slot, self.stats.leader = slot, slot == 0
+            log.info("Worker pid=%d took slot %d/%d%s", os.getpid(), slot, self.workers,
+                     " (leader)" if slot == 0 else "")
+            return slot
+        raise RuntimeError(f"All {self.workers} worker slots are taken (BOT_WORKERS too small?)")
+
+    def owner(self, data: dict) -> int:
+        return chat_id_of(data) % self.workers
+
+    async def start(self, handler: Handler) -> None:
+        """Слушает сообщения от других процессов (только при BOT_WORKERS > 1)."""
+        self._handler = handler
+        if self.workers == 1:
+            return
+        path = _path(f"worker-{self.slot}.sock")
+        if os.path.exists(path):
+            os.unlink(path)   # остался от упавшего процесса; слот наш — сокет тоже
+        self._server = await asyncio.start_unix_server(self._serve, path=path)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for _, writer in self._conns.values():
+            writer.close()
+        self._conns.clear()
+        if self._slot_fd is not None:
+            os.close(self._slot_fd)
+            self._slot_fd = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # кадр: тип (1 байт) + длина (4 байта) + данные; ответ — 1 байт (принято / отказ)
+        try:
+            while True:
+                head = await reader.readexactly(5)
+                payload = await reader.readexactly(int.from_bytes(head[1:], "big"))
+                self.stats.received += 1
+                ok = await self._handler(head[:1], payload)
+                writer.write(_OK if ok else _REJECTED)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def forward(self, slot: int, kind: bytes, payload: bytes) -> bool:
+        """Отправляет сообщение процессу slot; False — не доставлено или отклонено."""
+        frame = kind + len(payload).to_bytes(4, "big") + payload
+        lock = self._conn_locks.setdefault(slot, asyncio.Lock())
+        async with lock:
+            # одна попытка переподключиться: соединение могло остаться от перезапущенного процесса
+            for attempt in (1, 2):
+                try:
+                    conn = self._conns.get(slot)
+                    if conn is None:
+                        conn = self._conns[slot] = await asyncio.open_unix_connection(_path(f"worker-{slot}.sock"))
+                    reader, writer = conn
+                    writer.write(frame)
+                    await writer.drain()
+                    reply = await asyncio.wait_for(reader.readexactly(1), FORWARD_TIMEOUT_SECONDS)
+                    self.stats.forwarded += 1
+                    return reply == _OK
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    self._drop(slot)
+                    if attempt == 2:
+                        log.warning("Worker %s unreachable: %s", slot, e)
+                except asyncio.TimeoutError:
+                    self._drop(slot)
+                    log.warning("Worker %s did not answer in %.0fs", slot, FORWARD_TIMEOUT_SECONDS)
+                    break
+        self.stats.forward_failed += 1
+        return False
+
+    async def broadcast(self, kind: bytes, payload: bytes = b"") -> None:
+        await asyncio.gather(*(self.forward(s, kind, payload) for s in range(self.workers) if s != self.slot))
+
+    def _drop(self, slot: int) -> None:
+        conn = self._conns.pop(slot, None)
+        if conn is not None:
+            conn[1].close()
+
+
+@asynccontextmanager
+async def interprocess_lock(name: str, poll: float = 0.05):
+    """Блокировка между процессами (flock). При одном процессе ничего не делает."""
+    if BOT_WORKERS == 1:
+        yield
+        return
+    fd = os.open(_path(f"lock-{zlib.crc32(name.encode('utf-8')):08x}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(poll)
+        yield
+    finally:
+        os.close(fd)   # закрытие снимает flock
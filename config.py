@@ -83,6 +83,13 @@ FREEZE_LAYOUT = MatrixLayout(
 )
 
 
+# Тип заказа -> раскладка (он же префикс листа на дату: RC_YYYY-MM-DD / FREEZE_YYYY-MM-DD)
+LAYOUTS: dict[str, MatrixLayout] = {
+    "RC": RC_LAYOUT,
+    "FREEZE": FREEZE_LAYOUT,
+}
+
+
 # ====== 4) КРАТНОСТИ (на старте словарём; позже можно вынести в отдельный лист) ======
 # Ключ = точное имя товара как в таблице. Значение = кратность (1, 6, 12...)
 RC_MULTIPLES: dict[str, int] = {
@@ -1,5 +1,6 @@
 # dates.py
 from __future__ import annotations
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import datetime, timedelta, date, time
 from zoneinfo import ZoneInfo
@@ -19,22 +20,165 @@ def _deadline_dt(d: date) -> datetime:
     return datetime.combine(d, time(DEADLINE_HOUR, DEADLINE_MINUTE), tzinfo=TZ)
 
 
-def next_tuesday(d: date) -> date:
-    # 0=Mon ... 1=Tue
-    days_ahead = (1 - d.weekday()) % 7
-    return d + timedelta(days=days_ahead)
+def _next_weekday(d: date, weekday: int) -> date:
+    return d + timedelta(days=(weekday - d.weekday()) % 7)
 
 
-def next_thursday(d: date) -> date:
-    # 3=Thu
-    days_ahead = (3 - d.weekday()) % 7
-    return d + timedelta(days=days_ahead)
+# ===== Правила доставки =====
+# Вместо веток под каждый тип заказа — таблица правил. Правило компилируется в
+# отсортированный массив окон на скользящий горизонт, и выбор дат по `now` — это bisect.
 
+@dataclass(frozen=True)
+class WeeklySlot:
+    weekday: int        # день доставки: 0=ПН ... 6=ВС
+    lead_days: int      # дедлайн = день доставки - lead_days, в DEADLINE_HOUR:DEADLINE_MINUTE
+    label: str          # "ВТ" / "ЧТ" / "ПТ"
+
+
+@dataclass(frozen=True)
+class WeeklyRule:
+    """Ближайшие доставки по дням недели; если все окна закрыты — первый слот через неделю."""
+    slots: tuple[WeeklySlot, ...]
+    limit: int = 2
+
+
+@dataclass(frozen=True)
+class OffsetRule:
+    """Доставка через фиксированное число дней от сегодня."""
+    days: int
+    label: str          # шаблон подписи, {date} — дата доставки
+
+
+Rule = WeeklyRule | OffsetRule
+
+ANY_SUBTYPE = "*"
+
+RULES: dict[tuple[str, str], Rule] = {
+    # RC subtype 1: дедлайны ВС и СР, доставки ВТ и ЧТ
+    ("RC", "RC_1"): WeeklyRule(slots=(WeeklySlot(weekday=1, lead_days=2, label="ВТ"),
+                                      WeeklySlot(weekday=3, lead_days=1, label="ЧТ"))),
+    # RC subtype 2: дедлайн ВС, доставка ПТ, иначе следующая ПТ
+    ("RC", "RC_2"): WeeklyRule(slots=(WeeklySlot(weekday=4, lead_days=5, label="ПТ"),)),
+    # FREEZE: дедлайн ВС всегда (день доставки ты уточнишь)
+    # TODO: уточни день доставки по заморозке (например СР/ЧТ/ПТ)
+    # Пока просто даём выбрать "следующую дату" = +2 дня, но позже заменим
+    ("FREEZE", ANY_SUBTYPE): OffsetRule(days=2, label="Доставка: {date} (временная логика)"),
+}
+
+FALLBACK_RULE = OffsetRule(days=0, label="Доставка: {date} (fallback)")
 
-def next_friday(d: date) -> date:
-    # 4=Fri
-    days_ahead = (4 - d.weekday()) % 7
-    return d + timedelta(days=days_ahead)
+# На сколько дней вперёд компилируются окна; за горизонтом календарь пересобирается
+CALENDAR_HORIZON_DAYS = 35
+
+_ONE_US = timedelta(microseconds=1)
+
+
+def _rule_for(order_type: str, subtype: str | None) -> Rule:
+    return RULES.get((order_type, subtype)) or RULES.get((order_type, ANY_SUBTYPE)) or FALLBACK_RULE
+
+
+def _evaluate(rule: Rule, now: datetime) -> tuple[DeliveryOption, ...]:
+    """Эталонный расчёт дат на момент now — используется только при компиляции календаря."""
+    today = now.date()
+
+    if isinstance(rule, OffsetRule):
+        delivery = today + timedelta(days=rule.days)
+        return (DeliveryOption(label=rule.label.format(date=delivery.isoformat()), delivery_date=delivery),)
+
+    options: list[DeliveryOption] = []
+    for slot in rule.slots:
+        delivery = _next_weekday(today, slot.weekday)
+        if now <= _deadline_dt(delivery - timedelta(days=slot.lead_days)):
+            options.append(DeliveryOption(label=f"Ближайшая доставка: {slot.label} {delivery.isoformat()}",
+                                          delivery_date=delivery))
+
+    # Если все окна закрыты — уходим на следующую неделю
+    if not options:
+        first = rule.slots[0]
+        delivery = _next_weekday(today + timedelta(days=7), first.weekday)
+        options.append(DeliveryOption(label=f"Следующая доставка: {first.label} {delivery.isoformat()}",
+                                      delivery_date=delivery))
+
+    return tuple(options[:rule.limit])
+
+
+class DeliveryCalendar:
+    """
+    Правило, скомпилированное в окна [start, следующий start) с готовым набором опций.
+    Границы окон — полночи и моменты сразу после дедлайнов.
+    """
+
+    __slots__ = ("rule", "starts", "options", "horizon_start", "horizon_end")
+
+    def __init__(self, rule: Rule, first_day: date, days: int = CALENDAR_HORIZON_DAYS):
+        self.rule = rule
+        self.horizon_start = datetime.combine(first_day, time(0, 0), tzinfo=TZ)
+        self.horizon_end = datetime.combine(first_day + timedelta(days=days), time(0, 0), tzinfo=TZ)
+
+        boundaries: set[datetime] = set()
+        for i in range(days):
+            d = first_day + timedelta(days=i)
+            boundaries.add(datetime.combine(d, time(0, 0), tzinfo=TZ))
+            if isinstance(rule, WeeklyRule):
+                # дедлайн включительно: окно закрывается через 1 мкс после него
+                boundaries.add(_deadline_dt(d) + _ONE_US)
+
+        starts: list[datetime] = []
+        options: list[tuple[DeliveryOption, ...]] = []
+        for b in sorted(boundaries):
+            if b >= self.horizon_end:
+                break
+            opts = _evaluate(rule, b)
+            if options and options[-1] == opts:
+                continue
+            starts.append(b)
+            options.append(opts)
+        self.starts = starts
+        self.options = options
+
+    def covers(self, now: datetime) -> bool:
+        return self.horizon_start <= now < self.horizon_end
+
+    def lookup(self, now: datetime) -> tuple[DeliveryOption, ...]:
+        return self.options[bisect_right(self.starts, now) - 1]
+
+
+_calendars: dict[Rule, DeliveryCalendar] = {}
+
+
+def _calendar(rule: Rule, now: datetime) -> DeliveryCalendar:
+    cal = _calendars.get(rule)
+    if cal is None or not cal.covers(now):
+        cal = DeliveryCalendar(rule, now.date())
+        _calendars[rule] = cal
+    return cal
+
+
+def compile_calendars(now: datetime | None = None) -> None:
+    """Компилирует календари всех правил заранее (при старте приложения)."""
+    now = now.astimezone(TZ) if now else datetime.now(TZ)
+    for rule in (*RULES.values(), FALLBACK_RULE):
+        _calendar(rule, now)
+
+
+def upcoming_delivery_dates(order_type: str, subtype: str | None, days: int = 7, now: datetime | None = None) -> list[date]:
+    """
+    Все даты доставки, которые будут предложены в ближайшие `days` дней
+    (по тем же правилам, что и available_delivery_dates) — для заблаговременной подготовки листов.
+    """
+    now = now.astimezone(TZ) if now else datetime.now(TZ)
+    until = now + timedelta(days=days)
+    rule = _rule_for(order_type, subtype)
+    cal = _calendar(rule, now)
+    if not cal.covers(until):
+        cal = DeliveryCalendar(rule, now.date(), days=max(CALENDAR_HORIZON_DAYS, days + 1))
+
+    first = bisect_right(cal.starts, now) - 1
+    last = bisect_right(cal.starts, until)
+    out: set[date] = set()
+    for opts in cal.options[first:last]:
+        out.update(o.delivery_date for o in opts)
+    return sorted(out)
 
 
 def available_delivery_dates(order_type: str, subtype: str | None, now: datetime | None = None) -> list[DeliveryOption]:
@@ -46,56 +190,5 @@ def available_delivery_dates(order_type: str, subtype: str | None, now: datetime
       - для FREEZE пока можно None
     """
     now = now.astimezone(TZ) if now else datetime.now(TZ)
-    today = now.date()
-
-    # ===== RC subtype 1: дедлайны ВС и СР, доставки ВТ и ЧТ =====
-    if order_type == "RC" and subtype == "RC_1":
-        # Дедлайн на ближайший вторник: воскресенье (перед этой неделей)
-        # Удобно считать так: определим "вторник этой логистической недели"
-        tuesday = next_tuesday(today)
-        # воскресенье перед этим вторником = tuesday - 2 дня
-        sunday_before_tuesday = tuesday - timedelta(days=2)
-
-        thursday = next_thursday(today)
-        # среда перед четвергом = thursday - 1 день
-        wednesday_before_thursday = thursday - timedelta(days=1)
-
-        options: list[DeliveryOption] = []
-
-        # Окно на вторник (если сейчас до дедлайна воскресенья)
-        if now <= _deadline_dt(sunday_before_tuesday):
-            options.append(DeliveryOption(label=f"Ближайшая доставка: ВТ {tuesday.isoformat()}", delivery_date=tuesday))
-        # Окно на четверг (если сейчас до дедлайна среды)
-        if now <= _deadline_dt(wednesday_before_thursday):
-            options.append(DeliveryOption(label=f"Ближайшая доставка: ЧТ {thursday.isoformat()}", delivery_date=thursday))
-
-        # Если оба окна закрыты — уходим на следующую неделю (вторник)
-        if not options:
-            next_week_tuesday = next_tuesday(today + timedelta(days=7))
-            options.append(DeliveryOption(label=f"Следующая доставка: ВТ {next_week_tuesday.isoformat()}", delivery_date=next_week_tuesday))
-
-        # Можно добавить 2-ю опцию "следующая после ближайшей", если нужно
-        return options[:2]
-
-    # ===== RC subtype 2: дедлайн ВС, доставка ПТ, иначе следующая ПТ =====
-    if order_type == "RC" and subtype == "RC_2":
-        friday = next_friday(today)
-
-        # дедлайн = воскресенье перед этой пятницей
-        sunday_before_friday = friday - timedelta(days=5)  # ПТ-5 = ВС
-
-        if now <= _deadline_dt(sunday_before_friday):
-            return [DeliveryOption(label=f"Ближайшая доставка: ПТ {friday.isoformat()}", delivery_date=friday)]
-        else:
-            next_week_friday = next_friday(today + timedelta(days=7))
-            return [DeliveryOption(label=f"Следующая доставка: ПТ {next_week_friday.isoformat()}", delivery_date=next_week_friday)]
-
-    # ===== FREEZE: дедлайн ВС всегда (день доставки ты уточнишь) =====
-    if order_type == "FREEZE":
-        # TODO: уточни день доставки по заморозке (например СР/ЧТ/ПТ)
-        # Пока просто даём выбрать "следующую дату" = +2 дня, но позже заменим
-        delivery = today + timedelta(days=2)
-        return [DeliveryOption(label=f"Доставка: {delivery.isoformat()} (временная логика)", delivery_date=delivery)]
-
-    # fallback
-    return [DeliveryOption(label=f"Доставка: {today.isoformat()} (fallback)", delivery_date=today)]
+    rule = _rule_for(order_type, subtype)
+    return list(_calendar(rule, now).lookup(now))
@@ -0,0 +1,58 @@
+# dedup.py
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+# Повторы, которые не должны второй раз доходить до обработчиков и до таблицы:
+# - Telegram повторяет доставку вебхука, если мы ответили не сразу, — тот же update_id;
+# - двойное нажатие кнопки на плохой связи — разные callback-запросы, но та же кнопка того же сообщения.
+UPDATE_DEDUP_SECONDS = float(os.getenv("UPDATE_DEDUP_SECONDS", "600"))
+CALLBACK_DEDUP_SECONDS = float(os.getenv("CALLBACK_DEDUP_SECONDS", "3"))
+DEDUP_MAX_KEYS = 20_000
+
+
+@dataclass
+class DedupStats:
+    updates: int = 0       # повторно доставленных апдейтов отброшено
+    callbacks: int = 0     # повторных нажатий отброшено
+
+
+class RecentKeys:
+    """Ограниченное множество недавно виденных ключей: LRU по размеру + TTL на каждый ключ."""
+
+    def __init__(self, ttl: float, maxsize: int = DEDUP_MAX_KEYS):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._expires: OrderedDict[Hashable, float] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        expires = self._expires.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._expires[key]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def add(self, key: Hashable) -> None:
+        self._expires[key] = time.monotonic() + self.ttl
+        self._expires.move_to_end(key)
+        while len(self._expires) > self.maxsize:
+            self._expires.popitem(last=False)
+
+    def seen(self, key: Hashable) -> bool:
+        """True — ключ уже был (повтор); иначе запоминает его."""
+        if key in self:
+            return True
+        self.add(key)
+        return False
+
+    def discard(self, key: Hashable) -> None:
+        self._expires.pop(key, None)
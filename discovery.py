@@ -0,0 +1,77 @@
+# discovery.py
+from __future__ import annotations
+
+import os
+import json
+import functools
+
+# Discovery-документ Sheets API лежит в репозитории (sheets_v4_discovery.json), урезанный до методов,
+# которые вызывает бот: build() не ищет его в пакете googleapiclient и не ходит за ним в сеть,
+# а без описаний и схем создание ресурсов (service.spreadsheets().values()) не строит огромные docstring'и.
+# Пересобрать после обновления google-api-python-client или при новом методе в sheets.py:
+#   python discovery.py
+DOCUMENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sheets_v4_discovery.json")
+
+# ресурс -> методы, которые нужны sheets.py
+USED_METHODS: dict[str, tuple[str, ...]] = {
+    "spreadsheets": ("get", "batchUpdate"),
+    "spreadsheets.values": ("get", "batchGet", "update", "batchUpdate"),
+    "spreadsheets.sheets": ("copyTo",),
+}
+
+# поля документа, без которых googleapiclient собирает клиент и запросы
+_ROOT_KEYS = ("kind", "discoveryVersion", "id", "name", "version", "rootUrl", "servicePath", "baseUrl",
+              "batchPath", "mtlsRootUrl", "protocol", "parameters", "auth")
+_METHOD_KEYS = ("id", "path", "flatPath", "httpMethod", "parameters", "parameterOrder", "request", "response",
+                "scopes", "supportsMediaUpload", "mediaUpload")
+_PARAM_KEYS = ("type", "location", "required", "repeated", "enum", "format", "pattern", "default")
+
+
+@functools.cache
+def sheets_document() -> str:
+    """Текст документа (build_from_document сам разбирает его один раз на клиент)."""
+    with open(DOCUMENT_PATH, encoding="utf-8") as f:
+        return f.read()
+
+
+def _params(params: dict) -> dict:
+    return {name: {k: v for k, v in p.items() if k in _PARAM_KEYS} for name, p in params.items()}
+
+
+def trim(doc: dict) -> dict:
+    """Оставляет только USED_METHODS; схемы тел запросов/ответов — пустые объекты (нужны только имена)."""
+    out = {k: doc[k] for k in _ROOT_KEYS if k in doc}
+    out["parameters"] = _params(doc.get("parameters", {}))
+    out["schemas"] = {}
+    out["resources"] = {}
+    for path, methods in USED_METHODS.items():
+        src, dst = doc, out
+        for name in path.split("."):
+            src = src["resources"][name]
+            dst = dst["resources"].setdefault(name, {"resources": {}})
+        dst["methods"] = {}
+        for m in methods:
+            desc = {k: v for k, v in src["methods"][m].items() if k in _METHOD_KEYS}
+            desc["parameters"] = _params(desc.get("parameters", {}))
+            for part in ("request", "response"):
+                ref = desc.get(part, {}).get("$ref")
+                if ref:
+                    out["schemas"][ref] = {"id": ref, "type": "object"}
+            dst["methods"][m] = desc
+    return out
+
+
+def _vendor() -> None:
+    import googleapiclient
+
+    src = os.path.join(os.path.dirname(googleapiclient.__file__), "discovery_cache", "documents", "sheets.v4.json")
+    with open(src, encoding="utf-8") as f:
+        doc = json.load(f)
+    with open(DOCUMENT_PATH, "w", encoding="utf-8") as f:
+        json.dump(trim(doc), f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+    print(f"{src} ({doc.get('revision')}) -> {DOCUMENT_PATH}")
+
+
+if __name__ == "__main__":
+    _vendor()
@@ -0,0 +1,361 @@
+# fakes.py
+"""
+Локальные заглушки Google Sheets и Telegram Bot API для бенчмарков (bench.py)
+и запуска без внешних сервисов (FAKE_BACKENDS=1).
+
+FakeSheetsService реализует ровно те вызовы, что делает sheets.py:
+spreadsheets.get, values.get / batchGet / update / batchUpdate, sheets.copyTo, batchUpdate.
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import random
+import socket
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Callable
+
+import httplib2
+from googleapiclient.errors import HttpError
+from telegram.request import BaseRequest, RequestData
+
+from config import LAYOUTS, MatrixLayout
+
+# Параметры для FAKE_BACKENDS=1 (см. main.py) и bench.py flow
+FAKE_STORES = int(os.getenv("FAKE_STORES", "30"))
+FAKE_SHEETS_LATENCY = float(os.getenv("FAKE_SHEETS_LATENCY", "0.05"))
+FAKE_SHEETS_ERROR_RATE = float(os.getenv("FAKE_SHEETS_ERROR_RATE", "0"))
+# host:port — исходящие вызовы fake Telegram уходят туда UDP-датаграммами (bench.py workers)
+FAKE_TELEGRAM_SINK = os.getenv("FAKE_TELEGRAM_SINK", "")
+
+_A1 = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def _col_to_index(col: str) -> int:
+    n = 0
+    for ch in col:
+        n = n * 26 + (ord(ch) - ord("A") + 1)
+    return n
+
+
+def _parse_range(a1: str) -> tuple[str, int, int, int, int]:
+    """'Лист!C5:D7' -> (лист, row1, col1, row2, col2)."""
+    title, _, cells = a1.rpartition("!")
+    start, _, end = cells.partition(":")
+    m1, m2 = _A1.match(start), _A1.match(end or start)
+    return title, int(m1[2]), _col_to_index(m1[1]), int(m2[2]), _col_to_index(m2[1])
+
+
+class FakeSpreadsheet:
+    def __init__(self, spreadsheet_id: str):
+        self.spreadsheet_id = spreadsheet_id
+        self.sheets: dict[str, dict[tuple[int, int], Any]] = {}   # title -> {(row, col): value}
+        self.sheet_ids: dict[str, int] = {}
+        self._next_id = 1
+
+    def add_sheet(self, title: str, cells: dict[tuple[int, int], Any]) -> int:
+        self.sheets[title] = dict(cells)
+        self.sheet_ids[title] = self._next_id
+        self._next_id += 1
+        return self.sheet_ids[title]
+
+    def title_of(self, sheet_id: int) -> str:
+        return next(t for t, i in self.sheet_ids.items() if i == sheet_id)
+
+    def read(self, a1: str, major: str) -> dict:
+        title, r1, c1, r2, c2 = _parse_range(a1)
+        cells = self.sheets[title]
+        if major == "COLUMNS":
+            values = [[cells.get((r, c), "") for r in range(r1, r2 + 1)] for c in range(c1, c2 + 1)]
+        else:
+            values = [[cells.get((r, c), "") for c in range(c1, c2 + 1)] for r in range(r1, r2 + 1)]
+        # как и настоящий API: хвостовые пустые ячейки и строки не возвращаются
+        values = [[str(v) for v in _rstrip(row)] for row in values]
+        return {"range": a1, "majorDimension": major, "values": _rstrip(values)}
+
+    def write(self, a1: str, values: list[list[Any]]) -> None:
+        title, r1, c1, _, _ = _parse_range(a1)
+        cells = self.sheets[title]
+        for i, row in enumerate(values):
+            for j, v in enumerate(row):
+                cells[(r1 + i, c1 + j)] = v
+
+
+def _rstrip(seq: list) -> list:
+    end = len(seq)
+    while end and seq[end - 1] in ("", []):
+        end -= 1
+    return seq[:end]
+
+
+class FakeRequest:
+    """Аналог googleapiclient.http.HttpRequest: method / methodId / execute()."""
+
+    def __init__(self, service: "FakeSheetsService", method_id: str, http_method: str, fn: Callable[[], Any]):
+        self.service = service
+        self.methodId = method_id
+        self.method = http_method
+        self._fn = fn
+
+    def execute(self, http=None, num_retries: int = 0):
+        return self.service._execute(self)
+
+
+class FakeSheetsService:
+    """
+    In-process Google Sheets: задержка (latency ± jitter) и доля ответов 429 настраиваются.
+    Вызовы выполняются в потоках пула sheets.py, поэтому задержка — обычный time.sleep.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.books: dict[str, FakeSpreadsheet] = {}
+        self.calls: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _execute(self, request: FakeRequest):
+        name = request.methodId.removeprefix("sheets.spreadsheets.")
+        delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.calls[name] += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors[name] += 1
+                raise HttpError(httplib2.Response({"status": 429}), b'{"error": {"code": 429}}', uri=name)
+            return request._fn()
+
+    # --- API, как у googleapiclient ---
+    def spreadsheets(self):
+        return _Spreadsheets(self)
+
+    def book(self, spreadsheet_id: str) -> FakeSpreadsheet:
+        return self.books.setdefault(spreadsheet_id, FakeSpreadsheet(spreadsheet_id))
+
+
+class _Spreadsheets:
+    def __init__(self, svc: FakeSheetsService):
+        self.svc = svc
+
+    def values(self):
+        return _Values(self.svc)
+
+    def sheets(self):
+        return _Sheets(self.svc)
+
+    def get(self, spreadsheetId: str, fields: str | None = None, **_):
+        book = self.svc.book(spreadsheetId)
+        return FakeRequest(self.svc, "sheets.spreadsheets.get", "GET", lambda: {
+            "spreadsheetId": spreadsheetId,
+            "sheets": [{"properties": {"title": t, "sheetId": i}} for t, i in book.sheet_ids.items()],
+        })
+
+    def batchUpdate(self, spreadsheetId: str, body: dict):
+        book = self.svc.book(spreadsheetId)
+
+        def run():
+            for req in body["requests"]:
+                props = req["updateSheetProperties"]["properties"]
+                old = book.title_of(props["sheetId"])
+                book.sheets[props["title"]] = book.sheets.pop(old)
+                book.sheet_ids[props["title"]] = book.sheet_ids.pop(old)
+            return {}
+        return FakeRequest(self.svc, "sheets.spreadsheets.batchUpdate", "POST", run)
+
+
+class _Sheets:
+    def __init__(self, svc: FakeSheetsService):
+        self.svc = svc
+
+    def copyTo(self, spreadsheetId: str, sheetId: int, body: dict):
+        book = self.svc.book(spreadsheetId)
+
+        def run():
+            src = book.title_of(sheetId)
+            new_id = book.add_sheet(f"Копия {src} {book._next_id}", book.sheets[src])
+            return {"sheetId": new_id}
+        return FakeRequest(self.svc, "sheets.spreadsheets.sheets.copyTo", "POST", run)
+
+
+class _Values:
+    def __init__(self, svc: FakeSheetsService):
+        self.svc = svc
+
+    def get(self, spreadsheetId: str, range: str, majorDimension: str = "ROWS", **_):
+        book = self.svc.book(spreadsheetId)
+        return FakeRequest(self.svc, "sheets.spreadsheets.values.get", "GET",
+                           lambda: book.read(range, majorDimension))
+
+    def batchGet(self, spreadsheetId: str, ranges: list[str], majorDimension: str = "ROWS", **_):
+        book = self.svc.book(spreadsheetId)
+        return FakeRequest(self.svc, "sheets.spreadsheets.values.batchGet", "GET",
+                           lambda: {"valueRanges": [book.read(r, majorDimension) for r in ranges]})
+
+    def update(self, spreadsheetId: str, range: str, valueInputOption: str, body: dict):
+        book = self.svc.book(spreadsheetId)
+        return FakeRequest(self.svc, "sheets.spreadsheets.values.update", "PUT",
+                           lambda: book.write(range, body["values"]) or {})
+
+    def batchUpdate(self, spreadsheetId: str, body: dict):
+        book = self.svc.book(spreadsheetId)
+
+        def run():
+            for d in body["data"]:
+                book.write(d["range"], d["values"])
+            return {"totalUpdatedCells": len(body["data"])}
+        return FakeRequest(self.svc, "sheets.spreadsheets.values.batchUpdate", "POST", run)
+
+
+def seed_templates(svc: FakeSheetsService, stores: int = 30) -> None:
+    """Заполняет шаблоны всех раскладок: `stores` адресов в шапке и товары в колонке."""
+    for otype, layout in LAYOUTS.items():
+        svc.book(layout.spreadsheet_id).add_sheet(layout.template_sheet_name, _template_cells(otype, layout, stores))
+
+
+def _template_cells(otype: str, layout: MatrixLayout, stores: int) -> dict[tuple[int, int], Any]:
+    cells: dict[tuple[int, int], Any] = {}
+    start = _col_to_index(layout.address_start_col_letter)
+    for i in range(stores):
+        cells[(layout.address_header_row, start + i)] = f"{otype} магазин №{i + 1}, ул. Примерная, {i + 1}"
+    item_col = _col_to_index(layout.item_name_col_letter)
+    for n, row in enumerate(range(layout.item_row_start, layout.item_row_end + 1), start=1):
+        cells[(row, item_col)] = f"{otype} товар {n}"
+    return cells
+
+
+class FakeSheetsClient:
+    """Подменяет sheets.SheetsClient: тот же интерфейс (service / execute / stats / close)."""
+
+    def __init__(self, service: FakeSheetsService):
+        from sheets import SheetsClientStats
+        self.service = service
+        self.stats = SheetsClientStats()
+
+    def execute(self, request):
+        self.stats.requests_executed += 1
+        return request.execute()
+
+    def close(self) -> None:
+        pass
+
+
+# ===== Telegram =====
+
+class FakeBotRequest(BaseRequest):
+    """
+    Bot API без сети: на любой метод отвечает успехом. Все исходящие вызовы
+    (sendMessage / editMessageText / answerCallbackQuery ...) передаются в on_call —
+    по ним бенчмарк понимает, что апдейт обработан, и берёт следующую кнопку.
+    """
+
+    def __init__(self, latency: float = 0.0, on_call: Callable[[str, dict], None] | None = None):
+        self.latency = latency
+        self.on_call = on_call
+        self.calls: Counter[str] = Counter()
+        self._message_id = 0
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: RequestData | None = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None) -> tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[api_method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.on_call is not None:
+            self.on_call(api_method, params)
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, params)}).encode()
+
+    def _result(self, api_method: str, params: dict) -> Any:
+        if api_method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot",
+                    "can_join_groups": False, "can_read_all_group_messages": False,
+                    "supports_inline_queries": False}
+        if api_method in ("sendMessage", "editMessageText"):
+            self._message_id += 1
+            return {"message_id": params.get("message_id") or self._message_id, "date": int(time.time()),
+                    "chat": {"id": params.get("chat_id", 0), "type": "private"}, "text": params.get("text", "")}
+        return True
+
+
+class UpdateFactory:
+    """Синтетические апдейты Telegram (как JSON, который приходит на вебхук)."""
+
+    def __init__(self):
+        self._update_id = 0
+        self._query_id = 0
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"Store{user_id}"}
+
+    def _chat(self, user_id: int) -> dict:
+        return {"id": user_id, "type": "private"}
+
+    def message(self, user_id: int, text: str) -> dict:
+        self._update_id += 1
+        msg = {"message_id": self._update_id, "date": int(time.time()), "chat": self._chat(user_id),
+               "from": self._user(user_id), "text": text}
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": self._update_id, "message": msg}
+
+    def callback(self, user_id: int, data: str, message_id: int = 1, text: str = "…") -> dict:
+        """Нажатие кнопки под сообщением message_id, на котором сейчас text (по ним бот отсекает двойные нажатия)."""
+        self._update_id += 1
+        self._query_id += 1
+        return {
+            "update_id": self._update_id,
+            "callback_query": {
+                "id": str(self._query_id),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {"message_id": message_id, "date": int(time.time()),
+                            "chat": self._chat(user_id), "text": text},
+            },
+        }
+
+
+sheets_service: FakeSheetsService | None = None
+bot_request: FakeBotRequest | None = None
+
+
+def install() -> FakeBotRequest:
+    """Подключает fake Sheets к sheets.py и возвращает request для Application.builder()."""
+    global sheets_service, bot_request
+    import sheets
+    sheets_service = FakeSheetsService(latency=FAKE_SHEETS_LATENCY, jitter=FAKE_SHEETS_LATENCY / 2,
+                                       error_rate=FAKE_SHEETS_ERROR_RATE)
+    seed_templates(sheets_service, stores=FAKE_STORES)
+    sheets.install_client(FakeSheetsClient(sheets_service))
+    bot_request = FakeBotRequest()
+    if FAKE_TELEGRAM_SINK:
+        bot_request.on_call = udp_sink(FAKE_TELEGRAM_SINK)
+    return bot_request
+
+
+def udp_sink(address: str) -> Callable[[str, dict], None]:
+    """on_call для FakeBotRequest: {"method": ..., "params": ...} датаграммой на host:port."""
+    host, _, port = address.rpartition(":")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(method: str, params: dict) -> None:
+        sock.sendto(json.dumps({"method": method, "params": params}).encode(), (host, int(port)))
+    return send
@@ -0,0 +1,105 @@
+# jobs.py
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+import search
+from config import LAYOUTS
+from dates import RULES, ANY_SUBTYPE, upcoming_delivery_dates
+from quota import Priority, priority
+from sheets import read_addresses, read_items, ensure_daily_sheet_exists, preload
+
+log = logging.getLogger("jobs")
+
+# Листы на дату создаём заранее — на сколько дней вперёд и как часто проверять
+PRECREATE_DAYS = int(os.getenv("PRECREATE_DAYS", "3"))
+PRECREATE_INTERVAL_SECONDS = float(os.getenv("PRECREATE_INTERVAL_SECONDS", "1800"))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "20"))
+
+
+@dataclass
+class WarmupStatus:
+    done: bool = False
+    ok: bool = False
+    duration_ms: float | None = None
+    errors: list[str] = field(default_factory=list)
+    precreated_sheets: list[str] = field(default_factory=list)
+    last_precreate_at: float | None = None      # time.time() последнего прогона
+    last_precreate_ms: float | None = None
+
+
+status = WarmupStatus()
+
+
+async def warm_up() -> None:
+    """Прогрев клиента Sheets, кэша адресов и товаров по всем шаблонам и индекса поиска магазинов (в фоне при старте)."""
+    t = time.perf_counter()
+    errors: list[str] = []
+
+    try:
+        await preload()
+    except Exception as e:
+        errors.append(f"client: {e}")
+
+    async def load(otype: str, layout) -> None:
+        try:
+            addresses, _ = await asyncio.gather(read_addresses(layout), read_items(layout))
+            search.index_for(addresses)
+        except Exception as e:
+            errors.append(f"{otype}: {e}")
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(load(otype, layout) for otype, layout in LAYOUTS.items())),
+            WARMUP_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        errors.append(f"timeout after {WARMUP_TIMEOUT_SECONDS:.0f}s")
+
+    status.done = True
+    status.ok = not errors
+    status.duration_ms = round((time.perf_counter() - t) * 1000, 1)
+    status.errors = errors
+    if errors:
+        log.warning("Cache warm-up finished with errors in %.0f ms: %s", status.duration_ms, errors)
+    else:
+        log.info("Cache warm-up finished in %.0f ms", status.duration_ms)
+
+
+async def precreate_daily_sheets() -> list[str]:
+    """Создаёт листы RC_/FREEZE_YYYY-MM-DD на даты, которые бот предложит в ближайшие PRECREATE_DAYS дней."""
+    t = time.perf_counter()
+    created: list[str] = []
+    for otype, subtype in RULES:
+        layout = LAYOUTS.get(otype)
+        if layout is None:
+            continue
+        for d in upcoming_delivery_dates(otype, None if subtype == ANY_SUBTYPE else subtype, days=PRECREATE_DAYS):
+            try:
+                title = await ensure_daily_sheet_exists(layout=layout, order_prefix=otype, delivery_date=d)
+            except Exception as e:
+                log.warning("Failed to pre-create %s sheet for %s: %s", otype, d, e)
+                continue
+            if title not in created:
+                created.append(title)
+
+    status.precreated_sheets = created
+    status.last_precreate_at = time.time()
+    status.last_precreate_ms = round((time.perf_counter() - t) * 1000, 1)
+    log.info("Daily sheets ready (%d) in %.0f ms: %s", len(created), status.last_precreate_ms, ", ".join(created))
+    return created
+
+
+async def run_precreate_loop() -> None:
+    """Фоновая задача: периодически готовит листы на ближайшие даты."""
+    while True:
+        try:
+            with priority(Priority.BACKGROUND):
+                await precreate_daily_sheets()
+        except Exception:
+            log.exception("Daily sheet pre-creation failed")
+        await asyncio.sleep(PRECREATE_INTERVAL_SECONDS)
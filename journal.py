@@ -0,0 +1,174 @@
+# journal.py
+from __future__ import annotations
+
+import os
+import glob
+import time
+import logging
+from dataclasses import dataclass
+
+from config import LAYOUTS, MatrixLayout
+from localdb import LocalDB
+
+log = logging.getLogger("journal")
+
+# Журнал строк заказа (write-ahead): строка сначала фиксируется на диске, и только потом
+# пользователь видит "✅ Добавлено". В таблицу её пишет OrderBuffer; после успешной записи
+# строка из журнала удаляется, а всё, что не успели записать (падение процесса, Sheets недоступен),
+# при старте возвращается в OrderBuffer и дописывается.
+# Пустой ORDER_JOURNAL_PATH — без журнала (строки живут только в памяти, как раньше).
+ORDER_JOURNAL_PATH = os.getenv("ORDER_JOURNAL_PATH", "orders-journal.sqlite3")
+
+# Одна строка на ячейку: повторное нажатие перезаписывает количество (в таблицу всё равно
+# пишется последнее значение, поэтому повторная запись после сбоя безопасна).
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_lines (
+    layout      TEXT    NOT NULL,
+    sheet       TEXT    NOT NULL,
+    col         TEXT    NOT NULL,
+    item        TEXT    NOT NULL,
+    qty         INTEGER NOT NULL,
+    created_at  REAL    NOT NULL,
+    PRIMARY KEY (layout, sheet, col, item)
+)
+"""
+
+Line = tuple[str, str, str, str, int]    # (layout, sheet, col, item, qty)
+
+
+@dataclass
+class JournalStats:
+    appended: int = 0        # строк зафиксировано
+    applied: int = 0         # строк удалено после записи в таблицу
+    commits: int = 0         # транзакций с fsync (строки, пришедшие одновременно, — одной)
+    restored: int = 0        # строк поднято при старте
+    pending: int = 0         # строк в журнале сейчас
+
+
+def journal_path(slot: int | None, workers: int) -> str:
+    """У каждого процесса свой файл: строки чата пишет и дописывает только процесс-владелец."""
+    if not ORDER_JOURNAL_PATH or workers == 1:
+        return ORDER_JOURNAL_PATH
+    root, ext = os.path.splitext(ORDER_JOURNAL_PATH)
+    return f"{root}.{slot}{ext}"
+
+
+def orphan_journal_paths(workers: int) -> list[str]:
+    """
+    Журналы, у которых сейчас нет процесса-владельца: BOT_WORKERS поменяли (1 -> N — файл без номера,
+    N -> M < N — слоты >= M). Их строки забирает ведущий процесс (OrderBuffer.adopt).
+    """
+    if not ORDER_JOURNAL_PATH:
+        return []
+    owned = {os.path.abspath(journal_path(slot, workers)) for slot in range(workers)}
+    root, ext = os.path.splitext(ORDER_JOURNAL_PATH)
+    candidates = [ORDER_JOURNAL_PATH] + [
+        p for p in glob.glob(f"{glob.escape(root)}.*{glob.escape(ext)}")
+        if p[len(root) + 1:len(p) - len(ext)].isdigit()
+    ]
+    return sorted(p for p in candidates if os.path.exists(p) and os.path.abspath(p) not in owned)
+
+
+def remove_journal(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _layout_name(layout: MatrixLayout) -> str:
+    for name, known in LAYOUTS.items():
+        if known is layout or known == layout:
+            return name
+    raise KeyError(f"Unknown layout for spreadsheet {layout.spreadsheet_id}")
+
+
+class OrderJournal:
+    """
+    SQLite (WAL, synchronous=FULL, см. localdb.py). append/applied только ставят строки
+    в очередь; все вызовы, пришедшие за один проход цикла событий, уходят одной транзакцией —
+    одним fsync на пачку нажатий, а не на каждое.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stats = JournalStats()
+        self._db = LocalDB(path, _SCHEMA, synchronous="FULL", thread_name="journal")
+        self._upserts: dict[tuple[str, str, str, str], int] = {}
+        self._deletes: dict[tuple[str, str, str, str], int] = {}
+
+    # --- sqlite (только в потоке базы) ---
+    def _load_sync(self) -> list[Line]:
+        return self._db.db().execute(
+            "SELECT layout, sheet, col, item, qty FROM order_lines ORDER BY created_at").fetchall()
+
+    def _write_sync(self, upserts: dict, deletes: dict) -> int:
+        db = self._db.db()
+        now = time.time()
+        db.execute("BEGIN")
+        try:
+            # удаляем только то значение, которое записали: новое нажатие того же товара остаётся
+            db.executemany("DELETE FROM order_lines WHERE layout = ? AND sheet = ? AND col = ? AND item = ? AND qty = ?",
+                           [(*key, qty) for key, qty in deletes.items()])
+            db.executemany("INSERT INTO order_lines (layout, sheet, col, item, qty, created_at) VALUES (?, ?, ?, ?, ?, ?) "
+                           "ON CONFLICT(layout, sheet, col, item) DO UPDATE SET qty = excluded.qty",
+                           [(*key, qty, now) for key, qty in upserts.items()])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return db.execute("SELECT COUNT(*) FROM order_lines").fetchone()[0]
+
+    # --- запись ---
+    async def _write_pending(self) -> None:
+        upserts, self._upserts = self._upserts, {}
+        deletes, self._deletes = self._deletes, {}
+        if not upserts and not deletes:
+            return
+        try:
+            self.stats.pending = await self._db.call(self._write_sync, upserts, deletes)
+        except Exception:
+            for key, qty in upserts.items():
+                self._upserts.setdefault(key, qty)
+            for key, qty in deletes.items():
+                self._deletes.setdefault(key, qty)
+            raise
+        self.stats.commits += 1
+        self.stats.appended += len(upserts)
+        self.stats.applied += len(deletes)
+
+    async def append(self, layout: MatrixLayout, sheet: str, col: str, lines: dict[str, int]) -> None:
+        """Фиксирует строки заказа на диске (возвращается после fsync)."""
+        name = _layout_name(layout)
+        for item, qty in lines.items():
+            key = (name, sheet, col.upper(), item)
+            self._deletes.pop(key, None)
+            self._upserts[key] = qty
+        await self._db.commit(self._write_pending)
+
+    async def applied(self, layout: MatrixLayout, sheet: str, col: str, lines: dict[str, int]) -> None:
+        """Строки записаны в таблицу — убрать из журнала."""
+        name = _layout_name(layout)
+        for item, qty in lines.items():
+            key = (name, sheet, col.upper(), item)
+            if self._upserts.get(key) != qty:
+                self._deletes[key] = qty
+        await self._db.commit(self._write_pending)
+
+    # --- чтение ---
+    async def load(self) -> list[tuple[MatrixLayout, str, str, str, int]]:
+        """Незаписанные строки (при старте)."""
+        rows = await self._db.call(self._load_sync)
+        out = []
+        for name, sheet, col, item, qty in rows:
+            layout = LAYOUTS.get(name)
+            if layout is None:
+                log.warning("Journal line for unknown layout %r dropped: %s %s %s", name, sheet, col, item)
+                continue
+            out.append((layout, sheet, col, item, qty))
+        self.stats.restored = self.stats.pending = len(out)
+        return out
+
+    async def close(self) -> None:
+        await self._db.close(self._write_pending)
@@ -0,0 +1,62 @@
+# localdb.py
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+
+class LocalDB:
+    """
+    Локальный SQLite (WAL) для журнала заказов и сессий: соединение живёт в одном отдельном
+    потоке, event loop не блокируется. commit() — групповая запись: все вызовы, пришедшие за
+    один проход цикла событий, уходят одной транзакцией (одним fsync), а не каждый своей.
+    """
+
+    def __init__(self, path: str, schema: str, synchronous: str = "NORMAL", thread_name: str = "sqlite"):
+        self.path = path
+        self.schema = schema
+        self.synchronous = synchronous
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name)
+        self._conn: sqlite3.Connection | None = None
+        self._inflight: asyncio.Future | None = None
+
+    def db(self) -> sqlite3.Connection:
+        """Соединение (только из функций, переданных в call)."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(self.schema)
+            self._conn = conn
+        return self._conn
+
+    async def call(self, fn, *args):
+        """Выполняет fn(*args) в потоке базы."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def commit(self, write_pending: Callable[[], Awaitable[None]]) -> None:
+        """
+        Ждёт записи накопленного. write_pending забирает всё, что накопил владелец, и пишет
+        одной транзакцией через call; вызывается один раз на проход цикла, сколько бы ни было commit().
+        """
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._write(write_pending))
+        await asyncio.shield(self._inflight)
+
+    async def _write(self, write_pending: Callable[[], Awaitable[None]]) -> None:
+        await asyncio.sleep(0)   # собираем всё, что пришло за этот проход цикла
+        self._inflight = None
+        await write_pending()
+
+    async def close(self, write_pending: Callable[[], Awaitable[None]]) -> None:
+        """Дописывает накопленное и закрывает соединение и поток."""
+        if self._inflight is not None:
+            await asyncio.shield(self._inflight)
+        await self.commit(write_pending)
+        if self._conn is not None:
+            await self.call(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
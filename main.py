@@ -2,10 +2,16 @@
 from __future__ import annotations
 
 import os
+import hmac
+import json
+import time
+import asyncio
 import logging
-from datetime import datetime
+from dataclasses import asdict
+from datetime import date, datetime
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -14,7 +20,10 @@ from telegram.ext import (
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    MessageHandler,
+    filters,
 )
+from telegram.request import BaseRequest, HTTPXRequest
 
 from config import (
     RC_LAYOUT,
@@ -22,13 +31,40 @@ from config import (
     RC_MULTIPLES,
     FREEZE_MULTIPLES,
 )
-from dates import available_delivery_dates
+import bulk
+import callbacks
+import cluster
+import metrics
+import report
+import search
+import tracing
+from dates import TZ, available_delivery_dates, compile_calendars
+import jobs
+from orders import OrderBuffer
+from breaker import counts_as_outage
+from dedup import CALLBACK_DEDUP_SECONDS, UPDATE_DEDUP_SECONDS, DedupStats, RecentKeys
+from journal import OrderJournal, journal_path, orphan_journal_paths
+from persistence import SESSION_DB_PATH, SQLitePersistence
+from updates import UpdateQueue
 from sheets import (
     read_addresses,
     read_items,
+    read_store_column,
     ensure_daily_sheet_exists,
-    write_qty,
+    ensure_sheet_exists,
+    daily_sheet_title,
+    shutdown_sheets,
+    client_stats,
+    invalidate_layout_cache,
+    catalog_cache_stats,
+    quota_stats,
+    ping,
+    breaker_stats,
+    sheets_degraded,
+    AddressCol,
+    SheetsUnavailable,
 )
+from catalog import get_catalog
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("bot")
@@ -36,40 +72,253 @@ log = logging.getLogger("bot")
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "secret")
+# Очередь апдейтов: вебхук только кладёт апдейт и сразу отвечает Telegram 200
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+UPDATE_DRAIN_TIMEOUT = float(os.getenv("UPDATE_DRAIN_TIMEOUT", "20"))
+# /health: за сколько должна ответить Google Sheets и как долго держать результат проверки
+HEALTH_SHEETS_TIMEOUT = float(os.getenv("HEALTH_SHEETS_TIMEOUT", "3"))
+HEALTH_SHEETS_CACHE_SECONDS = float(os.getenv("HEALTH_SHEETS_CACHE_SECONDS", "30"))
+# FAKE_BACKENDS=1: локальные заглушки Sheets и Telegram вместо настоящих (см. fakes.py, bench.py)
+FAKE_BACKENDS = os.getenv("FAKE_BACKENDS", "") == "1"
+# Telegram user id админов через запятую (для служебных команд вроде /reload)
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()}
+# Токен для служебных HTTP-маршрутов (/admin/...): только заголовок X-Admin-Token (не в URL — иначе он попадает
+# в access-логи). Пустой — маршруты закрыты.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+STORES_PER_PAGE = int(os.getenv("STORES_PER_PAGE", "20"))
+# Показываем, пока Google Sheets недоступен (см. breaker.py): меню из снимка, строки копятся в очереди
+DEGRADED_NOTICE = "⚠️ Google Таблицы сейчас недоступны: заказ принимаем, в таблицу он запишется автоматически."
 
 # user_data keys
+# Адреса и товары в сессии не копируются: храним id общего каталога (см. catalog.py) и индекс.
 K_ORDER_TYPE = "order_type"          # "RC" | "FREEZE"
 K_SUBTYPE = "subtype"                # "RC_1" | "RC_2" | None
 K_DELIVERY_DATE = "delivery_date"    # ISO date
-K_DAILY_SHEET = "daily_sheet"        # sheetC_2026-01-16
-K_ADDRESS = "address"                # текст адреса
-K_ADDRESS_COL = "address_col"        # буква колонки адреса
-K_ITEMS_CACHE = "items_cache"        # list[str]
-
-
-def cb(action: str, value: str = "") -> str:
-    return f"{action}:{value}"
+K_STORE_CATALOG = "store_catalog"    # id каталога адресов
+K_STORE_INDEX = "store_index"        # индекс магазина в этом каталоге
+K_INPUT = "input"                    # чего ждём текстом: "store" — поиск магазина, иначе заказ списком
+K_BULK = "bulk"                      # разобранный заказ списком до подтверждения: {"catalog": id, "lines": [[индекс, кол-во], ...]}
+
+# Что должно быть в сессии к моменту нажатия кнопки. Если нет (сессия потерялась или
+# истекла, а клавиатура осталась) — не падаем на KeyError, а начинаем заказ заново.
+_NEEDS_ORDER = (K_ORDER_TYPE,)
+_NEEDS_STORE = (K_ORDER_TYPE, K_STORE_CATALOG, K_STORE_INDEX)
+_NEEDS_DATE = (K_ORDER_TYPE, K_STORE_CATALOG, K_STORE_INDEX, K_DELIVERY_DATE)
+SESSION_REQUIRES: dict[str, tuple[str, ...]] = {
+    "subtype": _NEEDS_ORDER,
+    "storecol": _NEEDS_ORDER,
+    "store_page": _NEEDS_ORDER,
+    "back": _NEEDS_ORDER,
+    "ddate": _NEEDS_STORE,
+    "item": _NEEDS_DATE,
+    "qty": _NEEDS_DATE,
+    "show_items": _NEEDS_DATE,
+    "bulk": _NEEDS_DATE,
+    "bulk_apply": _NEEDS_DATE,
+    "my_order": _NEEDS_DATE,
+}
+
+
+def cb(action: str, *args: int | str) -> str:
+    return callbacks.encode(action, *args)
+
+
+dispatch = callbacks.Dispatcher()
 
 
 app = FastAPI()
 ptb_app: Application | None = None
+update_queue: UpdateQueue | None = None
+precreate_task: asyncio.Task | None = None
+warmup_task: asyncio.Task | None = None
+order_buffer = OrderBuffer()
+recent_updates = RecentKeys(UPDATE_DEDUP_SECONDS)       # update_id, уже поставленные в очередь
+recent_taps = RecentKeys(CALLBACK_DEDUP_SECONDS)        # (чат, сообщение, текст, кнопка) — двойные нажатия
+dedup_stats = DedupStats()
+node = cluster.Cluster()
+
+
+_sheets_probe: dict = {"at": float("-inf"), "ok": False, "error": None}
+
+
+async def _sheets_reachable() -> tuple[bool, str | None]:
+    # результат проверки кэшируется, чтобы частые пробы не тратили квоту Sheets
+    now = time.monotonic()
+    if now - _sheets_probe["at"] >= HEALTH_SHEETS_CACHE_SECONDS:
+        try:
+            await asyncio.wait_for(ping(RC_LAYOUT.spreadsheet_id), HEALTH_SHEETS_TIMEOUT)
+            _sheets_probe.update(ok=True, error=None)
+        except Exception as e:
+            _sheets_probe.update(ok=False, error=repr(e))
+        _sheets_probe["at"] = now
+    return _sheets_probe["ok"], _sheets_probe["error"]
 
 
 @app.get("/health")
 async def health():
-    return {"ok": True}
+    bot_ready = ptb_app is not None and ptb_app.running and update_queue is not None
+    sheets_ok, sheets_error = await _sheets_reachable()
+    # при разомкнутом предохранителе бот работает в деградированном режиме (меню из снимка, заказы в журнал) —
+    # это не повод балансировщику снимать или перезапускать инстанс
+    degraded = sheets_degraded()
+    ready = bot_ready and (sheets_ok or degraded)
+
+    stats = client_stats()
+    body = {
+        "ok": ready,
+        "bot_ready": bot_ready,
+        "sheets_reachable": sheets_ok,
+        "degraded": degraded,
+        "sheets_error": sheets_error,
+        "sheets_client": asdict(stats) if stats else None,
+        "catalog_cache": asdict(catalog_cache_stats()),
+        "sheets_quota": {kind: asdict(st) for kind, st in quota_stats().items()},
+        "sheets_breaker": asdict(breaker_stats()),
+        "update_queue": asdict(update_queue.stats) if update_queue else None,
+        "warmup": asdict(jobs.status),
+        "cluster": asdict(node.stats),
+        "sessions": asdict(ptb_app.persistence.stats) if ptb_app and ptb_app.persistence else None,
+        "dedup": {**asdict(dedup_stats), **asdict(order_buffer.stats)},
+        "order_journal": asdict(order_buffer.journal.stats) if order_buffer.journal else None,
+        "slow_updates": len(tracing.slow_traces),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+def _admin_allowed(req: Request) -> bool:
+    token = req.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+@app.get("/admin/report/{day}.csv")
+async def report_csv(day: str, req: Request):
+    if not _admin_allowed(req):
+        return JSONResponse({"ok": False, "error": "forbidden"}, status_code=403)
+    try:
+        d = date.fromisoformat(day)
+    except ValueError:
+        return JSONResponse({"ok": False, "error": "date must be YYYY-MM-DD"}, status_code=400)
+    rep = await report.build_report(d)
+    return StreamingResponse(
+        report.iter_csv(rep),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="orders_{d.isoformat()}.csv"'},
+    )
+
+
+@app.get("/admin/traces")
+async def slow_traces(req: Request, min_ms: float = 0.0, limit: int = 50):
+    """Последние апдейты дольше TRACE_SLOW_MS с разбивкой по шагам, запросам к Sheets и Bot API."""
+    if not _admin_allowed(req):
+        return JSONResponse({"ok": False, "error": "forbidden"}, status_code=403)
+    return {"ok": True, "slow_ms": tracing.TRACE_SLOW_MS, "traces": tracing.recent(min_ms, limit)}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+metrics.Gauge(
+    "bot_update_queue_depth", "Telegram updates waiting or being processed",
+    collect=lambda: {(): update_queue.stats.depth} if update_queue else {},
+)
+metrics.Counter(
+    "bot_update_queue_events_total", "Update queue counters (enqueued/processed/failed/rejected)", ("event",),
+    collect=lambda: {
+        (k,): getattr(update_queue.stats, k) for k in ("enqueued", "processed", "failed", "rejected")
+    } if update_queue else {},
+)
+metrics.Counter(
+    "bot_duplicates_suppressed_total", "Duplicates dropped (redelivered updates, double taps, coalesced or unchanged writes)",
+    ("kind",),
+    collect=lambda: {(k,): v for k, v in {**asdict(dedup_stats), **asdict(order_buffer.stats)}.items()},
+)
+metrics.Counter(
+    "catalog_cache_events_total", "Catalog cache counters (hits/misses/stale/loads/errors)", ("event",),
+    collect=lambda: {(k,): v for k, v in asdict(catalog_cache_stats()).items()},
+)
+metrics.Gauge(
+    "sheets_quota_waiting", "Sheets requests waiting for a quota token", ("kind", "lane"),
+    collect=lambda: {
+        (kind, lane): ls.waiting for kind, st in quota_stats().items() for lane, ls in st.lanes.items()
+    },
+)
+metrics.Counter(
+    "sheets_quota_throttled_total", "Sheets 429/5xx responses that were retried", ("kind",),
+    collect=lambda: {(kind,): st.throttled for kind, st in quota_stats().items()},
+)
 
 
 @app.post(f"/telegram/{WEBHOOK_SECRET}")
 async def telegram_webhook(req: Request):
-    if not ptb_app:
+    if not ptb_app or not update_queue:
         return {"ok": False, "error": "bot not ready"}
-    data = await req.json()
-    update = Update.de_json(data, ptb_app.bot)
-    await ptb_app.process_update(update)
+    body = await req.body()
+    try:
+        data = json.loads(body)
+        owner = node.owner(data)
+    except Exception as e:
+        # битый апдейт повторять бессмысленно — отвечаем 200, чтобы Telegram не слал его снова
+        log.warning("Invalid update payload: %s", e)
+        return {"ok": False, "error": "invalid update"}
+
+    if owner == node.slot:
+        accepted = _submit_update(data)
+    else:
+        # чат принадлежит другому процессу (BOT_WORKERS > 1) — отдаём апдейт ему
+        accepted = await node.forward(owner, cluster.MSG_UPDATE, body)
+    if accepted is None:
+        return {"ok": False, "error": "invalid update"}
+    if not accepted:
+        # очередь переполнена / владелец недоступен: не-2xx заставит Telegram повторить доставку позже
+        return JSONResponse({"ok": False, "error": "queue full"}, status_code=503)
     return {"ok": True}
 
 
+def _submit_update(data: dict) -> bool | None:
+    """Кладёт апдейт в очередь этого процесса. None — апдейт не разобрать."""
+    try:
+        update = Update.de_json(data, ptb_app.bot)
+    except Exception as e:
+        log.warning("Invalid update payload: %s", e)
+        return None
+    if update is None:
+        return None
+    if update.update_id in recent_updates:
+        # Telegram повторил доставку, а первая уже в очереди (или обработана) — просто подтверждаем
+        dedup_stats.updates += 1
+        return True
+    tracing.received(update.update_id)
+    accepted = update_queue.submit(update)
+    if accepted:
+        recent_updates.add(update.update_id)
+    return accepted
+
+
+async def _process_update(update: Update) -> None:
+    """Обработка апдейта из очереди — в своей трассе (см. tracing.py)."""
+    with tracing.trace_update(update.update_id):
+        if update.effective_chat:
+            tracing.annotate(chat_id=update.effective_chat.id)
+        if update.message and update.message.text:
+            text = update.message.text
+            tracing.annotate(kind=text.split()[0] if text.startswith("/") else "text")
+        await ptb_app.process_update(update)
+
+
+async def _on_cluster_message(kind: bytes, payload: bytes) -> bool:
+    if kind == cluster.MSG_UPDATE:
+        if not ptb_app or not update_queue:
+            return False
+        return _submit_update(json.loads(payload)) is not False
+    if kind == cluster.MSG_RELOAD:
+        invalidate_layout_cache()
+        return True
+    return False
+
+
 def _layout_for(otype: str):
     return RC_LAYOUT if otype == "RC" else FREEZE_LAYOUT
 
@@ -78,6 +327,23 @@ def _multiples_for(otype: str):
     return RC_MULTIPLES if otype == "RC" else FREEZE_MULTIPLES
 
 
+async def _selected_store(context) -> AddressCol | None:
+    """Выбранный магазин из общего каталога адресов (по id каталога и индексу в user_data)."""
+    await read_addresses(_layout_for(context.user_data[K_ORDER_TYPE]))  # каталог мог ещё не загрузиться после рестарта
+    catalog = get_catalog(context.user_data.get(K_STORE_CATALOG))
+    index = context.user_data.get(K_STORE_INDEX)
+    if catalog is None or index is None or index >= len(catalog):
+        return None
+    return catalog[index]
+
+
+def _daily_sheet(context) -> str:
+    return daily_sheet_title(
+        context.user_data[K_ORDER_TYPE],
+        date.fromisoformat(context.user_data[K_DELIVERY_DATE]),
+    )
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text(
         "Привет! Я бот для оформления заказов.\n\nНажми: Создать заказ",
@@ -87,94 +353,303 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
 
 
+async def reload_catalogs(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/reload — сбросить кэш адресов и товаров после правки шаблонов (только для админов)."""
+    if update.effective_user is None or update.effective_user.id not in ADMIN_IDS:
+        return
+    invalidate_layout_cache()
+    await node.broadcast(cluster.MSG_RELOAD)
+    st = catalog_cache_stats()
+    await update.message.reply_text(
+        "♻️ Кэш адресов и товаров сброшен.\n"
+        f"hit={st.hits} miss={st.misses} stale={st.stale} loads={st.loads} errors={st.errors}"
+    )
+
+
+async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/report [YYYY-MM-DD] — что заказали на дату (по умолчанию сегодня), только для админов."""
+    if update.effective_user is None or update.effective_user.id not in ADMIN_IDS:
+        return
+    try:
+        d = date.fromisoformat(context.args[0]) if context.args else datetime.now(TZ).date()
+    except ValueError:
+        await update.message.reply_text("Формат: /report 2026-01-16")
+        return
+    rep = await report.build_report(d)
+    text = report.render_text(rep)
+    if ADMIN_TOKEN and rep.matrices:
+        text += f"\n\nCSV: /admin/report/{d.isoformat()}.csv (заголовок X-Admin-Token)"
+    await update.message.reply_text(text[:4000])
+
+
 async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     q = update.callback_query
     await q.answer()
-    action, _, value = q.data.partition(":")
+    # двойное нажатие — та же кнопка на том же экране: текст сообщения ещё не успел смениться
+    tap = (q.message.chat_id, q.message.message_id, hash(q.message.text), q.message.edit_date, q.data) if q.message else None
+    if tap is not None and recent_taps.seen(tap):
+        dedup_stats.callbacks += 1
+        log.info("Duplicate tap from user %s dropped: %r", update.effective_user.id, q.data)
+        return
+    try:
+        action, handler, args = dispatch.resolve(q.data)
+    except (callbacks.StaleCallback, ValueError):
+        await q.edit_message_text("Не понял команду. Нажми /start")
+        return
+    tracing.annotate(kind=action)
 
-    if action == "back":
-        await route_back(q, context, value)
+    required = () if action == "back" and args == ["otype"] else SESSION_REQUIRES.get(action, ())
+    if any(k not in context.user_data for k in required):
+        log.info("Stale session for user %s on %r, restarting the order", update.effective_user.id, action)
+        await step_choose_order_type(q, context, notice="⚠️ Сессия устарела (бот перезапускался). Начнём заказ заново.")
         return
 
-    if action == "create_order":
+    t = time.perf_counter()
+    try:
+        await handler(q, context, *args)
+    except Exception as e:
+        metrics.CALLBACK_ERRORS.inc(action)
+        recent_taps.discard(tap)    # "🔁 Повторить" шлёт ту же кнопку — её не считаем двойным нажатием
+        log.error("Callback %r failed: %s", action, e, exc_info=not _sheets_down(e))
+        await _reply_failed(q, e)
+    finally:
+        metrics.CALLBACK_SECONDS.observe(time.perf_counter() - t, action)
+
+
+def _sheets_down(e: Exception) -> bool:
+    """Ошибка из-за недоступности Google (а не из-за нас) — имеет смысл повторить позже."""
+    return counts_as_outage(e)
+
+
+async def _reply_failed(q, e: Exception) -> None:
+    """Пользователь не должен остаться без ответа: объясняем и даём повторить то же нажатие."""
+    text = ("⚠️ Google Таблицы сейчас недоступны. Попробуй через минуту." if _sheets_down(e)
+            else "⚠️ Что-то пошло не так. Попробуй ещё раз или нажми /start")
+    try:
+        await q.edit_message_text(text, reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔁 Повторить", callback_data=q.data)],
+            [InlineKeyboardButton("⛔ Отмена", callback_data=cb("finish"))],
+        ]))
+    except Exception as reply_error:
+        log.warning("Failed to report callback error to the user: %s", reply_error)
+
+
+@dispatch.on("back")
+async def route_back(q, context, target: str) -> None:
+    if target == "otype":
+        await step_choose_order_type(q, context)
+    elif target == "subtype":
+        await step_choose_rc_subtype(q, context)
+    elif target == "store":
+        await step_choose_store(q, context)
+    elif target == "ddate":
+        await step_choose_delivery_date(q, context)
+    elif target == "item":
+        await step_choose_item(q, context)
+    else:
         await step_choose_order_type(q, context)
 
-    elif action == "otype":
-        context.user_data[K_ORDER_TYPE] = value  # RC/FREEZE
-        if value == "RC":
-            await step_choose_rc_subtype(q, context)
-        else:
-            context.user_data[K_SUBTYPE] = None
-            await step_choose_store(q, context)
 
-    elif action == "subtype":
-        context.user_data[K_SUBTYPE] = value
+@dispatch.on("create_order")
+async def on_create_order(q, context) -> None:
+    await step_choose_order_type(q, context)
+
+
+@dispatch.on("otype")
+async def on_order_type(q, context, otype: str) -> None:
+    context.user_data[K_ORDER_TYPE] = otype  # RC/FREEZE
+    if otype == "RC":
+        await step_choose_rc_subtype(q, context)
+    else:
+        context.user_data[K_SUBTYPE] = None
         await step_choose_store(q, context)
 
-    elif action == "storecol":
-        # value = "COL|address"
-        col, _, addr = value.partition("|")
-        context.user_data[K_ADDRESS_COL] = col
-        context.user_data[K_ADDRESS] = addr
-        await step_choose_delivery_date(q, context)
 
-    elif action == "ddate":
-        context.user_data[K_DELIVERY_DATE] = value
-        otype = context.user_data[K_ORDER_TYPE]
-        layout = _layout_for(otype)
+@dispatch.on("subtype")
+async def on_subtype(q, context, subtype: str) -> None:
+    context.user_data[K_SUBTYPE] = subtype
+    await step_choose_store(q, context)
 
-        daily_sheet = await ensure_daily_sheet_exists(
+
+@dispatch.on("store_page")
+async def on_store_page(q, context, page: int) -> None:
+    await step_choose_store(q, context, page=page)
+
+
+@dispatch.on("storecol")
+async def on_store(q, context, version: int, index: int) -> None:
+    layout = _layout_for(context.user_data[K_ORDER_TYPE])
+    addresses = await read_addresses(layout)
+    if version != addresses.id or index >= len(addresses):
+        await step_choose_store(q, context, notice="⚠️ Список магазинов обновился, выбери ещё раз.")
+        return
+
+    context.user_data.pop(K_INPUT, None)
+    context.user_data[K_STORE_CATALOG] = addresses.id
+    context.user_data[K_STORE_INDEX] = index
+    await step_choose_delivery_date(q, context)
+
+
+@dispatch.on("ddate")
+async def on_delivery_date(q, context, ordinal: int) -> None:
+    delivery_date = date.fromordinal(ordinal)
+    context.user_data[K_DELIVERY_DATE] = delivery_date.isoformat()
+    otype = context.user_data[K_ORDER_TYPE]
+    layout = _layout_for(otype)
+
+    try:
+        await ensure_daily_sheet_exists(
             layout=layout,
             order_prefix=otype,
-            delivery_date=datetime.fromisoformat(value).date(),
+            delivery_date=delivery_date,
         )
-        context.user_data[K_DAILY_SHEET] = daily_sheet
-        await step_choose_item(q, context)
+    except SheetsUnavailable:
+        # заказ всё равно принимаем: лист создастся перед записью строк (см. OrderBuffer)
+        await step_choose_item(q, context, notice=DEGRADED_NOTICE)
+        return
+    await step_choose_item(q, context)
 
-    elif action == "item":
-        await step_choose_qty(q, context, value)
 
-    elif action == "qty":
-        item_name, _, qty_str = value.partition("|")
-        qty = int(qty_str)
+async def _resolve_item(q, context, version: int, index: int) -> str | None:
+    """Название товара по индексу из кнопки; None — каталог сменился, меню уже перерисовано."""
+    layout = _layout_for(context.user_data[K_ORDER_TYPE])
+    items = await read_items(layout)
+    if version != items.id or index >= len(items):
+        await step_choose_item(q, context, notice="⚠️ Список товаров обновился, выбери ещё раз.")
+        return None
+    return items.names[index]
+
+
+@dispatch.on("item")
+async def on_item(q, context, version: int, index: int) -> None:
+    item_name = await _resolve_item(q, context, version, index)
+    if item_name is not None:
+        await step_choose_qty(q, context, version, index, item_name)
+
+
+@dispatch.on("qty")
+async def on_qty(q, context, version: int, index: int, qty: int) -> None:
+    item_name = await _resolve_item(q, context, version, index)
+    if item_name is not None:
         await finalize_add_item(q, context, item_name, qty)
 
-    elif action == "show_items":
-        await step_choose_item(q, context)
 
-    elif action == "finish":
-        await q.edit_message_text("✅ Заказ завершён. Спасибо!")
-        context.user_data.clear()
+@dispatch.on("show_items")
+async def on_show_items(q, context) -> None:
+    await step_choose_item(q, context)
 
-    else:
-        await q.edit_message_text("Не понял команду. Нажми /start")
 
+@dispatch.on("my_order")
+async def on_my_order(q, context) -> None:
+    await step_my_order(q, context)
 
-async def route_back(q, context, target: str) -> None:
-    if target == "otype":
-        await step_choose_order_type(q, context)
-    elif target == "subtype":
-        await step_choose_rc_subtype(q, context)
-    elif target == "store":
-        await step_choose_store(q, context)
-    elif target == "ddate":
-        await step_choose_delivery_date(q, context)
-    elif target == "item":
-        await step_choose_item(q, context)
-    else:
-        await step_choose_order_type(q, context)
+
+@dispatch.on("finish")
+async def on_finish(q, context) -> None:
+    await finish_order(q, context)
+
+
+@dispatch.on("bulk")
+async def on_bulk(q, context) -> None:
+    await q.edit_message_text(
+        "📋 Пришли заказ одним сообщением — товар и количество в каждой строке:\n\n"
+        "Соевый соус 30 мл 20\n"
+        "Наклейки — 100\n\n"
+        "Названия можно писать не полностью, перед записью покажу, что распознал.",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("⬅️ Назад", callback_data=cb("back", "item"))],
+        ]),
+    )
+
+
+@dispatch.on("bulk_apply")
+async def on_bulk_apply(q, context) -> None:
+    pending = context.user_data.pop(K_BULK, None)
+    store = await _selected_store(context) if K_DELIVERY_DATE in context.user_data else None
+    catalog = get_catalog(pending["catalog"]) if pending else None
+    if store is None or catalog is None:
+        await q.edit_message_text("⚠️ Список устарел, пришли заказ ещё раз или нажми /start")
+        return
+
+    layout = _layout_for(context.user_data[K_ORDER_TYPE])
+    lines = {catalog.names[index]: qty for index, qty in pending["lines"]}
+    await order_buffer.add_lines(layout, _daily_sheet(context), store.col_letter, lines)
+    written = await _flush_store_order(q, layout, _daily_sheet(context), store.col_letter)
+    if written is None:
+        return
+
+    rejected = order_buffer.take_rejected(layout, _daily_sheet(context), store.col_letter)
+    notice = _rejected_text(_daily_sheet(context), rejected)
+    lines = {name: qty for name, qty in lines.items() if name not in rejected}
+    status = (f"✅ Записано в таблицу: {len(lines)} поз." if written else
+              f"📝 Заказ принят: {len(lines)} поз. — запишется в таблицу, как только Google Таблицы станут доступны.")
+    await q.edit_message_text(
+        f"{notice}{status}\n"
+        f"Магазин: {store.address}\n"
+        f"Лист: {_daily_sheet(context)}\n\n"
+        f"{_pending_lines_text(lines)}\n\n"
+        f"Что дальше?",
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("➕ Добавить ещё товар", callback_data=cb("show_items"))],
+            [InlineKeyboardButton("✅ Завершить заказ", callback_data=cb("finish"))],
+        ]),
+    )
+
+
+async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Текст от магазина: поиск по адресам на шаге выбора магазина, иначе заказ списком."""
+    if context.user_data.get(K_INPUT) == "store" and K_ORDER_TYPE in context.user_data:
+        await step_store_search(update.message, context, update.message.text)
+        return
+
+    if K_DELIVERY_DATE not in context.user_data or await _selected_store(context) is None:
+        await update.message.reply_text("Сначала выбери магазин и дату доставки: /start")
+        return
+
+    otype = context.user_data[K_ORDER_TYPE]
+    items = await read_items(_layout_for(otype))
+    order = bulk.parse_order(update.message.text, items, _multiples_for(otype))
+    await step_bulk_confirm(update.message, context, order)
+
+
+@metrics.timed_step
+async def step_bulk_confirm(message, context, order: bulk.BulkOrder) -> None:
+    totals = order.totals()
+    context.user_data[K_BULK] = {"catalog": order.catalog_id, "lines": [[i, qty] for i, qty in totals.items()]}
+
+    rows = []
+    for ln in order.lines:
+        if ln.problem is None:
+            rows.append(f"✅ {ln.name} — {ln.qty}" + ("" if ln.score == 1.0 else f"  ← «{ln.raw}»"))
+        else:
+            rows.append(f"❌ «{ln.raw}»: {ln.problem}")
+
+    kb = []
+    if totals:
+        kb.append([InlineKeyboardButton(f"✅ Записать ({len(totals)} поз.)", callback_data=cb("bulk_apply"))])
+    kb.append([InlineKeyboardButton("⬅️ К списку товаров", callback_data=cb("show_items"))])
+
+    text = "\n".join(rows) or "Не нашёл ни одной строки заказа."
+    if totals and len(totals) < len(order.lines):
+        text += "\n\nСтроки с ❌ не будут записаны — исправь и пришли их отдельным сообщением."
+    await message.reply_text(text[:4000], reply_markup=InlineKeyboardMarkup(kb))
 
 
-async def step_choose_order_type(q, context) -> None:
+@metrics.timed_step
+async def step_choose_order_type(q, context, notice: str = "") -> None:
+    context.user_data.pop(K_INPUT, None)
     kb = [
         [InlineKeyboardButton("🏬 РЦ", callback_data=cb("otype", "RC"))],
         [InlineKeyboardButton("🧊 Заморозка", callback_data=cb("otype", "FREEZE"))],
         [InlineKeyboardButton("⛔ Отмена", callback_data=cb("finish"))],
     ]
-    await q.edit_message_text("Выбери тип заказа:", reply_markup=InlineKeyboardMarkup(kb))
+    text = f"{notice}\n\nВыбери тип заказа:" if notice else "Выбери тип заказа:"
+    await q.edit_message_text(text, reply_markup=InlineKeyboardMarkup(kb))
 
 
+@metrics.timed_step
 async def step_choose_rc_subtype(q, context) -> None:
+    context.user_data.pop(K_INPUT, None)
     kb = [
         [InlineKeyboardButton("РЦ-1: наклейки + соевый", callback_data=cb("subtype", "RC_1"))],
         [InlineKeyboardButton("РЦ-2: Магария + майонез", callback_data=cb("subtype", "RC_2"))],
@@ -183,106 +658,315 @@ async def step_choose_rc_subtype(q, context) -> None:
     await q.edit_message_text("Выбери подтип РЦ:", reply_markup=InlineKeyboardMarkup(kb))
 
 
-async def step_choose_store(q, context) -> None:
+def _store_buttons(addresses, indexes) -> list[list[InlineKeyboardButton]]:
+    return [[InlineKeyboardButton(addresses.names[i], callback_data=cb("storecol", addresses.id, i))] for i in indexes]
+
+
+@metrics.timed_step
+async def step_choose_store(q, context, notice: str = "", page: int = 0) -> None:
     otype = context.user_data[K_ORDER_TYPE]
     layout = _layout_for(otype)
     addresses = await read_addresses(layout)
-
-    kb = []
-    for a in addresses[:40]:  # если адресов много — потом сделаем пагинацию
-        kb.append([InlineKeyboardButton(a.address, callback_data=cb("storecol", f"{a.col_letter}|{a.address}"))])
-
+    context.user_data[K_INPUT] = "store"
+
+    pages = max(1, -(-len(addresses) // STORES_PER_PAGE))
+    page = min(max(page, 0), pages - 1)
+    start = page * STORES_PER_PAGE
+    end = min(start + STORES_PER_PAGE, len(addresses))
+    kb = _store_buttons(addresses, range(start, end))
+
+    if pages > 1:
+        kb.append([
+            InlineKeyboardButton("◀️", callback_data=cb("store_page", (page - 1) % pages)),
+            InlineKeyboardButton("▶️", callback_data=cb("store_page", (page + 1) % pages)),
+        ])
     back_to = "subtype" if otype == "RC" else "otype"
     kb.append([InlineKeyboardButton("⬅️ Назад", callback_data=cb("back", back_to))])
     kb.append([InlineKeyboardButton("⛔ Отмена", callback_data=cb("finish"))])
 
-    await q.edit_message_text("Выбери магазин:", reply_markup=InlineKeyboardMarkup(kb))
+    text = "Выбери магазин:"
+    if pages > 1:
+        text = (f"Магазины {start + 1}–{end} из {len(addresses)}.\n"
+                f"Выбери магазин или напиши часть адреса для поиска:")
+    if notice:
+        text = f"{notice}\n\n{text}"
+    await q.edit_message_text(text, reply_markup=InlineKeyboardMarkup(kb))
+
+
+@metrics.timed_step
+async def step_store_search(message, context, query: str) -> None:
+    addresses = await read_addresses(_layout_for(context.user_data[K_ORDER_TYPE]))
+    found, total = search.index_for(addresses).search(query, limit=STORES_PER_PAGE)
+
+    kb = _store_buttons(addresses, found)
+    kb.append([InlineKeyboardButton("📋 Все магазины", callback_data=cb("store_page", 0))])
+    if not found:
+        text = f"По запросу «{query}» магазинов не нашлось. Попробуй часть улицы или номер дома."
+    elif total > len(found):
+        text = f"Нашлось {total}, показаны первые {len(found)} — уточни запрос:"
+    else:
+        text = "Выбери магазин:"
+    await message.reply_text(text, reply_markup=InlineKeyboardMarkup(kb))
 
 
+@metrics.timed_step
 async def step_choose_delivery_date(q, context) -> None:
     otype = context.user_data[K_ORDER_TYPE]
     subtype = context.user_data.get(K_SUBTYPE)
     opts = available_delivery_dates(otype, subtype)
+    store = await _selected_store(context)
 
-    kb = [[InlineKeyboardButton(o.label, callback_data=cb("ddate", o.delivery_date.isoformat()))] for o in opts]
+    kb = [[InlineKeyboardButton(o.label, callback_data=cb("ddate", o.delivery_date.toordinal()))] for o in opts]
     kb.append([InlineKeyboardButton("⬅️ Назад", callback_data=cb("back", "store"))])
 
     await q.edit_message_text(
-        f"Магазин: {context.user_data.get(K_ADDRESS)}\n"
+        f"Магазин: {store.address if store else '—'}\n"
         f"Выбери дату доставки:",
         reply_markup=InlineKeyboardMarkup(kb)
     )
 
 
-async def step_choose_item(q, context) -> None:
+@metrics.timed_step
+async def step_choose_item(q, context, notice: str = "") -> None:
     otype = context.user_data[K_ORDER_TYPE]
     layout = _layout_for(otype)
 
     items = await read_items(layout)
-    context.user_data[K_ITEMS_CACHE] = items
 
     kb = []
-    for name in items[:40]:
-        kb.append([InlineKeyboardButton(name, callback_data=cb("item", name))])
+    for i, name in enumerate(items.names[:40]):
+        kb.append([InlineKeyboardButton(name, callback_data=cb("item", items.id, i))])
 
+    kb.append([InlineKeyboardButton("📋 Вставить списком", callback_data=cb("bulk"))])
+    kb.append([InlineKeyboardButton("🧾 Мой заказ", callback_data=cb("my_order"))])
     kb.append([InlineKeyboardButton("⬅️ Назад", callback_data=cb("back", "ddate"))])
     kb.append([InlineKeyboardButton("✅ Завершить заказ", callback_data=cb("finish"))])
 
-    await q.edit_message_text("Выбери товар:", reply_markup=InlineKeyboardMarkup(kb))
+    text = f"{notice}\n\nВыбери товар:" if notice else "Выбери товар:"
+    await q.edit_message_text(text, reply_markup=InlineKeyboardMarkup(kb))
 
 
-async def step_choose_qty(q, context, item_name: str) -> None:
+@metrics.timed_step
+async def step_choose_qty(q, context, version: int, index: int, item_name: str) -> None:
     otype = context.user_data[K_ORDER_TYPE]
     multiples = _multiples_for(otype)
     multiple = multiples.get(item_name, 1)
 
     suggested = [multiple, multiple * 2, multiple * 3]
-    kb = [[InlineKeyboardButton(str(x), callback_data=cb("qty", f"{item_name}|{x}"))] for x in suggested]
+    kb = [[InlineKeyboardButton(str(x), callback_data=cb("qty", version, index, x))] for x in suggested]
     kb.append([InlineKeyboardButton("⬅️ Назад", callback_data=cb("back", "item"))])
 
+    text = f"Товар: {item_name}\nКратность: {multiple}\n"
+    current = (await _store_order(context))[0].get(item_name)
+    if current is not None:
+        # новое количество заменит текущее, а не добавится к нему
+        text += f"Сейчас в заказе: {_qty_text(current[0])}{' ⏳' if current[1] else ''}\n"
+    await q.edit_message_text(f"{text}\nВыбери количество:", reply_markup=InlineKeyboardMarkup(kb))
+
+
+async def _store_order(context) -> tuple[dict[str, tuple[float, bool]], bool]:
+    """
+    Заказ выбранного магазина на листе даты: товар -> (количество, ещё не записано).
+    Колонка из таблицы (read_store_column, кэш) поверх — строки, ждущие записи в OrderBuffer.
+    Второе значение — False, если таблицу прочитать не удалось (Google недоступен) и есть только очередь.
+    """
+    store = await _selected_store(context)
+    if store is None:
+        return {}, True
+    layout = _layout_for(context.user_data[K_ORDER_TYPE])
+    daily_sheet = _daily_sheet(context)
+    complete = True
+    try:
+        # сессию могли открыть, пока Google был недоступен (on_delivery_date без листа) — лист создаём здесь
+        await ensure_sheet_exists(layout, daily_sheet)
+        column = await read_store_column(layout, daily_sheet, store.col_letter)
+    except Exception as e:
+        if not _sheets_down(e):
+            raise
+        column, complete = {}, False
+    order = {name: (qty, False) for name, qty in column.items()}
+    for name, qty in order_buffer.pending(layout, daily_sheet, store.col_letter).items():
+        order[name] = (qty, True)
+    return order, complete
+
+
+def _qty_text(qty: float) -> str:
+    return str(int(qty)) if qty == int(qty) else f"{qty:g}"
+
+
+@metrics.timed_step
+async def step_my_order(q, context) -> None:
+    store = await _selected_store(context)
+    if store is None:
+        await step_choose_store(q, context, notice="⚠️ Список магазинов обновился, выбери магазин ещё раз.")
+        return
+
+    order, complete = await _store_order(context)
+    items = await read_items(_layout_for(context.user_data[K_ORDER_TYPE]))
+    # в порядке строк листа; товары, которых уже нет в шаблоне, — в конце
+    position = {name: i for i, name in enumerate(items.names)}
+    names = sorted((n for n, (qty, _) in order.items() if qty), key=lambda n: (position.get(n, len(position)), n))
+
+    lines = [f"• {n} — {_qty_text(order[n][0])}{' ⏳' if order[n][1] else ''}" for n in names]
+    text = (_rejected_notice(_layout_for(context.user_data[K_ORDER_TYPE]), _daily_sheet(context), store.col_letter) +
+            f"🧾 Заказ магазина: {store.address}\n"
+            f"Лист: {_daily_sheet(context)}\n\n")
+    text += "\n".join(lines) if lines else "Пока ничего не заказано."
+    if not complete:
+        text += "\n\n⚠️ Google Таблицы сейчас недоступны — показано только то, что ещё ждёт записи."
+    if any(order[n][1] for n in names):
+        text += "\n\n⏳ — ещё не записано в таблицу"
     await q.edit_message_text(
-        f"Товар: {item_name}\nКратность: {multiple}\n\nВыбери количество:",
-        reply_markup=InlineKeyboardMarkup(kb),
+        text[:4000],
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("➕ Добавить ещё товар", callback_data=cb("show_items"))],
+            [InlineKeyboardButton("✅ Завершить заказ", callback_data=cb("finish"))],
+        ]),
     )
 
 
+def _pending_lines_text(lines: dict[str, int]) -> str:
+    return "\n".join(f"• {name} — {qty}" for name, qty in lines.items())
+
+
+def _rejected_notice(layout, daily_sheet: str, address_col: str) -> str:
+    """Строки, которые не записались: товара нет на листе (шаблон поменялся после создания листа)."""
+    return _rejected_text(daily_sheet, order_buffer.take_rejected(layout, daily_sheet, address_col))
+
+
+def _rejected_text(daily_sheet: str, rejected: dict[str, int]) -> str:
+    if not rejected:
+        return ""
+    return (f"⚠️ Этих товаров нет на листе {daily_sheet}, они НЕ записаны — сообщи администратору:\n"
+            f"{_pending_lines_text(rejected)}\n\n")
+
+
 async def finalize_add_item(q, context, item_name: str, qty: int) -> None:
     otype = context.user_data[K_ORDER_TYPE]
     layout = _layout_for(otype)
-    daily_sheet = context.user_data[K_DAILY_SHEET]
-    address_col = context.user_data[K_ADDRESS_COL]
+    daily_sheet = _daily_sheet(context)
+    store = await _selected_store(context)
+    if store is None:
+        await step_choose_store(q, context, notice="⚠️ Список магазинов обновился, выбери магазин ещё раз.")
+        return
 
-    await write_qty(layout, daily_sheet, item_name, address_col, qty)
+    # строка уже в журнале на диске; в таблицу уйдёт пачкой вместе с остальными (см. OrderBuffer)
+    order = await order_buffer.add(layout, daily_sheet, store.col_letter, item_name, qty)
 
     await q.edit_message_text(
+        (f"{DEGRADED_NOTICE}\n\n" if sheets_degraded() else "") +
+        _rejected_notice(layout, daily_sheet, store.col_letter) +
         f"✅ Добавлено: {item_name} — {qty}\n"
-        f"Магазин: {context.user_data.get(K_ADDRESS)}\n"
+        f"Магазин: {store.address}\n"
         f"Лист: {daily_sheet}\n\n"
+        f"⏳ Ожидают записи в таблицу:\n{_pending_lines_text(order.lines)}\n\n"
         f"Что дальше?",
         reply_markup=InlineKeyboardMarkup([
             [InlineKeyboardButton("➕ Добавить ещё товар", callback_data=cb("show_items"))],
+            [InlineKeyboardButton("🧾 Мой заказ", callback_data=cb("my_order"))],
             [InlineKeyboardButton("✅ Завершить заказ", callback_data=cb("finish"))],
         ]),
     )
 
 
-def build_bot() -> Application:
+async def finish_order(q, context) -> None:
+    store = None
+    if K_DELIVERY_DATE in context.user_data:
+        store = await _selected_store(context)
+
+    written, notice = True, ""
+    if store is not None:
+        layout = _layout_for(context.user_data[K_ORDER_TYPE])
+        written = await _flush_store_order(q, layout, _daily_sheet(context), store.col_letter)
+        if written is None:
+            return
+        notice = _rejected_notice(layout, _daily_sheet(context), store.col_letter)
+
+    if written:
+        await q.edit_message_text(f"{notice}✅ Заказ завершён. Спасибо!")
+    else:
+        await q.edit_message_text(f"{notice}📝 Заказ принят и будет записан в таблицу, как только Google Таблицы "
+                                  "снова станут доступны. Спасибо!")
+    context.user_data.clear()
+
+
+async def _flush_store_order(q, layout, daily_sheet: str, address_col: str) -> bool | None:
+    """
+    Пишет накопленные строки магазина. True — записано; False — Google недоступен, строки
+    остались в очереди и запишутся сами; None — ошибка, пользователю показаны строки и кнопка повтора.
+    """
+    try:
+        await order_buffer.flush(layout, daily_sheet, address_col)
+        return True
+    except Exception as e:
+        log.error("Order flush failed: %s", e, exc_info=not _sheets_down(e))
+        if _sheets_down(e):
+            return False
+        pending = order_buffer.pending(layout, daily_sheet, address_col)
+        await q.edit_message_text(
+            "⚠️ Не удалось записать заказ в таблицу. Строки сохранены, попробуй ещё раз:\n"
+            f"{_pending_lines_text(pending)}",
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("🔁 Повторить запись", callback_data=cb("finish"))],
+            ]),
+        )
+        return None
+
+
+def build_bot(request: BaseRequest | None = None) -> Application:
     if not BOT_TOKEN:
         raise RuntimeError("BOT_TOKEN env var is missing")
 
-    application = Application.builder().token(BOT_TOKEN).build()
+    builder = Application.builder().token(BOT_TOKEN)
+    if SESSION_DB_PATH:
+        builder = builder.persistence(SQLitePersistence(SESSION_DB_PATH))
+    # каждый вызов Bot API — отрезок в трассе апдейта; пул как у PTB по умолчанию
+    builder = builder.request(tracing.TracedRequest(request or HTTPXRequest(connection_pool_size=256)))
+    application = builder.build()
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("reload", reload_catalogs))
+    application.add_handler(CommandHandler("report", report_command))
     application.add_handler(CallbackQueryHandler(on_callback))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
     return application
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    global ptb_app
-    ptb_app = build_bot()
+    global ptb_app, update_queue, precreate_task, warmup_task
+    node.claim_slot()
+    compile_calendars()
+    path = journal_path(node.slot, node.workers)
+    if path:
+        # до приёма апдейтов: незаписанные строки прошлого запуска снова встают в очередь на запись
+        await order_buffer.restore(OrderJournal(path))
+        if node.leader:
+            # BOT_WORKERS поменяли: журналы слотов, которых больше нет, забирает ведущий
+            for orphan in orphan_journal_paths(node.workers):
+                await order_buffer.adopt(orphan)
+    bot_request = None
+    if FAKE_BACKENDS:
+        import fakes
+        bot_request = fakes.install()
+        log.warning("FAKE_BACKENDS=1: Google Sheets and Telegram are replaced with local fakes")
+    ptb_app = build_bot(bot_request)
     await ptb_app.initialize()
     await ptb_app.start()
 
+    update_queue = UpdateQueue(_process_update, workers=UPDATE_WORKERS, maxsize=UPDATE_QUEUE_SIZE)
+    update_queue.start()
+    await node.start(_on_cluster_message)
+
+    # Клиент Sheets и кэш адресов/товаров прогреваем в фоне: вебхук начинает принимать апдейты сразу
+    # (startup блокирует приём), а первые экраны, если прогрев ещё идёт, дождутся той же загрузки.
+    # Листы на ближайшие даты тоже готовим в фоне.
+    warmup_task = asyncio.create_task(jobs.warm_up())
+    if not node.leader:
+        # вебхук и фоновые задачи — только у ведущего процесса (слот 0)
+        log.info("BOT STARTED (worker slot %s)", node.slot)
+        return
+    precreate_task = asyncio.create_task(jobs.run_precreate_loop())
+
     if WEBHOOK_URL:
         url = f"{WEBHOOK_URL}/telegram/{WEBHOOK_SECRET}"
         try:
@@ -294,14 +978,23 @@ async def on_startup() -> None:
     log.info("BOT STARTED")
 
 
-
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    for task in (warmup_task, precreate_task):
+        if task:
+            task.cancel()
+    if update_queue:
+        await update_queue.drain(UPDATE_DRAIN_TIMEOUT)
+    await order_buffer.flush_all()
+    if order_buffer.journal:
+        await order_buffer.journal.close()
     if ptb_app:
         await ptb_app.stop()
         await ptb_app.shutdown()
+    await node.stop()
+    shutdown_sheets()
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=cluster.BOT_WORKERS)
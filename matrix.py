@@ -0,0 +1,78 @@
+# matrix.py
+from __future__ import annotations
+
+from array import array
+from typing import Iterator
+
+# Лист на дату — матрица "товары (строки) × магазины (колонки)". Держим её одним
+# плоским array('d') по строкам: idx = i * число_магазинов + j. Итоги по магазину —
+# срез с шагом, по товару — непрерывный срез, оба считаются sum() на C-уровне.
+
+
+def _number(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(" ", "").replace(" ", "").replace(",", "."))
+    except ValueError:
+        return 0.0
+
+
+class Matrix:
+    __slots__ = ("sheet", "items", "stores", "cols", "values")
+
+    def __init__(self, sheet: str, items: tuple[str, ...], stores: tuple[str, ...], cols: tuple[str, ...],
+                 values: array):
+        self.sheet = sheet
+        self.items = items          # названия товаров
+        self.stores = stores        # адреса магазинов
+        self.cols = cols            # буквы колонок магазинов
+        self.values = values
+
+    @classmethod
+    def from_block(cls, sheet: str, items: list[tuple[str, int]], stores: list[tuple[str, str]],
+                   block: list[list], row_start: int) -> "Matrix":
+        """
+        items: [(название, номер строки)], stores: [(адрес, буква колонки)] — подряд с первой колонки блока;
+        block: значения ячеек по строкам, начиная со строки row_start.
+        """
+        n = len(stores)
+        values = array("d", bytes(8 * len(items) * n))
+        for i, (_, row) in enumerate(items):
+            r = row - row_start
+            cells = block[r] if 0 <= r < len(block) else ()
+            base = i * n
+            for j, v in enumerate(cells[:n]):
+                if v != "" and v is not None:
+                    values[base + j] = _number(v)
+        return cls(sheet, tuple(name for name, _ in items), tuple(a for a, _ in stores),
+                   tuple(c for _, c in stores), values)
+
+    def qty(self, i: int, j: int) -> float:
+        return self.values[i * len(self.stores) + j]
+
+    def column(self, j: int) -> dict[str, float]:
+        """Ненулевые количества одного магазина: товар -> количество."""
+        n = len(self.stores)
+        return {self.items[i]: v for i, v in enumerate(self.values[j::n]) if v}
+
+    def store_totals(self) -> list[float]:
+        n = len(self.stores)
+        return [sum(self.values[j::n]) for j in range(n)]
+
+    def item_totals(self) -> list[float]:
+        n = len(self.stores)
+        return [sum(self.values[i * n:(i + 1) * n]) for i in range(len(self.items))]
+
+    def total(self) -> float:
+        return sum(self.values)
+
+    def cells(self) -> Iterator[tuple[int, int, float]]:
+        """Ненулевые ячейки: (индекс товара, индекс магазина, количество)."""
+        n = len(self.stores)
+        for idx, v in enumerate(self.values):
+            if v:
+                yield idx // n, idx % n, v
+
+    def __repr__(self) -> str:
+        return f"Matrix({self.sheet!r}, items={len(self.items)}, stores={len(self.stores)})"
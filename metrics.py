@@ -0,0 +1,151 @@
+# metrics.py
+from __future__ import annotations
+
+import time
+import functools
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+import tracing
+
+# Минимальная реализация метрик в формате Prometheus (text exposition 0.0.4) без зависимостей.
+# Наблюдение — это bisect по границам бакетов и пара инкрементов, так что на горячем пути почти бесплатно.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: list["_Metric"] = []
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Растущий счётчик: inc() или collect — функция, которая при отдаче /metrics снимает
+    уже подсчитанные где-то значения (поля *Stats), как у Gauge.
+    """
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 collect: Callable[[], dict[tuple[str, ...], float]] | None = None):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.collect = collect
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        values = self.collect() if self.collect is not None else self._values
+        return [f"{self.name}{_fmt_labels(self.label_names, k)} {v}" for k, v in values.items()]
+
+
+class Gauge(_Metric):
+    """Значение снимается в момент отдачи /metrics (функция возвращает {значения меток: число})."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 collect: Callable[[], dict[tuple[str, ...], float]] | None = None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def _samples(self) -> list[str]:
+        if self.collect is None:
+            return []
+        return [f"{self.name}{_fmt_labels(self.label_names, k)} {v}" for k, v in self.collect().items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}   # метки -> [counts по бакетам (+Inf последним), sum]
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def _samples(self) -> list[str]:
+        out = []
+        for k, (counts, total) in self._series.items():
+            acc = 0
+            for bound, c in zip((*self.buckets, float("inf")), counts):
+                acc += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _fmt_labels(self.label_names, k, 'le="' + le + '"')
+                out.append(f"{self.name}_bucket{labels} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.label_names, k)} {total}")
+            out.append(f"{self.name}_count{_fmt_labels(self.label_names, k)} {acc}")
+        return out
+
+
+def render() -> str:
+    lines: list[str] = []
+    for m in _registry:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===== Метрики бота =====
+
+HANDLER_SECONDS = Histogram("bot_step_seconds", "Duration of step_* handlers", ("step",))
+HANDLER_ERRORS = Counter("bot_step_errors_total", "Exceptions raised by step_* handlers", ("step",))
+
+CALLBACK_SECONDS = Histogram("bot_callback_seconds", "Duration of on_callback by action", ("action",))
+CALLBACK_ERRORS = Counter("bot_callback_errors_total", "Exceptions raised by on_callback by action", ("action",))
+
+SHEETS_SECONDS = Histogram("sheets_request_seconds", "Duration of Google Sheets API calls (including retries)", ("method",))
+SHEETS_ERRORS = Counter("sheets_request_errors_total", "Failed Google Sheets API calls", ("method", "status"))
+
+
+def timed_step(fn):
+    """
+    Декоратор для step_* обработчиков: время и ошибки в bot_step_seconds / bot_step_errors_total,
+    плюс отрезок с именем шага в трассе апдейта.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            with tracing.span(name):
+                return await fn(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - t, name)
+
+    return wrapper
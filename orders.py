@@ -0,0 +1,223 @@
+# orders.py
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from config import MatrixLayout
+from journal import OrderJournal, remove_journal
+from sheets import ensure_sheet_exists, write_qty_batch
+
+log = logging.getLogger("orders")
+
+# Через сколько секунд тишины строки заказа уходят в таблицу без нажатия "Завершить"
+ORDER_FLUSH_IDLE_SECONDS = float(os.getenv("ORDER_FLUSH_IDLE_SECONDS", "15"))
+# Повторы на 429/5xx делает планировщик квот (quota.py). Если запись не удалась и после них,
+# строки остаются (и в журнале), и через столько секунд пробуем снова
+ORDER_REPLAY_SECONDS = float(os.getenv("ORDER_REPLAY_SECONDS", "60"))
+# То же количество в ту же ячейку, записанное нами за последние столько секунд, повторно не отправляем.
+# Окно короткое — только на повторные нажатия подряд: дольше нельзя полагаться, что в ячейке всё ещё
+# наше значение (её могли очистить или поправить в таблице руками).
+ORDER_DEDUP_SECONDS = float(os.getenv("ORDER_DEDUP_SECONDS", "5"))
+ORDER_DEDUP_MAX_CELLS = 20_000
+
+
+@dataclass
+class OrderBufferStats:
+    coalesced: int = 0     # строки, перезаписанные новым нажатием до отправки (ушло только последнее значение)
+    unchanged: int = 0     # строки не отправлены: в ячейке уже это значение (записали мы же недавно)
+
+
+@dataclass
+class PendingOrder:
+    """Строки заказа одного магазина на один лист даты, ещё не записанные в таблицу."""
+    layout: MatrixLayout
+    daily_sheet: str
+    address_col: str
+    lines: dict[str, int] = field(default_factory=dict)   # товар -> количество (последнее значение)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    timer: asyncio.Task | None = None
+
+
+class OrderBuffer:
+    """
+    Write-behind буфер: нажатие количества только кладёт строку сюда,
+    а в Sheets заказ уходит одним values.batchUpdate — по "Завершить заказ"
+    или по таймеру простоя. С журналом (journal.py) строка сначала фиксируется на диске.
+    """
+
+    def __init__(self, idle_seconds: float = ORDER_FLUSH_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.journal: OrderJournal | None = None
+        self.stats = OrderBufferStats()
+        self._orders: dict[tuple[str, str, str], PendingOrder] = {}
+        # строки, которые записать нельзя (товара нет на листе): убраны из очереди и журнала, ждут показа пользователю
+        self._rejected: dict[tuple[str, str, str], dict[str, int]] = {}
+        # (лист, колонка, товар) -> (записанное количество, time.monotonic() записи)
+        self._written: OrderedDict[tuple[str, str, str, str], tuple[int, float]] = OrderedDict()
+
+    @staticmethod
+    def key(layout: MatrixLayout, daily_sheet: str, address_col: str) -> tuple[str, str, str]:
+        return layout.spreadsheet_id, daily_sheet, address_col.upper()
+
+    async def add(self, layout: MatrixLayout, daily_sheet: str, address_col: str, item_name: str, qty: int) -> PendingOrder:
+        return await self.add_lines(layout, daily_sheet, address_col, {item_name: qty})
+
+    async def add_lines(self, layout: MatrixLayout, daily_sheet: str, address_col: str, lines: dict[str, int]) -> PendingOrder:
+        """Несколько строк сразу (заказ списком) — уйдут тем же одним batchUpdate."""
+        if self.journal is not None:
+            await self.journal.append(layout, daily_sheet, address_col, lines)
+        return self._put(layout, daily_sheet, address_col, lines)
+
+    async def restore(self, journal: OrderJournal) -> int:
+        """Подключает журнал и ставит в очередь на запись всё, что не было записано до перезапуска."""
+        self.journal = journal
+        restored = await journal.load()
+        for layout, daily_sheet, address_col, item, qty in restored:
+            self._put(layout, daily_sheet, address_col, {item: qty})
+        if restored:
+            log.info("Restored %d unwritten order lines from the journal", len(restored))
+        return len(restored)
+
+    async def adopt(self, path: str) -> int:
+        """
+        Переносит строки из чужого журнала (процесса, которого больше нет) в свой и удаляет тот файл.
+        Ячейки, которые уже ждут записи у нас, не перекрываем.
+        """
+        orphan = OrderJournal(path)
+        try:
+            lines = await orphan.load()
+        finally:
+            await orphan.close()
+        groups: dict[tuple[str, str, str], tuple[MatrixLayout, str, str, dict[str, int]]] = {}
+        for layout, daily_sheet, address_col, item, qty in lines:
+            key = self.key(layout, daily_sheet, address_col)
+            if item in self.pending(layout, daily_sheet, address_col):
+                continue
+            groups.setdefault(key, (layout, daily_sheet, address_col, {}))[3][item] = qty
+        for layout, daily_sheet, address_col, group in groups.values():
+            # сначала в свой журнал (fsync), только потом удаляем чужой файл
+            await self.add_lines(layout, daily_sheet, address_col, group)
+        remove_journal(path)
+        if lines:
+            log.info("Adopted %d unwritten order lines from orphaned journal %s", len(lines), path)
+        return len(lines)
+
+    def _put(self, layout: MatrixLayout, daily_sheet: str, address_col: str, lines: dict[str, int]) -> PendingOrder:
+        key = self.key(layout, daily_sheet, address_col)
+        order = self._orders.get(key)
+        if order is None:
+            order = PendingOrder(layout=layout, daily_sheet=daily_sheet, address_col=address_col.upper())
+            self._orders[key] = order
+        self.stats.coalesced += sum(1 for item in lines if item in order.lines)
+        order.lines.update(lines)
+        self._schedule(key, order)
+        return order
+
+    def pending(self, layout: MatrixLayout, daily_sheet: str, address_col: str) -> dict[str, int]:
+        order = self._orders.get(self.key(layout, daily_sheet, address_col))
+        return dict(order.lines) if order else {}
+
+    def take_rejected(self, layout: MatrixLayout, daily_sheet: str, address_col: str) -> dict[str, int]:
+        """Строки, отброшенные при записи (товара нет на листе), — один раз, для сообщения пользователю."""
+        return self._rejected.pop(self.key(layout, daily_sheet, address_col), {})
+
+    async def flush(self, layout: MatrixLayout, daily_sheet: str, address_col: str) -> int:
+        """
+        Записывает накопленные строки. Возвращает число записанных строк (строки товаров, которых нет
+        на листе, отбрасываются — см. take_rejected); при ошибке — исключение,
+        а строки остаются в очереди и запишутся повторной попыткой через ORDER_REPLAY_SECONDS.
+        """
+        key = self.key(layout, daily_sheet, address_col)
+        try:
+            return await self._flush(key)
+        except Exception:
+            order = self._orders.get(key)
+            if order is not None:
+                self._schedule(key, order, ORDER_REPLAY_SECONDS)
+            raise
+
+    async def flush_all(self) -> None:
+        """Сбрасывает всё накопленное (при остановке приложения)."""
+        for key in list(self._orders):
+            try:
+                await self._flush(key)
+            except Exception as e:
+                log.error("Order flush failed on shutdown for %s: %s", key, e)
+
+    def _schedule(self, key: tuple[str, str, str], order: PendingOrder, delay: float | None = None) -> None:
+        # отменяется только таймер, который ещё ждёт; пишущий _flush отвязывает от order.timer
+        if order.timer is not None and not order.timer.done() and order.timer is not asyncio.current_task():
+            order.timer.cancel()
+        order.timer = asyncio.create_task(self._idle_flush(key, self.idle_seconds if delay is None else delay))
+
+    async def _idle_flush(self, key: tuple[str, str, str], delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self._flush(key)
+        except Exception as e:
+            log.error("Idle order flush failed for %s, retrying in %.0fs: %s", key, ORDER_REPLAY_SECONDS, e)
+            order = self._orders.get(key)
+            if order is not None:
+                self._schedule(key, order, ORDER_REPLAY_SECONDS)
+
+    async def _flush(self, key: tuple[str, str, str]) -> int:
+        order = self._orders.get(key)
+        if order is None:
+            return 0
+
+        async with order.lock:
+            if order.timer is asyncio.current_task():
+                # таймер уже пишет: новое нажатие его не отменяет (copyTo/запись оборвались бы на полпути),
+                # а ставит следующий
+                order.timer = None
+            if not order.lines:
+                return 0
+            # забираем снимок: строки, добавленные во время записи, уйдут следующим flush
+            lines = dict(order.lines)
+            now = time.monotonic()
+            cells = []
+            for item, qty in lines.items():
+                written = self._written.get((*key, item))
+                if written is not None and written[0] == qty and now - written[1] < ORDER_DEDUP_SECONDS:
+                    self.stats.unchanged += 1
+                else:
+                    cells.append((item, order.address_col, qty))
+
+            missing: list[str] = []
+            if cells:
+                # лист на дату мог не создаться, пока Sheets был недоступен
+                await ensure_sheet_exists(order.layout, order.daily_sheet)
+                missing = await write_qty_batch(order.layout, order.daily_sheet, cells)
+
+            if missing:
+                # повтор не поможет: такой строки на листе нет — убираем из очереди и журнала и сообщаем пользователю
+                log.error("Items not found on %s, order lines dropped for %s: %s", order.daily_sheet, key, missing)
+                self._rejected.setdefault(key, {}).update({item: lines[item] for item in missing})
+                cells = [c for c in cells if c[0] not in missing]
+
+            now = time.monotonic()
+            for item, _, qty in cells:
+                self._written[(*key, item)] = (qty, now)
+                self._written.move_to_end((*key, item))
+            while len(self._written) > ORDER_DEDUP_MAX_CELLS:
+                self._written.popitem(last=False)
+
+            if self.journal is not None:
+                try:
+                    await self.journal.applied(order.layout, order.daily_sheet, order.address_col, lines)
+                except Exception as e:
+                    # в таблице строки уже есть; в худшем случае после перезапуска запишутся ещё раз тем же значением
+                    log.warning("Journal cleanup failed for %s: %s", key, e)
+            for item, qty in lines.items():
+                if order.lines.get(item) == qty:
+                    del order.lines[item]
+            if not order.lines:
+                if order.timer is not None and order.timer is not asyncio.current_task():
+                    order.timer.cancel()
+                self._orders.pop(key, None)
+            return len(lines) - len(missing)
@@ -0,0 +1,186 @@
+# persistence.py
+from __future__ import annotations
+
+import os
+import json
+import time
+import zlib
+import logging
+from dataclasses import dataclass
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from localdb import LocalDB
+
+log = logging.getLogger("persistence")
+
+# Сессии магазинов (context.user_data) в локальном SQLite, чтобы редеплой не обрывал заказ на середине.
+# Пустой SESSION_DB_PATH — без сохранения (как раньше).
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.sqlite3")
+SESSION_FLUSH_SECONDS = float(os.getenv("SESSION_FLUSH_SECONDS", "5"))
+SESSION_TTL_DAYS = float(os.getenv("SESSION_TTL_DAYS", "7"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id    INTEGER PRIMARY KEY,
+    data       TEXT    NOT NULL,
+    updated_at REAL    NOT NULL
+)
+"""
+
+
+@dataclass
+class SessionStoreStats:
+    loaded: int = 0          # сессий поднято из базы (лениво, при первом апдейте пользователя)
+    written: int = 0         # сессий записано
+    unchanged: int = 0       # пропущено: данные не менялись с последней записи
+    deleted: int = 0
+    commits: int = 0         # транзакций (одна на прогон update_persistence)
+    pruned: int = 0          # удалено старше SESSION_TTL_DAYS при старте
+
+
+def _dump(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Хранит только user_data, по строке JSON на пользователя (WAL).
+
+    - при старте ничего не читается: сессия пользователя поднимается из базы
+      в refresh_user_data перед первым его апдейтом;
+    - update_user_data пишет только изменившиеся сессии (сравнение crc32 от JSON),
+      все изменения одного прогона update_persistence — одной транзакцией.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, update_interval: float = SESSION_FLUSH_SECONDS):
+        super().__init__(store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True,
+                                                     callback_data=False), update_interval=update_interval)
+        self.path = path
+        self.stats = SessionStoreStats()
+        self._db = LocalDB(path, _SCHEMA, thread_name="sessions")
+        self._loaded: set[int] = set()
+        self._digests: dict[int, int] = {}                  # user_id -> crc32 записанного JSON
+        self._pending: dict[int, tuple[str, int] | None] = {}   # None — удалить
+
+    # --- sqlite (только в потоке базы, см. localdb.py) ---
+    def _prune_sync(self) -> int:
+        cutoff = time.time() - SESSION_TTL_DAYS * 86400
+        return self._db.db().execute("DELETE FROM user_data WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def _load_sync(self, user_id: int) -> str | None:
+        row = self._db.db().execute("SELECT data FROM user_data WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write_sync(self, batch: dict[int, tuple[str, int] | None]) -> None:
+        db = self._db.db()
+        now = time.time()
+        db.execute("BEGIN")
+        try:
+            for user_id, item in batch.items():
+                if item is None:
+                    db.execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+                else:
+                    db.execute("INSERT INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?) "
+                               "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                               (user_id, item[0], now))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    # --- запись ---
+    async def _write_pending(self) -> None:
+        # все update_user_data текущего прогона update_persistence — одной транзакцией (LocalDB.commit)
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            await self._db.call(self._write_sync, batch)
+        except Exception:
+            # вернём в очередь то, что не успели перезаписать более новыми данными
+            for user_id, item in batch.items():
+                self._pending.setdefault(user_id, item)
+            raise
+        self.stats.commits += 1
+        for user_id, item in batch.items():
+            if item is None:
+                self._digests.pop(user_id, None)
+                self.stats.deleted += 1
+            else:
+                self._digests[user_id] = item[1]
+                self.stats.written += 1
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        if not data:
+            if user_id in self._digests or user_id in self._pending:
+                await self.drop_user_data(user_id)
+            return
+        blob = _dump(data)
+        digest = zlib.crc32(blob.encode("utf-8"))
+        if self._digests.get(user_id) == digest and user_id not in self._pending:
+            self.stats.unchanged += 1
+            return
+        self._pending[user_id] = (blob, digest)
+        await self._db.commit(self._write_pending)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending[user_id] = None
+        await self._db.commit(self._write_pending)
+
+    # --- чтение ---
+    async def get_user_data(self) -> dict[int, dict]:
+        # сессии не читаем целиком — см. refresh_user_data; заодно чистим брошенные
+        self.stats.pruned = await self._db.call(self._prune_sync)
+        if self.stats.pruned:
+            log.info("Pruned %d sessions older than %.0f days", self.stats.pruned, SESSION_TTL_DAYS)
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        if user_id in self._loaded:
+            return
+        self._loaded.add(user_id)
+        blob = await self._db.call(self._load_sync, user_id)
+        if blob is None:
+            return
+        self._digests[user_id] = zlib.crc32(blob.encode("utf-8"))
+        for key, value in json.loads(blob).items():
+            user_data.setdefault(key, value)
+        self.stats.loaded += 1
+
+    async def flush(self) -> None:
+        await self._db.close(self._write_pending)
+
+    # --- остальное не храним ---
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        pass
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
@@ -0,0 +1,195 @@
+# quota.py
+from __future__ import annotations
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable
+
+from googleapiclient.errors import HttpError
+
+from cluster import BOT_WORKERS
+
+log = logging.getLogger("quota")
+
+# Квоты Google Sheets считаются в минуту, отдельно на чтение и на запись.
+# По умолчанию — лимит "на пользователя" (сервисный аккаунт у нас один).
+# Квота общая на все процессы, поэтому при BOT_WORKERS > 1 каждому достаётся своя доля.
+SHEETS_READS_PER_MINUTE = float(os.getenv("SHEETS_READS_PER_MINUTE", "60")) / BOT_WORKERS
+SHEETS_WRITES_PER_MINUTE = float(os.getenv("SHEETS_WRITES_PER_MINUTE", "60")) / BOT_WORKERS
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+SHEETS_BACKOFF_BASE_SECONDS = 0.5
+SHEETS_BACKOFF_MAX_SECONDS = 32.0
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Запросы, повтор которых после 5xx/таймаута может выполнить их дважды: copyTo создал бы вторую
+# "Копия …". Их повторяем только на 429 — такой запрос Google гарантированно не выполнял.
+NON_IDEMPOTENT_METHODS = {"sheets.spreadsheets.sheets.copyTo"}
+
+
+class Priority(IntEnum):
+    USER_WRITE = 0    # запись заказа пользователя
+    MENU = 1          # чтение для экранов бота
+    BACKGROUND = 2    # фоновые задачи (прогрев, заготовка листов)
+
+
+_priority: ContextVar[Priority | None] = ContextVar("sheets_priority", default=None)
+
+
+@contextmanager
+def priority(p: Priority):
+    """Все запросы к Sheets внутри блока идут с приоритетом p (например, BACKGROUND в фоновых задачах)."""
+    token = _priority.set(p)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(kind: str) -> Priority:
+    p = _priority.get()
+    if p is not None:
+        return p
+    return Priority.USER_WRITE if kind == "write" else Priority.MENU
+
+
+@dataclass
+class LaneStats:
+    granted: int = 0
+    waiting: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+
+
+@dataclass
+class BucketStats:
+    granted: int = 0
+    throttled: int = 0      # ответы 429/5xx, после которых ждали и повторяли
+    failed: int = 0         # исчерпали повторы
+    lanes: dict[str, LaneStats] = field(default_factory=lambda: {p.name: LaneStats() for p in Priority})
+
+
+class TokenBucket:
+    """
+    Токен-бакет с очередью ожидающих по приоритетам: освободившийся токен
+    получает самый приоритетный (а внутри приоритета — самый ранний) запрос.
+    """
+
+    def __init__(self, per_minute: float, burst: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 4)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.stats = BucketStats()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._pump: asyncio.Task | None = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, p: Priority) -> None:
+        lane = self.stats.lanes[p.name]
+        t = time.monotonic()
+
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(p), next(self._seq), fut))
+            lane.waiting += 1
+            if self._pump is None or self._pump.done():
+                self._pump = asyncio.create_task(self._run_pump())
+            try:
+                await fut
+            finally:
+                lane.waiting -= 1
+
+        wait_ms = (time.monotonic() - t) * 1000
+        lane.granted += 1
+        lane.wait_ms_total += wait_ms
+        lane.wait_ms_max = max(lane.wait_ms_max, wait_ms)
+        self.stats.granted += 1
+
+    async def _run_pump(self) -> None:
+        while self._waiters:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():  # ожидавший отменён — токен не тратим
+                continue
+            self.tokens -= 1
+            fut.set_result(None)
+
+
+class SheetsScheduler:
+    """Единая точка выполнения запросов к Sheets: квоты, приоритеты и повторы с backoff."""
+
+    def __init__(self, reads_per_minute: float = SHEETS_READS_PER_MINUTE,
+                 writes_per_minute: float = SHEETS_WRITES_PER_MINUTE,
+                 max_retries: int = SHEETS_MAX_RETRIES):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute),
+            "write": TokenBucket(writes_per_minute),
+        }
+        self.max_retries = max_retries
+
+    async def run(self, kind: str, call: Callable[[], Awaitable[Any]], idempotent: bool = True) -> Any:
+        bucket = self.buckets[kind]
+        p = current_priority(kind)
+        attempt = 0
+        while True:
+            await bucket.acquire(p)
+            try:
+                return await call()
+            except Exception as e:
+                if not _is_retryable(e, idempotent) or attempt >= self.max_retries:
+                    if _is_retryable(e, idempotent):
+                        bucket.stats.failed += 1
+                    raise
+                bucket.stats.throttled += 1
+                # экспоненциальный backoff с полным jitter
+                delay = random.uniform(0, min(SHEETS_BACKOFF_MAX_SECONDS, SHEETS_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                attempt += 1
+                log.warning("Sheets %s throttled (%s), retry %d in %.2fs", kind, _status_of(e), attempt, delay)
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, BucketStats]:
+        return {kind: b.stats for kind, b in self.buckets.items()}
+
+
+def _status_of(e: Exception) -> int | None:
+    if isinstance(e, HttpError):
+        return e.resp.status
+    return None
+
+
+def _is_retryable(e: Exception, idempotent: bool = True) -> bool:
+    status = _status_of(e)
+    if not idempotent:
+        return status == 429
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return isinstance(e, (TimeoutError, ConnectionError))
+
+
+def request_idempotent(request) -> bool:
+    return getattr(request, "methodId", None) not in NON_IDEMPOTENT_METHODS
+
+
+def request_kind(request) -> str:
+    """Чтение или запись — по HTTP-методу запроса googleapiclient."""
+    return "read" if getattr(request, "method", "GET") == "GET" else "write"
@@ -0,0 +1,80 @@
+# report.py
+from __future__ import annotations
+
+import io
+import csv
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterator
+
+from config import LAYOUTS
+from matrix import Matrix
+from sheets import daily_sheet_title, read_matrix, sheet_exists
+
+# Сводка "что заказали на дату" по листам RC_/FREEZE_YYYY-MM-DD: для /report и CSV-выгрузки.
+
+
+@dataclass
+class DateReport:
+    day: date
+    matrices: dict[str, Matrix] = field(default_factory=dict)   # тип заказа -> матрица листа
+
+    def total(self) -> float:
+        return sum(m.total() for m in self.matrices.values())
+
+
+async def build_report(day: date) -> DateReport:
+    """Читает листы всех типов заказа на дату (каждый — одним batchGet); отсутствующие пропускаются."""
+    report = DateReport(day)
+
+    async def load(otype: str, layout) -> None:
+        title = daily_sheet_title(otype, day)
+        if await sheet_exists(layout.spreadsheet_id, title):
+            report.matrices[otype] = await read_matrix(layout, title)
+
+    await asyncio.gather(*(load(otype, layout) for otype, layout in LAYOUTS.items()))
+    report.matrices = {k: report.matrices[k] for k in LAYOUTS if k in report.matrices}
+    return report
+
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if v == int(v) else f"{v:g}"
+
+
+def render_text(report: DateReport, top: int = 30) -> str:
+    if not report.matrices:
+        return f"📊 {report.day.isoformat()}: листов на эту дату нет."
+    lines = [f"📊 Заказы на {report.day.isoformat()} — всего {_fmt(report.total())}"]
+    for otype, m in report.matrices.items():
+        stores = [(m.stores[j], t) for j, t in enumerate(m.store_totals()) if t]
+        items = [(m.items[i], t) for i, t in enumerate(m.item_totals()) if t]
+        lines.append(f"\n{otype} ({m.sheet}): {_fmt(m.total())}, магазинов с заказом: {len(stores)} из {len(m.stores)}")
+        if items:
+            lines.append("По товарам:")
+            lines.extend(f"• {name} — {_fmt(t)}" for name, t in items[:top])
+        if stores:
+            lines.append("По магазинам:")
+            lines.extend(f"• {name} — {_fmt(t)}" for name, t in sorted(stores, key=lambda s: -s[1])[:top])
+            if len(stores) > top:
+                lines.append(f"… и ещё {len(stores) - top}")
+    return "\n".join(lines)
+
+
+def iter_csv(report: DateReport, chunk_rows: int = 500) -> Iterator[str]:
+    """CSV по ненулевым ячейкам (тип, лист, товар, магазин, колонка, количество) — кусками для StreamingResponse."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["date", "order_type", "sheet", "item", "store", "column", "qty"])
+    rows = 1
+    for otype, m in report.matrices.items():
+        for i, j, v in m.cells():
+            writer.writerow([report.day.isoformat(), otype, m.sheet, m.items[i], m.stores[j], m.cols[j], _fmt(v)])
+            rows += 1
+            if rows >= chunk_rows:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                rows = 0
+    if buf.tell():
+        yield buf.getvalue()
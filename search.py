@@ -0,0 +1,59 @@
+# search.py
+from __future__ import annotations
+
+import heapq
+from collections import OrderedDict
+
+from catalog import Catalog, normalize
+from sheets import AddressCol
+
+# Поиск магазина по части адреса: "ленина 12", "лен 1", "тверская".
+# Каждое слово запроса должно быть началом какого-то слова адреса.
+# Индекс "префикс слова -> номера магазинов" строится один раз на версию каталога адресов
+# (id каталога — crc32 содержимого, поэтому без изменения шапки индекс не перестраивается).
+
+MAX_PREFIX = 8        # более длинные слова запроса ищем по первым MAX_PREFIX символам и дофильтровываем
+
+
+class StoreIndex:
+    def __init__(self, catalog: Catalog[AddressCol]):
+        self.catalog = catalog
+        self.tokens = [tuple(normalize(name).split()) for name in catalog.names]
+        postings: dict[str, set[int]] = {}
+        for i, toks in enumerate(self.tokens):
+            for t in toks:
+                for n in range(1, min(len(t), MAX_PREFIX) + 1):
+                    postings.setdefault(t[:n], set()).add(i)
+        self.by_prefix: dict[str, frozenset[int]] = {p: frozenset(ids) for p, ids in postings.items()}
+
+    def search(self, query: str, limit: int = 20) -> tuple[list[int], int]:
+        """Индексы подходящих магазинов по порядку колонок (не больше limit) и общее число совпадений."""
+        words = set(normalize(query).split())
+        if not words:
+            return [], 0
+
+        # сначала самые редкие префиксы: пересечение сразу становится маленьким
+        postings = sorted(((self.by_prefix.get(w[:MAX_PREFIX], frozenset()), w) for w in words), key=lambda p: len(p[0]))
+        found: set[int] | frozenset[int] = postings[0][0]
+        for ids, _ in postings[1:]:
+            if not found:
+                break
+            found = found & ids
+        for w in words:
+            if len(w) > MAX_PREFIX and found:
+                found = {i for i in found if any(t.startswith(w) for t in self.tokens[i])}
+        if not found:
+            return [], 0
+        return heapq.nsmallest(limit, found), len(found)
+
+
+_indexes: OrderedDict[int, StoreIndex] = OrderedDict()
+
+
+def index_for(catalog: Catalog[AddressCol]) -> StoreIndex:
+    idx = _indexes.get(catalog.id)
+    if idx is None or idx.catalog is not catalog:
+        idx = _indexes[catalog.id] = StoreIndex(catalog)
+        while len(_indexes) > 8:
+            _indexes.popitem(last=False)
+    return idx
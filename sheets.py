@@ -3,18 +3,51 @@ from __future__ import annotations
 
 import os
 import json
-from dataclasses import dataclass
+import asyncio
+import logging
+import threading
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import date
-from typing import Optional
-
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 
+import metrics
+import tracing
+from breaker import BreakerStats, CircuitBreaker, SheetsUnavailable
+from cache import AsyncTTLCache, CacheStats
+from catalog import Catalog, intern_catalog
+from cluster import interprocess_lock
 from config import MatrixLayout
+from discovery import sheets_document
+from matrix import Matrix, _number
+from quota import SheetsScheduler, BucketStats, request_idempotent, request_kind
 
+log = logging.getLogger("sheets")
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
+# googleapiclient синхронный: каждый .execute() блокирует поток до ответа Google.
+# Поэтому все обращения к Sheets выполняются в отдельном ограниченном пуле потоков,
+# а event loop (uvicorn + вебхук) продолжает обслуживать остальные магазины.
+SHEETS_MAX_CONCURRENCY = int(os.getenv("SHEETS_MAX_CONCURRENCY", "8"))
+SHEETS_HTTP_TIMEOUT = float(os.getenv("SHEETS_HTTP_TIMEOUT", "30"))
+
+# Адреса и товары в шаблонах меняются редко — держим их в кэше, а не читаем на каждый экран.
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "300"))
+# Сколько колонок шапки просматривать вправо в поисках адресов (до первой пустой)
+ADDRESS_SCAN_COLUMNS = int(os.getenv("ADDRESS_SCAN_COLUMNS", "200"))
+# Колонки магазинов для "Мой заказ" (см. read_store_column)
+STORE_COLUMN_TTL_SECONDS = float(os.getenv("STORE_COLUMN_TTL_SECONDS", "600"))
+STORE_COLUMN_CACHE_SIZE = 5000
+# Последние удачно прочитанные адреса и товары — на случай, когда Google недоступен (и после рестарта)
+SHEETS_SNAPSHOT_PATH = os.getenv("SHEETS_SNAPSHOT_PATH", "sheets-snapshot.json")
+
+_executor: ThreadPoolExecutor | None = None
+_catalog_cache = AsyncTTLCache(ttl=CATALOG_TTL_SECONDS)
+_scheduler = SheetsScheduler()
+_breaker = CircuitBreaker()
+
 
 def _col_letter_to_index(col: str) -> int:
     """A -> 1, B -> 2, ..."""
@@ -34,14 +67,214 @@ def _index_to_col_letter(n: int) -> str:
     return s
 
 
+# google.auth / googleapiclient / httplib2 импортируются при создании клиента (в пуле Sheets,
+# см. preload), а не при импорте модуля: так вебхук начинает принимать запросы раньше.
+@functools.cache
+def _shared_credentials_class():
+    from google.oauth2.service_account import Credentials
+
+    class _SharedCredentials(Credentials):
+        """
+        Service account credentials, общие для всех потоков пула.
+        Токен живёт до истечения срока; если несколько потоков одновременно увидели
+        протухший токен — новый выпускает только первый, остальные берут готовый.
+        """
+
+        def refresh(self, request):
+            stale_token = self.token
+            with _token_lock:
+                if self.token != stale_token and self.valid:
+                    return
+                super().refresh(request)
+                if _client is not None:
+                    _client.stats.tokens_minted += 1
+
+    return _SharedCredentials
+
+
+_token_lock = threading.Lock()
+
+
+@dataclass
+class SheetsClientStats:
+    tokens_minted: int = 0        # сколько раз получали OAuth-токен
+    connections_opened: int = 0   # сколько keep-alive HTTP-сессий создано
+    requests_executed: int = 0
+
+
+class SheetsClient:
+    """
+    Долгоживущий клиент Sheets на весь процесс:
+    - credentials и discovery-клиент создаются один раз;
+    - у каждого потока пула своя keep-alive HTTP-сессия (httplib2 не потокобезопасен),
+      поэтому TLS-соединение переиспользуется между вызовами.
+    """
+
+    def __init__(self, info: dict):
+        from googleapiclient.discovery import build_from_document
+
+        self.stats = SheetsClientStats()
+        self.credentials = _shared_credentials_class().from_service_account_info(info, scopes=SCOPES)
+        self._local = threading.local()
+        self._sessions: list = []      # AuthorizedHttp
+        self._sessions_lock = threading.Lock()
+        # документ из репозитория (discovery.py), а не из пакета googleapiclient
+        self.service = build_from_document(sheets_document(), http=self._session())
+
+    def _session(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT))
+            self._local.http = http
+            with self._sessions_lock:
+                self._sessions.append(http)
+                self.stats.connections_opened += 1
+        return http
+
+    def execute(self, request):
+        """Выполняет запрос googleapiclient через HTTP-сессию текущего потока."""
+        self.stats.requests_executed += 1
+        return request.execute(http=self._session())
+
+    def close(self) -> None:
+        with self._sessions_lock:
+            for http in self._sessions:
+                http.close()
+            self._sessions.clear()
+
+
+_client: SheetsClient | None = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> SheetsClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                raw = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
+                if not raw:
+                    raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON env var is missing")
+                _client = SheetsClient(json.loads(raw))
+    return _client
+
+
+async def preload() -> None:
+    """Создаёт клиент заранее (импорты, ключ сервисного аккаунта) — в фоне при старте."""
+    await _run(_get_client)
+
+
+def install_client(client) -> None:
+    """Подменяет клиент Sheets (fakes.FakeSheetsClient для бенчмарков и FAKE_BACKENDS=1)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
 def _get_sheets_service():
-    raw = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
-    if not raw:
-        raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON env var is missing")
+    return _get_client().service
+
+
+def client_stats() -> SheetsClientStats | None:
+    """Счётчики клиента Sheets (None, если клиент ещё не создавался)."""
+    return _client.stats if _client is not None else None
 
-    info = json.loads(raw)
-    creds = Credentials.from_service_account_info(info, scopes=SCOPES)
-    return build("sheets", "v4", credentials=creds, cache_discovery=False)
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_CONCURRENCY, thread_name_prefix="sheets")
+    return _executor
+
+
+async def _run(fn, *args):
+    """Выполняет блокирующую функцию в пуле Sheets, не блокируя event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def _execute_sync(request):
+    return _get_client().execute(request)
+
+
+async def _execute(request, queued: bool = True):
+    """
+    Асинхронный .execute() для запроса googleapiclient.
+    Идёт через планировщик квот: токен-бакет чтения/записи, приоритеты, повторы на 429/5xx (copyTo — только на 429).
+    queued=False — одна попытка мимо планировщика (проба /health не должна стоять в очереди за чтениями).
+    Пока предохранитель разомкнут (Google не отвечает), сразу бросает SheetsUnavailable.
+    """
+    method = _method_name(request)
+    _breaker.before()
+    t = time.perf_counter()
+    try:
+        with tracing.span(f"sheets.{method}"):
+            if queued:
+                resp = await _scheduler.run(request_kind(request), lambda: _run(_execute_sync, request),
+                                            idempotent=request_idempotent(request))
+            else:
+                resp = await _run(_execute_sync, request)
+    except Exception as e:
+        _breaker.failure(e)
+        metrics.SHEETS_ERRORS.inc(method, str(getattr(getattr(e, "resp", None), "status", type(e).__name__)))
+        raise
+    except BaseException:
+        # отмена (таймаут вызывающего): ответа нет, но пробное место предохранителя надо освободить
+        _breaker.abandoned()
+        raise
+    else:
+        _breaker.success()
+        return resp
+    finally:
+        metrics.SHEETS_SECONDS.observe(time.perf_counter() - t, method)
+
+
+def _method_name(request) -> str:
+    """'sheets.spreadsheets.values.get' -> 'values.get', '...sheets.copyTo' -> 'copyTo'."""
+    method_id = getattr(request, "methodId", None) or "unknown"
+    name = method_id.removeprefix("sheets.spreadsheets.")
+    return name.removeprefix("sheets.")
+
+
+async def ping(spreadsheet_id: str) -> None:
+    """
+    Минимальный запрос к Sheets — проверка доступности для /health. Мимо очереди квот: при всплеске чтений
+    проба иначе ждала бы токена и по таймауту считала бы Google недоступным. Раз в HEALTH_SHEETS_CACHE_SECONDS
+    квоту она не выбирает.
+    """
+    service = await _run(_get_sheets_service)
+    await _execute(service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields="spreadsheetId"), queued=False)
+
+
+def quota_stats() -> dict[str, BucketStats]:
+    return _scheduler.stats()
+
+
+def breaker_stats() -> BreakerStats:
+    return _breaker.stats
+
+
+def sheets_degraded() -> bool:
+    """Google Sheets сейчас считается недоступным (предохранитель разомкнут)."""
+    return _breaker.open
+
+
+def shutdown_sheets() -> None:
+    """Останавливает пул потоков Sheets и закрывает HTTP-сессии (вызывается при остановке приложения)."""
+    global _executor, _client
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class ItemNotFound(RuntimeError):
+    """Товара нет в колонке товаров листа на дату (шаблон поменялся после создания листа)."""
 
 
 @dataclass(frozen=True)
@@ -51,158 +284,440 @@ class AddressCol:
     col_index: int    # 1-based индекс колонки
 
 
-async def read_addresses(layout: MatrixLayout) -> list[AddressCol]:
+@dataclass(frozen=True)
+class ItemRow:
+    name: str
+    row: int          # номер строки товара (одинаковый в шаблоне и листах на дату)
+
+
+def _layout_key(kind: str, layout: MatrixLayout) -> tuple[str, str, str]:
+    # MatrixLayout нехэшируемый (внутри set), поэтому ключ — по месту шаблона
+    return kind, layout.spreadsheet_id, layout.template_sheet_name
+
+
+async def read_addresses(layout: MatrixLayout) -> Catalog[AddressCol]:
     """
-    Читает адреса вправо по одной строке, начиная с layout.address_start_col_letter.
-    Останавливается на первой пустой ячейке.
+    Адреса из шапки шаблона (через кэш) — общий для всех объект каталога.
+    Если Sheets недоступен и в кэше ничего нет — из снимка на диске.
     """
-    service = _get_sheets_service()
-    sheet = layout.template_sheet_name
+    key = _layout_key("addresses", layout)
+    try:
+        return await _catalog_cache.get(key, lambda: _load_addresses(layout))
+    except Exception as e:
+        return _catalog_from_snapshot(key, AddressCol, e)
 
-    start_idx = _col_letter_to_index(layout.address_start_col_letter)
-    # Читаем с запасом вправо (например, 200 колонок) и сами остановимся на пустой.
-    end_idx = start_idx + 200
-    start_col = _index_to_col_letter(start_idx)
-    end_col = _index_to_col_letter(end_idx)
-
-    rng = f"{sheet}!{start_col}{layout.address_header_row}:{end_col}{layout.address_header_row}"
 
-    resp = service.spreadsheets().values().get(
+async def read_items(layout: MatrixLayout) -> Catalog[ItemRow]:
+    """
+    Товары из колонки шаблона (через кэш) — общий для всех объект каталога.
+    Если Sheets недоступен и в кэше ничего нет — из снимка на диске.
+    """
+    key = _layout_key("items", layout)
+    try:
+        return await _catalog_cache.get(key, lambda: _load_items(layout))
+    except Exception as e:
+        return _catalog_from_snapshot(key, ItemRow, e)
+
+
+# Снимок каталогов: {"addresses:<spreadsheet_id>:<шаблон>": [{...AddressCol}, ...], ...}.
+# Пишется при каждой загрузке, которая что-то изменила; читается только при сбое загрузки.
+_snapshot: dict[str, list[dict]] | None = None
+_snapshot_lock = asyncio.Lock()
+
+
+def _snapshot_data() -> dict[str, list[dict]]:
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = {}
+        if SHEETS_SNAPSHOT_PATH and os.path.exists(SHEETS_SNAPSHOT_PATH):
+            try:
+                with open(SHEETS_SNAPSHOT_PATH, encoding="utf-8") as f:
+                    _snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                log.warning("Ignoring unreadable catalog snapshot %s: %s", SHEETS_SNAPSHOT_PATH, e)
+    return _snapshot
+
+
+def _write_snapshot_sync(data: dict[str, list[dict]]) -> None:
+    tmp = f"{SHEETS_SNAPSHOT_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, SHEETS_SNAPSHOT_PATH)
+
+
+async def _save_snapshot(key: tuple[str, str, str], entries: tuple) -> None:
+    if not SHEETS_SNAPSHOT_PATH:
+        return
+    data = _snapshot_data()
+    rows = [asdict(e) for e in entries]
+    name = ":".join(key)
+    if data.get(name) == rows:
+        return
+    data[name] = rows
+    try:
+        async with _snapshot_lock:
+            await _run(_write_snapshot_sync, dict(data))
+    except OSError as e:
+        log.warning("Failed to write catalog snapshot: %s", e)
+
+
+def _catalog_from_snapshot(key: tuple[str, str, str], entry_type: type, error: Exception) -> Catalog:
+    rows = _snapshot_data().get(":".join(key))
+    if rows is None:
+        raise error
+    entries = tuple(entry_type(**r) for r in rows)
+    names = tuple(e.address if entry_type is AddressCol else e.name for e in entries)
+    _breaker.stats.degraded_reads += 1
+    log.warning("Serving %s from snapshot (%d entries): %s", key[0], len(entries), error)
+    return intern_catalog(key[0], key, entries, names)
+
+
+def invalidate_layout_cache() -> None:
+    """Сбрасывает кэш адресов и товаров (после правки шаблона) и индексы строк листов на дату."""
+    _catalog_cache.invalidate()
+    _row_index.invalidate()
+    _store_columns.invalidate()
+
+
+def catalog_cache_stats() -> CacheStats:
+    return _catalog_cache.stats
+
+
+async def _load_addresses(layout: MatrixLayout) -> Catalog[AddressCol]:
+    """
+    Читает адреса вправо по одной строке, начиная с layout.address_start_col_letter.
+    Останавливается на первой пустой ячейке.
+    """
+    service = await _run(_get_sheets_service)
+    resp = await _execute(service.spreadsheets().values().get(
         spreadsheetId=layout.spreadsheet_id,
-        range=rng,
+        range=_address_range(layout, layout.template_sheet_name),
         majorDimension="ROWS"
-    ).execute()
+    ))
 
     row = (resp.get("values") or [[]])[0]  # список значений по колонкам
+    out = _parse_address_row(layout, row)
+    await _save_snapshot(_layout_key("addresses", layout), tuple(out))
+    return intern_catalog("addresses", _layout_key("addresses", layout), tuple(out), tuple(a.address for a in out))
+
+
+def _address_range(layout: MatrixLayout, sheet: str) -> str:
+    # Читаем с запасом вправо и сами остановимся на пустой.
+    start_idx = _col_letter_to_index(layout.address_start_col_letter)
+    end_col = _index_to_col_letter(start_idx + ADDRESS_SCAN_COLUMNS)
+    row = layout.address_header_row
+    return f"{sheet}!{layout.address_start_col_letter.upper()}{row}:{end_col}{row}"
+
+
+def _parse_address_row(layout: MatrixLayout, row: list) -> list[AddressCol]:
+    start_idx = _col_letter_to_index(layout.address_start_col_letter)
     out: list[AddressCol] = []
     for offset, val in enumerate(row):
-        v = (val or "").strip()
+        v = str(val or "").strip()
         if v == "":
             break
         col_index = start_idx + offset
         out.append(AddressCol(address=v, col_letter=_index_to_col_letter(col_index), col_index=col_index))
-
     return out
 
 
-async def read_items(layout: MatrixLayout) -> list[str]:
-    """
-    Читает названия товаров из одной колонки в диапазоне строк.
-    Учитывает исключения строк и значений.
-    """
-    service = _get_sheets_service()
-    sheet = layout.template_sheet_name
+async def _read_item_column(layout: MatrixLayout, sheet: str) -> list:
+    """Сырые значения колонки товаров (item_row_start..item_row_end) на листе sheet."""
+    service = await _run(_get_sheets_service)
 
     col = layout.item_name_col_letter.upper()
     rng = f"{sheet}!{col}{layout.item_row_start}:{col}{layout.item_row_end}"
 
-    resp = service.spreadsheets().values().get(
+    resp = await _execute(service.spreadsheets().values().get(
         spreadsheetId=layout.spreadsheet_id,
         range=rng,
         majorDimension="COLUMNS",
-    ).execute()
+    ))
+
+    return (resp.get("values") or [[]])[0]  # список строковых значений
+
+
+async def _load_items(layout: MatrixLayout) -> Catalog[ItemRow]:
+    """
+    Читает названия товаров из одной колонки в диапазоне строк.
+    Учитывает исключения строк и значений.
+    """
+    col_vals = await _read_item_column(layout, layout.template_sheet_name)
+    items = _parse_item_rows(layout, col_vals)
+    await _save_snapshot(_layout_key("items", layout), tuple(items))
+    return intern_catalog("items", _layout_key("items", layout), tuple(items), tuple(r.name for r in items))
 
-    col_vals = (resp.get("values") or [[]])[0]  # список строковых значений
 
+def _parse_item_rows(layout: MatrixLayout, col_vals: list) -> list[ItemRow]:
     exclude_rows = layout.item_exclude_rows or set()
     exclude_values = set(x.strip() for x in (layout.item_exclude_values or set()))
 
-    items: list[str] = []
+    items: list[ItemRow] = []
     for i, val in enumerate(col_vals):
         row_num = layout.item_row_start + i
         if row_num in exclude_rows:
             continue
-        v = (val or "").strip()
+        v = str(val or "").strip()
         if not v:
             continue
         if v in exclude_values:
             continue
-        items.append(v)
-
+        items.append(ItemRow(name=v, row=row_num))
     return items
 
 
+# Карта "название листа -> sheetId" по каждой таблице. Листы на дату только добавляются,
+# поэтому известный лист резолвится без обращения к API, а метаданные перечитываются
+# лишь когда нужного листа в карте нет.
+_sheet_ids: dict[str, dict[str, int]] = {}
+_sheet_locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+
+async def _refresh_sheet_ids(spreadsheet_id: str) -> dict[str, int]:
+    service = await _run(_get_sheets_service)
+    meta = await _execute(service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields="sheets.properties(sheetId,title)",
+    ))
+    title_to_id = {s["properties"]["title"]: s["properties"]["sheetId"] for s in meta.get("sheets", [])}
+    _sheet_ids[spreadsheet_id] = title_to_id
+    return title_to_id
+
+
+def daily_sheet_title(order_prefix: str, delivery_date: date) -> str:
+    return f"{order_prefix}_{delivery_date.isoformat()}"
+
+
 async def ensure_daily_sheet_exists(layout: MatrixLayout, order_prefix: str, delivery_date: date) -> str:
     """
     Создаёт (если нет) лист на дату как копию template_sheet_name в том же spreadsheet_id.
     Имя листа: {order_prefix}_YYYY-MM-DD
     """
-    service = _get_sheets_service()
-    target_title = f"{order_prefix}_{delivery_date.isoformat()}"
+    return await ensure_sheet_exists(layout, daily_sheet_title(order_prefix, delivery_date))
 
-    # 1) Получим список листов и найдём: существует ли уже target_title и template
-    meta = service.spreadsheets().get(spreadsheetId=layout.spreadsheet_id).execute()
-    sheets = meta.get("sheets", [])
-    title_to_id = {s["properties"]["title"]: s["properties"]["sheetId"] for s in sheets}
 
-    if target_title in title_to_id:
+async def ensure_sheet_exists(layout: MatrixLayout, target_title: str) -> str:
+    """То же по готовому имени листа (для строк заказа, отложенных, пока Sheets был недоступен)."""
+    if target_title in _sheet_ids.get(layout.spreadsheet_id, {}):
         return target_title
 
-    if layout.template_sheet_name not in title_to_id:
-        raise RuntimeError(f"Template sheet '{layout.template_sheet_name}' not found")
+    # один лист создаёт только один запрос (и один процесс при BOT_WORKERS > 1), остальные ждут и видят его в карте
+    key = (layout.spreadsheet_id, target_title)
+    lock = _sheet_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock, interprocess_lock(f"sheet:{layout.spreadsheet_id}:{target_title}"):
+            if target_title in _sheet_ids.get(layout.spreadsheet_id, {}):
+                return target_title
+
+            # 1) Перечитаем список листов: лист могли создать вручную или другим процессом
+            title_to_id = await _refresh_sheet_ids(layout.spreadsheet_id)
+            if target_title in title_to_id:
+                return target_title
+
+            if layout.template_sheet_name not in title_to_id:
+                raise RuntimeError(f"Template sheet '{layout.template_sheet_name}' not found")
+
+            template_sheet_id = title_to_id[layout.template_sheet_name]
+            service = await _run(_get_sheets_service)
+
+            # 2) Копируем template лист внутри того же spreadsheet
+            copy_resp = await _execute(service.spreadsheets().sheets().copyTo(
+                spreadsheetId=layout.spreadsheet_id,
+                sheetId=template_sheet_id,
+                body={"destinationSpreadsheetId": layout.spreadsheet_id},
+            ))
+
+            new_sheet_id = copy_resp["sheetId"]
+            # 3) Переименуем
+            await _execute(service.spreadsheets().batchUpdate(
+                spreadsheetId=layout.spreadsheet_id,
+                body={
+                    "requests": [
+                        {"updateSheetProperties": {
+                            "properties": {"sheetId": new_sheet_id, "title": target_title},
+                            "fields": "title"
+                        }}
+                    ]
+                }
+            ))
+
+            title_to_id[target_title] = new_sheet_id
+    finally:
+        # и при ошибке (Google недоступен, нет шаблона) — иначе замок на каждое имя листа копился бы в памяти
+        if _sheet_locks.get(key) is lock:
+            del _sheet_locks[key]
+    return target_title
 
-    template_sheet_id = title_to_id[layout.template_sheet_name]
 
-    # 2) Копируем template лист внутри того же spreadsheet
-    copy_resp = service.spreadsheets().sheets().copyTo(
-        spreadsheetId=layout.spreadsheet_id,
-        sheetId=template_sheet_id,
-        body={"destinationSpreadsheetId": layout.spreadsheet_id},
-    ).execute()
+async def sheet_exists(spreadsheet_id: str, title: str) -> bool:
+    if title in _sheet_ids.get(spreadsheet_id, {}):
+        return True
+    return title in await _refresh_sheet_ids(spreadsheet_id)
+
+
+async def read_matrix(layout: MatrixLayout, sheet: str) -> Matrix:
+    """
+    Весь лист-матрицу одним values.batchGet: шапка адресов, колонка товаров
+    и блок количеств (строки товаров × колонки адресов).
+    """
+    service = await _run(_get_sheets_service)
+    start_col = layout.address_start_col_letter.upper()
+    end_col = _index_to_col_letter(_col_letter_to_index(start_col) + ADDRESS_SCAN_COLUMNS)
+    item_col = layout.item_name_col_letter.upper()
+    first, last = layout.item_row_start, layout.item_row_end
 
-    new_sheet_id = copy_resp["sheetId"]
-    # 3) Переименуем
-    service.spreadsheets().batchUpdate(
+    resp = await _execute(service.spreadsheets().values().batchGet(
         spreadsheetId=layout.spreadsheet_id,
-        body={
-            "requests": [
-                {"updateSheetProperties": {
-                    "properties": {"sheetId": new_sheet_id, "title": target_title},
-                    "fields": "title"
-                }}
-            ]
-        }
-    ).execute()
+        ranges=[
+            _address_range(layout, sheet),
+            f"{sheet}!{item_col}{first}:{item_col}{last}",
+            f"{sheet}!{start_col}{first}:{end_col}{last}",
+        ],
+        majorDimension="ROWS",
+        valueRenderOption="UNFORMATTED_VALUE",
+    ))
+    header, names, block = [vr.get("values") or [] for vr in resp.get("valueRanges", [])]
 
-    return target_title
+    stores = _parse_address_row(layout, header[0] if header else [])
+    items = _parse_item_rows(layout, [r[0] if r else "" for r in names])
+    return Matrix.from_block(sheet, [(it.name, it.row) for it in items],
+                             [(a.address, a.col_letter) for a in stores], block, first)
 
 
-async def write_qty(layout: MatrixLayout, daily_sheet_name: str, item_name: str, address_col: str, qty: int) -> None:
-    """
-    Пишет qty в ячейку пересечения:
-    - строка товара (ищем item_name в item_name_col_letter в диапазоне item_row_start..item_row_end)
-    - колонка адреса = address_col (буква колонки)
-    """
-    service = _get_sheets_service()
+# Индекс "товар -> номер строки" для листов на дату: строится один раз по колонке товаров
+# самого листа (не шаблона — строки шаблона могли сдвинуться после копирования листа, а
+# листы создаются заранее) и общий для всех пользователей. Перечитываем, только если товар
+# в индексе не нашёлся, и по /reload.
+_row_index = AsyncTTLCache(ttl=float("inf"))
 
-    # читаем колонку с товарами на листе даты (она должна совпадать по структуре с шаблоном)
-    col = layout.item_name_col_letter.upper()
-    rng = f"{daily_sheet_name}!{col}{layout.item_row_start}:{col}{layout.item_row_end}"
 
-    resp = service.spreadsheets().values().get(
-        spreadsheetId=layout.spreadsheet_id,
-        range=rng,
-        majorDimension="COLUMNS",
-    ).execute()
+async def _sheet_row_index(layout: MatrixLayout, daily_sheet_name: str, refresh: bool = False) -> dict[str, int]:
+    key = (layout.spreadsheet_id, daily_sheet_name)
+    if refresh:
+        _row_index.invalidate(key)
+    return await _row_index.get(key, lambda: _build_row_index(layout, daily_sheet_name))
 
-    col_vals = (resp.get("values") or [[]])[0]
 
-    # найдём строку товара
-    target_row: Optional[int] = None
+async def _item_row(layout: MatrixLayout, daily_sheet_name: str, item_name: str) -> int:
+    name = item_name.strip()
+
+    cached = _row_index.peek((layout.spreadsheet_id, daily_sheet_name)) is not None
+    row = (await _sheet_row_index(layout, daily_sheet_name)).get(name)
+    if row is None and cached:
+        # строку могли добавить на лист после построения индекса
+        row = (await _sheet_row_index(layout, daily_sheet_name, refresh=True)).get(name)
+
+    if row is None:
+        raise ItemNotFound(f"Item '{item_name}' not found in sheet '{daily_sheet_name}'")
+    return row
+
+
+async def _build_row_index(layout: MatrixLayout, daily_sheet_name: str) -> dict[str, int]:
+    col_vals = await _read_item_column(layout, daily_sheet_name)
+    index: dict[str, int] = {}
     for i, val in enumerate(col_vals):
-        if (val or "").strip() == item_name.strip():
-            target_row = layout.item_row_start + i
-            break
+        v = (val or "").strip()
+        if v:
+            index.setdefault(v, layout.item_row_start + i)
+    return index
+
+
+# Колонка магазина на листе даты ("Мой заказ"): читается одним диапазоном, дальше живёт в памяти
+# и обновляется нашими же записями (write_qty / write_qty_batch), без повторного чтения.
+# Раз в STORE_COLUMN_TTL_SECONDS перечитываем в фоне (пока отдаём прежнюю) — на случай ручных правок в таблице.
+_store_columns = AsyncTTLCache(ttl=STORE_COLUMN_TTL_SECONDS, maxsize=STORE_COLUMN_CACHE_SIZE)
+_store_column_patches: dict[tuple[str, str, str], dict[str, float]] = {}   # записи, сделанные во время чтения
+
+
+async def read_store_column(layout: MatrixLayout, daily_sheet_name: str, address_col: str) -> dict[str, float]:
+    """Количества магазина на листе даты: товар -> количество (только заполненные ячейки)."""
+    key = (layout.spreadsheet_id, daily_sheet_name, address_col.upper())
+    return await _store_columns.get(key, lambda: _load_store_column(layout, daily_sheet_name, key))
+
+
+async def _load_store_column(layout: MatrixLayout, daily_sheet_name: str, key: tuple[str, str, str]) -> dict[str, float]:
+    _store_column_patches[key] = {}
+    try:
+        index = await _sheet_row_index(layout, daily_sheet_name)
+        service = await _run(_get_sheets_service)
+        col, first = key[2], layout.item_row_start
+        resp = await _execute(service.spreadsheets().values().get(
+            spreadsheetId=layout.spreadsheet_id,
+            range=f"{daily_sheet_name}!{col}{first}:{col}{layout.item_row_end}",
+            majorDimension="COLUMNS",
+            valueRenderOption="UNFORMATTED_VALUE",
+        ))
+        vals = (resp.get("values") or [[]])[0]
+        column: dict[str, float] = {}
+        for name, row in index.items():
+            r = row - first
+            if 0 <= r < len(vals) and vals[r] not in ("", None):
+                column[name] = _number(vals[r])
+        column.update(_store_column_patches.get(key, {}))
+    finally:
+        _store_column_patches.pop(key, None)
+    return column
+
+
+def _remember_written(layout: MatrixLayout, daily_sheet_name: str, cells: list[tuple[str, str, int]]) -> None:
+    for item_name, address_col, qty in cells:
+        key = (layout.spreadsheet_id, daily_sheet_name, address_col.upper())
+        name = item_name.strip()
+        cached = _store_columns.peek(key)
+        if cached is not None:
+            cached[name] = qty
+        patches = _store_column_patches.get(key)
+        if patches is not None:
+            patches[name] = qty
 
-    if target_row is None:
-        raise RuntimeError(f"Item '{item_name}' not found in sheet '{daily_sheet_name}'")
+
+async def write_qty(layout: MatrixLayout, daily_sheet_name: str, item_name: str, address_col: str, qty: int) -> None:
+    """
+    Пишет qty в ячейку пересечения:
+    - строка товара (по индексу товаров листа, см. _item_row)
+    - колонка адреса = address_col (буква колонки)
+    """
+    service = await _run(_get_sheets_service)
+    target_row = await _item_row(layout, daily_sheet_name, item_name)
 
     # пишем qty в address_col + target_row
     cell = f"{daily_sheet_name}!{address_col.upper()}{target_row}"
-    service.spreadsheets().values().update(
+    await _execute(service.spreadsheets().values().update(
         spreadsheetId=layout.spreadsheet_id,
         range=cell,
         valueInputOption="USER_ENTERED",
         body={"values": [[qty]]},
-    ).execute()
+    ))
+    _remember_written(layout, daily_sheet_name, [(item_name, address_col, qty)])
 
+
+async def write_qty_batch(layout: MatrixLayout, daily_sheet_name: str, cells: list[tuple[str, str, int]]) -> list[str]:
+    """
+    Пишет сразу несколько количеств одним values.batchUpdate.
+    cells: [(item_name, address_col, qty), ...]
+    Товары, которых нет на листе, не мешают остальным: они не пишутся и возвращаются списком.
+    """
+    if not cells:
+        return []
+    service = await _run(_get_sheets_service)
+
+    data, written, missing = [], [], []
+    for item_name, address_col, qty in cells:
+        try:
+            target_row = await _item_row(layout, daily_sheet_name, item_name)
+        except ItemNotFound:
+            missing.append(item_name)
+            continue
+        data.append({
+            "range": f"{daily_sheet_name}!{address_col.upper()}{target_row}",
+            "values": [[qty]],
+        })
+        written.append((item_name, address_col, qty))
+
+    if data:
+        await _execute(service.spreadsheets().values().batchUpdate(
+            spreadsheetId=layout.spreadsheet_id,
+            body={"valueInputOption": "USER_ENTERED", "data": data},
+        ))
+        _remember_written(layout, daily_sheet_name, written)
+    return missing
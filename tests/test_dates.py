@@ -0,0 +1,88 @@
+# tests/test_dates.py
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from config import DEADLINE_HOUR, DEADLINE_MINUTE
+from dates import TZ, DeliveryOption, available_delivery_dates
+
+# Календарь правил (dates.py) должен отдавать ровно то же, что прежняя функция с ветками
+# под каждый тип заказа. Прежняя реализация — ниже, как эталон; не менять вместе с dates.py.
+
+
+def _deadline_dt(d: date) -> datetime:
+    return datetime.combine(d, time(DEADLINE_HOUR, DEADLINE_MINUTE), tzinfo=TZ)
+
+
+def _next_weekday(d: date, weekday: int) -> date:
+    return d + timedelta(days=(weekday - d.weekday()) % 7)
+
+
+def legacy_available_delivery_dates(order_type: str, subtype: str | None, now: datetime) -> list[DeliveryOption]:
+    now = now.astimezone(TZ)
+    today = now.date()
+
+    if order_type == "RC" and subtype == "RC_1":
+        tuesday = _next_weekday(today, 1)
+        sunday_before_tuesday = tuesday - timedelta(days=2)
+        thursday = _next_weekday(today, 3)
+        wednesday_before_thursday = thursday - timedelta(days=1)
+
+        options: list[DeliveryOption] = []
+        if now <= _deadline_dt(sunday_before_tuesday):
+            options.append(DeliveryOption(label=f"Ближайшая доставка: ВТ {tuesday.isoformat()}", delivery_date=tuesday))
+        if now <= _deadline_dt(wednesday_before_thursday):
+            options.append(DeliveryOption(label=f"Ближайшая доставка: ЧТ {thursday.isoformat()}", delivery_date=thursday))
+        if not options:
+            next_week_tuesday = _next_weekday(today + timedelta(days=7), 1)
+            options.append(DeliveryOption(label=f"Следующая доставка: ВТ {next_week_tuesday.isoformat()}",
+                                          delivery_date=next_week_tuesday))
+        return options[:2]
+
+    if order_type == "RC" and subtype == "RC_2":
+        friday = _next_weekday(today, 4)
+        sunday_before_friday = friday - timedelta(days=5)
+        if now <= _deadline_dt(sunday_before_friday):
+            return [DeliveryOption(label=f"Ближайшая доставка: ПТ {friday.isoformat()}", delivery_date=friday)]
+        next_week_friday = _next_weekday(today + timedelta(days=7), 4)
+        return [DeliveryOption(label=f"Следующая доставка: ПТ {next_week_friday.isoformat()}", delivery_date=next_week_friday)]
+
+    if order_type == "FREEZE":
+        delivery = today + timedelta(days=2)
+        return [DeliveryOption(label=f"Доставка: {delivery.isoformat()} (временная логика)", delivery_date=delivery)]
+
+    return [DeliveryOption(label=f"Доставка: {today.isoformat()} (fallback)", delivery_date=today)]
+
+
+# FREEZE с любым подтипом и неизвестный тип (fallback) — тоже правила, их календари сравниваем так же
+CASES = [("RC", "RC_1"), ("RC", "RC_2"), ("FREEZE", None), ("OTHER", None)]
+
+
+@pytest.mark.parametrize("order_type, subtype", CASES)
+def test_every_minute_of_a_year(order_type, subtype):
+    now = datetime(2026, 1, 1, tzinfo=TZ)
+    end = datetime(2027, 1, 1, tzinfo=TZ)
+    step = timedelta(minutes=1)
+    while now < end:
+        assert available_delivery_dates(order_type, subtype, now) == legacy_available_delivery_dates(order_type, subtype, now), now
+        now += step
+
+
+@pytest.mark.parametrize("order_type, subtype", CASES[:3])
+def test_around_deadlines(order_type, subtype):
+    # дедлайн включительно: проверяем доли секунды по обе стороны от DEADLINE_HOUR:DEADLINE_MINUTE
+    rnd = random.Random(0)
+    for _ in range(20_000):
+        day = date(2026, 1, 1) + timedelta(days=rnd.randrange(365))
+        now = _deadline_dt(day) + timedelta(microseconds=rnd.randint(-2_000_000, 2_000_000))
+        assert available_delivery_dates(order_type, subtype, now) == legacy_available_delivery_dates(order_type, subtype, now), now
+
+
+def test_other_timezone_input():
+    # now в UTC приводится к TZ так же, как раньше
+    now = datetime(2026, 3, 1, 20, 59, 30, tzinfo=ZoneInfo("UTC"))
+    assert available_delivery_dates("RC", "RC_1", now) == legacy_available_delivery_dates("RC", "RC_1", now)
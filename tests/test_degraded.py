@@ -0,0 +1,94 @@
+# tests/test_degraded.py
+from __future__ import annotations
+
+import os
+import asyncio
+import tempfile
+from datetime import date
+
+_tmp = tempfile.mkdtemp()
+os.environ.update(
+    FAKE_BACKENDS="1", BOT_TOKEN="1:TEST", FAKE_SHEETS_LATENCY="0",
+    SHEETS_READS_PER_MINUTE="100000", SHEETS_WRITES_PER_MINUTE="100000",
+    SESSION_DB_PATH="", ORDER_JOURNAL_PATH="", SHEETS_SNAPSHOT_PATH=os.path.join(_tmp, "snapshot.json"),
+)
+
+import httpx  # noqa: E402
+
+import callbacks  # noqa: E402
+import fakes  # noqa: E402
+import main as bot  # noqa: E402
+import sheets  # noqa: E402
+from dedup import RecentKeys  # noqa: E402
+from breaker import SHEETS_BREAKER_FAILURES  # noqa: E402
+
+
+def _button(reply: dict, action: str, n: int = 0) -> str:
+    return [b["callback_data"] for row in reply["reply_markup"]["inline_keyboard"] for b in row
+            if callbacks.decode(b["callback_data"])[0] == action][n]
+
+
+async def _scenario() -> None:
+    await bot.on_startup()
+    await bot.warmup_task
+    # update_id у UpdateFactory в каждом тесте начинаются с 1 — окно дедупликации как после перезапуска
+    bot.recent_updates = RecentKeys(bot.UPDATE_DEDUP_SECONDS)
+    replies: asyncio.Queue = asyncio.Queue()
+    fakes.bot_request.on_call = lambda method, params: (
+        replies.put_nowait(params) if method in ("sendMessage", "editMessageText") else None)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=bot.app), base_url="http://test")
+    url = f"/telegram/{bot.WEBHOOK_SECRET}"
+    updates = fakes.UpdateFactory()
+    screen = {"message_id": 1, "text": "…"}
+
+    async def send(update: dict) -> dict:
+        await client.post(url, json=update)
+        reply = await asyncio.wait_for(replies.get(), 5)
+        if "message" in update:
+            screen["message_id"] = update["update_id"]
+        screen["text"] = reply["text"]
+        return reply
+
+    async def tap(reply: dict, action: str, n: int = 0) -> dict:
+        return await send(updates.callback(7, _button(reply, action, n), screen["message_id"], screen["text"]))
+
+    try:
+        reply = await send(updates.message(7, "/start"))
+        for action, n in [("create_order", 0), ("otype", 1), ("storecol", 2)]:
+            reply = await tap(reply, action, n)
+
+        # листы на ближайшие даты создаются заранее — останавливаем это и убираем их, как будто не успели
+        bot.precreate_task.cancel()
+        await asyncio.gather(bot.precreate_task, return_exceptions=True)
+        book = fakes.sheets_service.book(bot.FREEZE_LAYOUT.spreadsheet_id)
+        for title in [t for t in book.sheets if t.startswith("FREEZE_")]:
+            del book.sheets[title], book.sheet_ids[title]
+        sheets._sheet_ids.pop(bot.FREEZE_LAYOUT.spreadsheet_id, None)
+
+        # Google лёг перед выбором даты: меню товаров из кэша, лист на дату не создан
+        fakes.sheets_service.error_rate = 1.0
+        for _ in range(SHEETS_BREAKER_FAILURES):
+            sheets._breaker.failure(TimeoutError("Sheets is down"))
+        reply = await tap(reply, "ddate")
+        assert reply["text"].startswith(bot.DEGRADED_NOTICE)
+        daily_sheet = sheets.daily_sheet_title("FREEZE", date.fromisoformat(bot.ptb_app.user_data[7][bot.K_DELIVERY_DATE]))
+        assert daily_sheet not in book.sheets
+
+        # Google вернулся: следующее нажатие создаёт лист, а не падает на чтении несуществующего
+        fakes.sheets_service.error_rate = 0.0
+        sheets._breaker.success()
+        reply = await tap(reply, "item", 3)
+        assert "Выбери количество" in reply["text"], reply["text"]
+        reply = await tap(reply, "qty", 1)
+        reply = await tap(reply, "finish")
+        assert reply["text"].startswith("✅ Заказ завершён"), reply["text"]
+        assert daily_sheet in book.sheets
+        assert fakes.sheets_service.calls["values.batchUpdate"] == 1
+        assert not bot.order_buffer._orders
+    finally:
+        await client.aclose()
+        await bot.on_shutdown()
+
+
+def test_order_after_outage_during_date_pick():
+    asyncio.run(_scenario())
@@ -0,0 +1,86 @@
+# tests/test_slow_sheets.py
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import tempfile
+
+_tmp = tempfile.mkdtemp()
+os.environ.update(
+    FAKE_BACKENDS="1", BOT_TOKEN="1:TEST", FAKE_SHEETS_LATENCY="0",
+    SHEETS_READS_PER_MINUTE="100000", SHEETS_WRITES_PER_MINUTE="100000",
+    SESSION_DB_PATH="", ORDER_JOURNAL_PATH="", SHEETS_SNAPSHOT_PATH=os.path.join(_tmp, "snapshot.json"),
+)
+
+import httpx  # noqa: E402
+
+import callbacks  # noqa: E402
+import fakes  # noqa: E402
+import main as bot  # noqa: E402
+import sheets  # noqa: E402
+from dedup import RecentKeys  # noqa: E402
+from config import RC_LAYOUT  # noqa: E402
+
+SHEETS_LATENCY = 1.0
+
+
+async def _loop_lag(stop: asyncio.Event) -> float:
+    """Максимальное опоздание цикла событий на 10-мс тиках."""
+    worst = 0.0
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - t - 0.01)
+    return worst
+
+
+async def _scenario() -> None:
+    await bot.on_startup()
+    await bot.warmup_task
+    # update_id у UpdateFactory в каждом тесте начинаются с 1 — окно дедупликации как после перезапуска
+    bot.recent_updates = RecentKeys(bot.UPDATE_DEDUP_SECONDS)
+    replies: dict[int, asyncio.Queue] = {}
+    fakes.bot_request.on_call = lambda method, params: (
+        replies.setdefault(params["chat_id"], asyncio.Queue()).put_nowait(params)
+        if method in ("sendMessage", "editMessageText") else None)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=bot.app), base_url="http://test")
+    url = f"/telegram/{bot.WEBHOOK_SECRET}"
+    updates = fakes.UpdateFactory()
+
+    async def roundtrip(update: dict, chat_id: int) -> tuple[dict, float]:
+        t = time.perf_counter()
+        await client.post(url, json=update)
+        reply = await asyncio.wait_for(replies.setdefault(chat_id, asyncio.Queue()).get(), 5)
+        return reply, time.perf_counter() - t
+
+    try:
+        # медленный Google: все потоки пула Sheets заняты запросами других магазинов
+        fakes.sheets_service.latency, fakes.sheets_service.jitter = SHEETS_LATENCY, 0.0
+        stop = asyncio.Event()
+        lag = asyncio.create_task(_loop_lag(stop))
+        slow = [asyncio.create_task(sheets.ping(RC_LAYOUT.spreadsheet_id))
+                for _ in range(sheets.SHEETS_MAX_CONCURRENCY * 2)]
+        await asyncio.sleep(0.05)
+
+        # а этому магазину Sheets не нужен — он не должен ждать чужих запросов
+        reply, start_took = await roundtrip(updates.message(42, "/start"), 42)
+        create = next(b["callback_data"] for row in reply["reply_markup"]["inline_keyboard"] for b in row
+                      if callbacks.decode(b["callback_data"])[0] == "create_order")
+        _, tap_took = await roundtrip(updates.callback(42, create, 1, reply["text"]), 42)
+        stop.set()
+        worst_lag = await lag
+
+        assert start_took < 0.3 * SHEETS_LATENCY, start_took
+        assert tap_took < 0.3 * SHEETS_LATENCY, tap_took
+        assert worst_lag < 0.1, worst_lag
+        assert not any(task.done() for task in slow), "Sheets requests finished before the updates were answered"
+        await asyncio.gather(*slow)
+    finally:
+        fakes.sheets_service.latency = 0.0
+        await client.aclose()
+        await bot.on_shutdown()
+
+
+def test_slow_sheets_do_not_stall_unrelated_updates():
+    asyncio.run(_scenario())
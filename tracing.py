@@ -0,0 +1,166 @@
+# tracing.py
+from __future__ import annotations
+
+import os
+import json
+import time
+import logging
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+from telegram.request import BaseRequest
+
+log = logging.getLogger("trace")
+
+# Трассировка апдейтов без внешнего коллектора: у каждого апдейта свой trace id, внутри — отрезки
+# (ожидание в очереди, step_*, запросы к Sheets, вызовы Bot API). Если апдейт обрабатывался дольше
+# TRACE_SLOW_MS — одна JSON-строка в лог и запись в кольцевой буфер (GET /admin/traces).
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "2000"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+MAX_SPANS = 200       # на один апдейт; дальше только счётчик отброшенных
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float       # от начала трассы
+    ms: float = 0.0
+    depth: int = 0
+    error: str | None = None
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    update_id: int
+    started_at: float                 # time.time()
+    kind: str = "update"              # действие кнопки / "text" / "/команда"
+    chat_id: int | None = None
+    total_ms: float = 0.0
+    error: str | None = None
+    spans: list[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+    _t0: float = field(default=0.0, repr=False)
+    _done: bool = field(default=False, repr=False)
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        del d["_t0"], d["_done"]
+        return d
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_depth: ContextVar[int] = ContextVar("trace_depth", default=0)
+
+slow_traces: deque[Trace] = deque(maxlen=TRACE_BUFFER_SIZE)
+_received: OrderedDict[int, float] = OrderedDict()     # update_id -> time.perf_counter() приёма вебхука
+
+
+def received(update_id: int) -> None:
+    """Вебхук принял апдейт — отсюда считаем ожидание в очереди."""
+    _received[update_id] = time.perf_counter()
+    while len(_received) > 10_000:
+        _received.popitem(last=False)
+
+
+def current() -> Trace | None:
+    return _trace.get()
+
+
+def annotate(kind: str | None = None, chat_id: int | None = None) -> None:
+    trace = _trace.get()
+    if trace is not None:
+        if kind is not None:
+            trace.kind = kind
+        if chat_id is not None:
+            trace.chat_id = chat_id
+
+
+@contextmanager
+def span(name: str):
+    """Отрезок внутри текущей трассы (вне трассы — ничего не делает)."""
+    trace = _trace.get()
+    if trace is None or trace._done:
+        # фоновые задачи, созданные во время апдейта, наследуют контекст — после его завершения не пишем
+        yield
+        return
+    if len(trace.spans) >= MAX_SPANS:
+        trace.dropped_spans += 1
+        yield
+        return
+    depth = _depth.get()
+    t = time.perf_counter()
+    s = Span(name=name, start_ms=round((t - trace._t0) * 1000, 2), depth=depth)
+    trace.spans.append(s)
+    token = _depth.set(depth + 1)
+    try:
+        yield
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        _depth.reset(token)
+        s.ms = round((time.perf_counter() - t) * 1000, 2)
+
+
+@contextmanager
+def trace_update(update_id: int):
+    """Трасса обработки одного апдейта; медленные — в лог и в slow_traces."""
+    t0 = time.perf_counter()
+    trace = Trace(trace_id=os.urandom(8).hex(), update_id=update_id, started_at=time.time(), _t0=t0)
+    token = _trace.set(trace)
+    queued_at = _received.pop(update_id, None)
+    if queued_at is not None:
+        # в очереди ждали до начала трассы: отрезок с отрицательным началом
+        trace.spans.append(Span(name="queue", start_ms=round((queued_at - t0) * 1000, 2),
+                                ms=round((t0 - queued_at) * 1000, 2)))
+    try:
+        yield trace
+    except BaseException as e:
+        trace.error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        _trace.reset(token)
+        trace._done = True
+        trace.total_ms = round((time.perf_counter() - (queued_at or t0)) * 1000, 2)
+        if trace.total_ms >= TRACE_SLOW_MS:
+            slow_traces.append(trace)
+            log.warning(json.dumps({"slow_update": trace.to_dict()}, ensure_ascii=False))
+
+
+def recent(min_ms: float = 0.0, limit: int = 50) -> list[dict]:
+    """Последние медленные трассы, новые первыми."""
+    out = []
+    for trace in reversed(slow_traces):
+        if trace.total_ms >= min_ms:
+            out.append(trace.to_dict())
+            if len(out) >= limit:
+                break
+    return out
+
+
+class TracedRequest(BaseRequest):
+    """Обёртка над транспортом Bot API: каждый вызов — отрезок telegram.<метод> в текущей трассе."""
+
+    def __init__(self, inner: BaseRequest):
+        self.inner = inner
+
+    @property
+    def read_timeout(self) -> float | None:
+        return self.inner.read_timeout
+
+    async def initialize(self) -> None:
+        await self.inner.initialize()
+
+    async def shutdown(self) -> None:
+        await self.inner.shutdown()
+
+    async def do_request(self, url: str, method: str, request_data=None, read_timeout=BaseRequest.DEFAULT_NONE,
+                         write_timeout=BaseRequest.DEFAULT_NONE, connect_timeout=BaseRequest.DEFAULT_NONE,
+                         pool_timeout=BaseRequest.DEFAULT_NONE) -> tuple[int, bytes]:
+        with span(f"telegram.{url.rsplit('/', 1)[-1]}"):
+            return await self.inner.do_request(url, method, request_data, read_timeout=read_timeout,
+                                               write_timeout=write_timeout, connect_timeout=connect_timeout,
+                                               pool_timeout=pool_timeout)
@@ -0,0 +1,111 @@
+# updates.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable
+
+from telegram import Update
+
+log = logging.getLogger("updates")
+
+
+@dataclass
+class UpdateQueueStats:
+    enqueued: int = 0
+    processed: int = 0
+    failed: int = 0
+    rejected: int = 0      # отказали из-за переполнения / остановки (Telegram пришлёт повторно)
+    depth: int = 0         # сейчас в очереди (включая обрабатываемые)
+    max_depth: int = 0
+    active_chats: int = 0
+
+
+def update_chat_key(update: Update) -> Hashable:
+    """Ключ упорядочивания: апдейты одного чата обрабатываются строго по очереди."""
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return ("user", update.effective_user.id)
+    return ("update", update.update_id)
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь апдейтов Telegram с пулом воркеров.
+    Внутри одного чата порядок строгий (чат в работе максимум у одного воркера),
+    разные чаты обрабатываются параллельно.
+    """
+
+    def __init__(self, process: Callable[[Update], Awaitable[None]], workers: int, maxsize: int):
+        self._process = process
+        self._workers_count = workers
+        self._maxsize = maxsize
+        self._pending: dict[Hashable, deque[Update]] = {}
+        self._ready: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+        self.stats = UpdateQueueStats()
+
+    def start(self) -> None:
+        self._closed = False
+        for i in range(self._workers_count):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"update-worker-{i}"))
+
+    def submit(self, update: Update) -> bool:
+        """Кладёт апдейт в очередь. False — очередь переполнена или закрыта."""
+        if self._closed or self.stats.depth >= self._maxsize:
+            self.stats.rejected += 1
+            return False
+
+        key = update_chat_key(update)
+        dq = self._pending.get(key)
+        if dq is None:
+            self._pending[key] = deque((update,))
+            self._ready.put_nowait(key)
+        else:
+            dq.append(update)
+
+        self.stats.enqueued += 1
+        self.stats.depth += 1
+        self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+        self.stats.active_chats = len(self._pending)
+        self._idle.clear()
+        return True
+
+    async def drain(self, timeout: float) -> None:
+        """Перестаёт принимать новые апдейты, дожидается обработки очереди и гасит воркеры."""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Update queue drain timed out, %d updates dropped", self.stats.depth)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            dq = self._pending[key]
+            update = dq.popleft()
+            try:
+                await self._process(update)
+                self.stats.processed += 1
+            except Exception:
+                self.stats.failed += 1
+                log.exception("Update %s failed", update.update_id)
+            finally:
+                self.stats.depth -= 1
+                if dq:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                self.stats.active_chats = len(self._pending)
+                if self.stats.depth == 0:
+                    self._idle.set()